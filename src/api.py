@@ -2,147 +2,529 @@
 This module contains classes and functions for handling client-server communication and database operations.
 
 Imports:
-    time: For sleep function
-    src.core: For client, server, utils, and database modules
+    src.core: For client, server, utils, database, protocol, codec, stats and storage modules
     src.core.debug: For logging functions
-    ast: For literal_eval function
-    threading: For Thread class
+    threading: For Thread, Lock and Event classes
+    asyncio: For the asyncio-based server and client
+    os: For checking whether the database file exists
+    time: For timing the stages of requests
+    itertools, queue: For request IDs and the queues of streamed replies
+    multiprocessing: For the server processes of PreforkHWIServer
+    concurrent.futures: For request futures, write futures and the executor running request handlers of the asyncio server
+    functools: For the callbacks finishing the requests answered by a write future
+    collections: For the OrderedDict keeping the reply cache in LRU order
+    contextlib, socket: For checking out the connections of HWIClientPool and closing them
     uuid: For generating unique identifiers
 
 Classes:
     Requests: Contains class methods for different types of requests
+    Subscription: The changes pushed by the server to a subscription of a client
     IDZClient: Client class for sending requests and receiving data
     IDZServer: Server class for handling client requests and database operations
+    Task: A row of the Tasks table, shared with src.core.database
+    RequestError: Raised on the client when the server failed to answer a request
+    HWIClientPool: Connected IDZClients shared by many threads, reconnected when lost
+    PreforkHWIServer: Runs several IDZServer processes sharing one port with SO_REUSEPORT
+    AsyncHWIServer: asyncio-based server answering the same requests as IDZServer
+    AsyncHWIClient: asyncio-based client for sending requests and receiving data
 
 Functions:
     get_request_type: Extracts the request type from a request command
+    parse_request: Checks the shape of a decoded request and splits it into its ID and command
 """
 
-from time import sleep
 from src.core import client
 from src.core.debug import *
 from src.core import server
 from src.core import utils
 from src.core import database
+from src.core import protocol
+from src.core import codec
+from src.core import stats
+from src.core import storage
 
-from src.core.database import INT, TEXT
+from src.core.database import INT, TEXT, Task
 
-from ast import literal_eval
+from threading import Event, Thread, Lock
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+from functools import partial
+from contextlib import contextmanager
 
-from threading import Thread
+import asyncio
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import socket
+import sqlite3
+import time
 
 import uuid
 
 class Requests:
     """
     A class containing class methods for different types of requests.
+
+    A request is a list whose first item is the request type and whose other items
+    are its arguments; it is serialized with the codec negotiated for the connection.
     """
 
     @classmethod
     def GET_ALL(self):
         """
-        Returns a request string for getting all data.
+        Returns a request for getting all data.
 
         Returns:
-            str: The request string for getting all data.
+            list: The request for getting all data.
         """
-        return 'GETALL*end'
+        return ['GETALL']
     
     @classmethod
     def ADD_INFO(self, info: list):
         """
-        Returns a function that generates a request string for adding information.
+        Returns a function that generates a request for adding information.
+
+        The server answers once the row is committed, or with an error if the write failed.
 
         Args:
             info (list): A list containing [user, lesson, date, wait_date, text].
 
         Returns:
-            function: A function that returns the request string for adding information.
+            function: A function that returns the request for adding information.
+        """
+        def inner():
+            return ['ADDINFO', info]
+        return inner
+    
+    @classmethod
+    def ADD_MANY(self, infos: list[list]):
+        """
+        Returns a function that generates a request for adding many rows of information at once.
+
+        All rows are inserted in a single transaction.
+
+        Args:
+            infos (list[list]): A list of lists containing [user, lesson, date, wait_date, text].
+
+        Returns:
+            function: A function that returns the request for adding the information.
         """
         def inner():
-            return f'ADDINFO*{info}end'
+            return ['ADDMANY', infos]
         return inner
     
     @classmethod
     def GET_FOR_DATE(self, data: str):
         """
-        Returns a function that generates a request string for getting data for a specific date.
+        Returns a function that generates a request for getting data for a specific date.
 
         Args:
             data (str): The date to retrieve data for.
 
         Returns:
-            function: A function that returns the request string for getting data for a specific date.
+            function: A function that returns the request for getting data for a specific date.
         """
         def inner():
-            return f'GETFORDATE*{data}end'
+            return ['GETFORDATE', data]
         return inner
     
     @classmethod
     def GET_FOR_WAIT_DATE(self, data: str):
         """
-        Returns a function that generates a request string for getting data for a specific wait date.
+        Returns a function that generates a request for getting data for a specific wait date.
 
         Args:
             data (str): The wait date to retrieve data for.
 
         Returns:
-            function: A function that returns the request string for getting data for a specific wait date.
+            function: A function that returns the request for getting data for a specific wait date.
         """
         def inner():
-            return f'GETFORWAITDATE*{data}end'
+            return ['GETFORWAITDATE', data]
         return inner
     
     @classmethod
     def DELETE_INFO(self, user_name: str, date: str):
         """
-        Returns a function that generates a request string for deleting information.
+        Returns a function that generates a request for deleting information.
         Args:
             user_name (str): The name of the user.
             date (str): The date to delete information for.
 
         Returns:
-            function: A function that returns the request string for deleting information.
+            function: A function that returns the request for deleting information.
         """
         def inner():
-            return f'DELETEINFO*{user_name}~{date}end'
+            return ['DELETEINFO', user_name, date]
         return inner
     
     @classmethod
     def DELETE_ALL(self):
         """
-        Returns a function that generates a request string for deleting all data.
+        Returns a function that generates a request for deleting all data.
+        Returns:
+            function: A function that returns the request for deleting all data.
+        """
+        def inner():
+            return ['DELETEALL']
+        return inner
+
+    @classmethod
+    def GET_DUE_BETWEEN(self, start: str, end: str):
+        """
+        Returns a function that generates a request for getting data due between two dates.
+
+        Args:
+            start (str): The first wait date of the range, included.
+            end (str): The last wait date of the range, included.
+
+        Returns:
+            function: A function that returns the request for getting data due between the dates.
+        """
+        def inner():
+            return ['GETDUEBETWEEN', start, end]
+        return inner
+
+    @classmethod
+    def GET_ASSIGNED_SINCE(self, date: str):
+        """
+        Returns a function that generates a request for getting data given on or after a date.
+
+        Args:
+            date (str): The first date, included.
+
+        Returns:
+            function: A function that returns the request for getting data given since the date.
+        """
+        def inner():
+            return ['GETASSIGNEDSINCE', date]
+        return inner
+
+    @classmethod
+    def GET_ALL_PAGE(self, cursor: str | None = None, page_size: int = 100):
+        """
+        Returns a function that generates a request for getting one page of all data.
+
+        Args:
+            cursor (str | None): The cursor token of the previous page, None for the first page.
+            page_size (int): The maximum number of rows of the page, at most MAX_PAGE_SIZE. Defaults to 100.
+
+        Returns:
+            function: A function that returns the request for getting the page. Its reply is a dict
+                with the 'rows' of the page and the 'cursor' of the next page, None after the last one.
+        """
+        def inner():
+            return ['GETALLPAGE', cursor, page_size]
+        return inner
+
+    @classmethod
+    def GET_ALL_STREAM(self, chunk_size: int = 500):
+        """
+        Returns a function that generates a request for streaming all data in chunks.
+
+        Args:
+            chunk_size (int): The maximum number of rows sent at once, at most MAX_PAGE_SIZE. Defaults to 500.
+
+        Returns:
+            function: A function that returns the request for streaming all data.
+        """
+        def inner():
+            return ['GETALLSTREAM', chunk_size]
+        return inner
+
+    @classmethod
+    def GET_CHANGES_SINCE(self, version: int = 0, limit: int = 1000):
+        """
+        Returns a function that generates a request for getting the changes of the data after a version.
+
+        Args:
+            version (int): The 'version' of the previous reply, 0 if there is no copy of the data yet.
+                A version the server no longer keeps in its change log is answered with a reset.
+            limit (int): The maximum number of changes of the reply, at most MAX_PAGE_SIZE. Defaults to 1000.
+
+        Returns:
+            function: A function that returns the request for getting the changes. Its reply is a dict
+                with the 'version' to ask from next time, 'reset', the 'rows' to replace the copy with
+                if reset is true, the 'changes' to apply otherwise and 'more' if changes are left.
+        """
+        def inner():
+            return ['GETCHANGESSINCE', version, limit]
+        return inner
+
+    @classmethod
+    def QUERY(self, where: dict | None = None, columns: list[str] | None = None, order_by: str | None = None,
+              descending: bool = False, limit: int | None = None):
+        """
+        Returns a function that generates a request for getting the data matching a filter.
+
+        Args:
+            where (dict | None): The filter: 'user', 'user_id', 'lesson', 'date' or 'wait_date' mapped to
+                a value or to a dict of operators ('=', '<', '<=', '>', '>=', 'in') and values, e.g.
+                {'lesson': 'math', 'wait_date': {'>=': '01.09.2024', '<=': '07.09.2024'}}.
+                Defaults to None, all data.
+            columns (list[str] | None): The columns to send, in order. Defaults to None, every column.
+            order_by (str | None): The column to order by, one of the filter columns. Defaults to None.
+            descending (bool): Order from the largest value. Defaults to False.
+            limit (int | None): The maximum number of rows. Defaults to None, no limit.
+
+        Returns:
+            function: A function that returns the request for the query. Its reply is the list of
+                the matching rows, each holding the selected columns.
+        """
+        def inner():
+            return ['QUERY', where, columns, order_by, descending, limit]
+        return inner
+
+    @classmethod
+    def SEARCH(self, query: str, lesson: str | None = None, limit: int = 20):
+        """
+        Returns a function that generates a request for searching the text and the lesson of the data.
+
+        Args:
+            query (str): The words to search for; a row matches when it holds all of them, as word prefixes.
+            lesson (str | None): Only the data of this lesson. Defaults to None, any lesson.
+            limit (int): The maximum number of rows, at most MAX_PAGE_SIZE. Defaults to 20.
+
+        Returns:
+            function: A function that returns the request for searching. Its reply is the list
+                of the matching rows, best match first.
+        """
+        def inner():
+            return ['SEARCH', query, lesson, limit]
+        return inner
+
+    @classmethod
+    def SUBSCRIBE(self, lesson: str | None = None, user: str | None = None, wait_date: str | None = None):
+        """
+        Returns a function that generates a request for subscribing to the changes of the data.
+
+        Prefer HWIClient.subscribe, which also receives the changes.
+
+        Args:
+            lesson (str | None): Only the changes of this lesson. Defaults to None, any lesson.
+            user (str | None): Only the changes of this user. Defaults to None, any user.
+            wait_date (str | None): Only the changes due on this date. Defaults to None, any date.
+
+        Returns:
+            function: A function that returns the request for subscribing.
+        """
+        def inner():
+            return ['SUBSCRIBE', lesson, user, wait_date]
+        return inner
+
+    @classmethod
+    def UNSUBSCRIBE(self, subscription: int):
+        """
+        Returns a function that generates a request for ending a subscription.
+
+        Args:
+            subscription (int): The request ID of the SUBSCRIBE request.
+
         Returns:
-            function: A function that returns the request string for deleting all data.
+            function: A function that returns the request for unsubscribing.
         """
         def inner():
-            return f'DELETEALL*end'
+            return ['UNSUBSCRIBE', subscription]
         return inner
+
+    @classmethod
+    def STATS(self):
+        """
+        Returns a request for getting the timing statistics of the server.
+
+        Returns:
+            list: The request for getting the statistics.
+        """
+        return ['STATS']
         
         
     
-def get_request_type(request_command: str) -> str:
+def get_request_type(request: list) -> str:
     """
-    Extracts the request type from a request command.
+    Extracts the request type from a request.
 
     Args:
-        request_command (str): The full request command.
+        request (list): The full request.
 
     Returns:
         str: The request type.
     """
-    return request_command.split('*')[0]
+    return request[0]
+
+def parse_request(request) -> tuple[int, list]:
+    """
+    Checks the shape of a decoded request and splits it into its ID and command.
+
+    Args:
+        request (Any): The decoded request, `[request_id, [type, ...]]`.
+
+    Returns:
+        tuple[int, list]: The ID of the request and its command.
+
+    Raises:
+        ValueError: If the request is not an integer ID followed by a non-empty list starting with its type.
+    """
+    if not isinstance(request, list) or len(request) != 2:
+        raise ValueError('a request must be [request_id, command]')
+    request_id, command = request
+    if not isinstance(request_id, int) or isinstance(request_id, bool):
+        raise ValueError('the request_id of a request must be an integer')
+    if not isinstance(command, list) or not command or not isinstance(command[0], str):
+        raise ValueError('the command of a request must be a list starting with its type')
+    return request_id, command
+
+def check_request_type(command: list):
+    """
+    Checks that a request is of a type the server knows.
+
+    Args:
+        command (list): The request.
+
+    Raises:
+        ValueError: If the type of the request is unknown.
+    """
+    if get_request_type(command) not in REQUEST_TYPES:
+        raise ValueError(f'unknown request type {get_request_type(command)!r}')
+
+# request types the server answers to
+REPLYING_REQUESTS = {'GETALL', 'ADDINFO', 'GETFORDATE', 'GETFORWAITDATE', 'DELETEINFO', 'DELETEALL',
+                     'GETDUEBETWEEN', 'GETASSIGNEDSINCE', 'GETALLPAGE', 'ADDMANY', 'STATS',
+                     'SUBSCRIBE', 'UNSUBSCRIBE', 'GETCHANGESSINCE', 'SEARCH', 'QUERY'}
+
+# request types the server answers to with a stream of chunks
+STREAMING_REQUESTS = {'GETALLSTREAM'}
+
+# every request type the server knows
+REQUEST_TYPES = REPLYING_REQUESTS | STREAMING_REQUESTS
+
+# request types managing the subscriptions of a connection
+SUBSCRIPTION_REQUESTS = {'SUBSCRIBE', 'UNSUBSCRIBE'}
+
+# request types whose replies HWIServer caches
+CACHED_REQUESTS = {'GETALL', 'GETFORDATE', 'GETFORWAITDATE'}
+
+# request types that change the database
+WRITE_REQUESTS = {'ADDINFO', 'ADDMANY', 'DELETEINFO', 'DELETEALL'}
+
+# request types answered by every storage, the others need the SQLite storage
+STORAGE_REQUESTS = {'GETALL', 'ADDINFO', 'ADDMANY', 'GETFORDATE', 'GETFORWAITDATE', 'DELETEINFO', 'DELETEALL',
+                    'GETDUEBETWEEN', 'GETASSIGNEDSINCE', 'GETALLPAGE', 'GETALLSTREAM', 'STATS'}
+
+# the largest page or chunk the server sends
+MAX_PAGE_SIZE = 1000
+
+# kinds of reply frames: `[request_id, kind, payload]`
+REPLY = 0 # the reply, or the end of a stream
+CHUNK = 1 # a chunk of a stream, more frames follow
+ERROR = 2 # the request failed, the payload is the error message
+PUSH = 3 # a change of the data sent to a subscription
+
+
+class RequestError(Exception):
+    """
+    Raised on the client when the server failed to answer a request.
+    """
+
+
+class Subscription:
+    """
+    The changes of the data pushed by the server to a subscription of an HWIClient.
+
+    Every change is a dict with the 'action' ('add', 'delete' or 'delete_all') and the
+    added or deleted 'rows' matching the filters of the subscription. The changes are
+    passed to the callback of the subscription, or else queued for iteration.
+
+    Attributes:
+        client (HWIClient): The client the subscription belongs to.
+        request_id (int): The ID of the SUBSCRIBE request, which tags the pushed changes.
+        callback (Callable[[dict], None] | None): Called with every change from the thread reading replies.
+        events (queue.Queue): The changes waiting to be iterated over.
+    """
+
+    def __init__(self, client: 'HWIClient', request_id: int, callback=None):
+        """
+        Initializes the Subscription.
+
+        Args:
+            client (HWIClient): The client the subscription belongs to.
+            request_id (int): The ID of the SUBSCRIBE request.
+            callback (Callable[[dict], None] | None): Called with every change. It runs on the thread
+                reading replies, so it must not wait for a reply of the same client. Defaults to None.
+        """
+        self.client = client
+        self.request_id = request_id
+        self.callback = callback
+        self.events = queue.Queue()
+
+    def deliver_(self, event: dict | Exception | None):
+        """
+        Hands a change to the callback or the queue.
+
+        An error raised by the callback is logged, so it never stops the thread reading replies.
+
+        Args:
+            event (dict | Exception | None): The change, the error ending the subscription, or None when it is closed.
+        """
+        if self.callback is not None and isinstance(event, dict):
+            try:
+                self.callback(event)
+            except Exception as error:
+                LogSubscriptionCallbackFailed(self.request_id, error)
+        else:
+            self.events.put(event)
+
+    def __iter__(self):
+        """
+        Waits for the changes and yields them until the subscription is closed.
+
+        Yields:
+            dict: The changes.
+
+        Raises:
+            ConnectionError: If the connection to the server is lost.
+        """
+        while (event := self.events.get()) is not None:
+            if isinstance(event, Exception):
+                raise event
+            yield event
+
+    def close(self):
+        """
+        Ends the subscription on the server and stops the iteration.
+        """
+        with self.client.pending_lock:
+            self.client.subscriptions.pop(self.request_id, None)
+        try:
+            self.client.request(Requests.UNSUBSCRIBE(self.request_id))
+        finally:
+            self.deliver_(None)
 
 class HWIClient(client.Client):
     """
     A client class for sending requests and receiving data.
 
+    Every request carries an ID and the server tags its replies with it, so many
+    requests can be in flight on one connection at once and their replies may come
+    back in any order: a background thread reads the replies and resolves the future
+    of the matching request.
+
     Attributes:
         name (str): The name of the client.
         id (uuid.UUID): A unique identifier for the client.
+        codecs (tuple[str, ...]): The codecs offered to the server, in order of preference.
+        codec (codec.Codec): The codec negotiated with the server.
+        pending (dict[int, Future | queue.Queue]): What waits for the replies of the requests in flight, by request ID.
+        pending_lock (Lock): Guards `pending` and `subscriptions`.
+        subscriptions (dict[int, Subscription]): The subscriptions receiving changes, by request ID.
+        send_lock (Lock): Serializes writes to the socket.
+        request_ids (itertools.count): The source of request IDs.
+        lost (Event): Set when the connection is lost; requests fail with a ConnectionError from then on.
     """
 
-    def __init__(self, host: str = utils.LOCAL_HOST, port: int = utils.LOCAL_PORT, name: str = "Unnamed"):
+    def __init__(self, host: str = utils.LOCAL_HOST, port: int = utils.LOCAL_PORT, name: str = "Unnamed",
+                 codecs: tuple[str, ...] = ('binary', 'json')):
         """
         Initializes the IDZClient.
 
@@ -150,276 +532,1951 @@ class HWIClient(client.Client):
             host (str): The host address. Defaults to utils.LOCAL_HOST.
             port (int): The port number. Defaults to utils.LOCAL_PORT.
             name (str): The name of the client. Defaults to "Unnamed".
+            codecs (tuple[str, ...]): The codecs offered to the server. Defaults to ('binary', 'json').
         """
         super().__init__(host, port)
         self.name = name
         self.id = uuid.uuid4()
+        self.codecs = codecs
+        self.codec = codec.CODECS[codec.DEFAULT_CODEC]
+        self.pending: dict[int, Future | queue.Queue] = {}
+        self.pending_lock = Lock()
+        self.subscriptions: dict[int, Subscription] = {}
+        self.send_lock = Lock()
+        self.request_ids = itertools.count(1)
+        self.lost = Event()
 
     def connect(self):
         """
-        Connects to the server and sends the client's name and ID.
+        Connects to the server, sends the client's name, ID and codecs, reads the negotiated codec
+        and starts the thread reading replies.
         """
         self.connect_()
-        self.send_string_(f'{self.name}|{self.id}')
+        self.handshake_()
 
-    def wait_data(self, buffer_size: int = 1024*15):
+    def open(self, timeout: float | None = 5.0):
         """
-        Waits for and receives data from the server.
+        Connects to the server like connect, but raises instead of ending the program when it fails.
 
         Args:
-            buffer_size (int): The size of the receive buffer. Defaults to 1024.
+            timeout (float | None): Seconds to wait for the connection. Defaults to 5.0.
 
-        Returns:
-            Any: The received data, parsed using literal_eval.
+        Raises:
+            ConnectionError: If the connection or the handshake fails.
         """
-        data = ''
-        while data == '':
-            data = self.socket.recv(buffer_size).decode()
-            string = literal_eval(data)
-        return string
+        self.open_(timeout)
+        self.handshake_()
 
-    def request(self, request: Requests):
+    def handshake_(self):
         """
-        Sends a request to the server and waits for a response if applicable.
+        Sends the client's name, ID and codecs, reads the negotiated codec and starts the thread reading replies.
 
-        Args:
-            request (Requests): The request to send.
-
-        Returns:
-            Any: The response data if the request is "getable", None otherwise.
+        Raises:
+            ConnectionError: If the server closed the connection or answered with an unknown codec.
         """
-        command = request()
-        self.send_string_(command)
-
-        # if request getable
-        if 'GETALL' in command:
-            return self.wait_data()
-        if 'GETFORDATE' in command:
-            return self.wait_data()
-        if 'GETFORWAITDATE' in command:
-            return self.wait_data()
-        if 'DELETEINFO' in command:
-            return self.wait_data()
-        if 'DELETEALL' in command:
-            return self.wait_data()
+        try:
+            protocol.send_frame(self.socket, f'{self.name}|{self.id}|{",".join(self.codecs)}'.encode())
+            self.codec = codec.CODECS[protocol.recv_frame(self.socket).decode()]
+        except (OSError, ValueError, KeyError, protocol.ProtocolError) as error:
+            raise ConnectionError(f'handshake with {self.host}:{self.port} failed: {error!r}') from error
+        self.lost.clear()
+        Thread(target=self.read_replies_, daemon=True).start()
 
+    def close(self):
+        """
+        Closes the connection to the server; the requests in flight fail with a ConnectionError.
+        """
+        self.lost.set()
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
 
-class HWIServer(server.Server):
-    """
-    A server class for handling client requests and database operations.
+    def read_replies_(self):
+        """
+        Continuously reads reply frames and hands them to the requests waiting for them.
 
-    Attributes:
-        data_base_connect: The database connection object.
-        data_base_cursor: The database cursor object.
-        requests (list): A list to store incoming requests.
-    """
+        However the reading ends, the connection is marked lost and every request in flight
+        and every subscription fails with a ConnectionError.
+        """
+        error = None
+        try:
+            while True:
+                request_id, kind, payload = self.codec.decode(protocol.recv_frame(self.socket))
+                if kind == PUSH:
+                    with self.pending_lock:
+                        subscription = self.subscriptions.get(request_id)
+                    if subscription is not None:
+                        subscription.deliver_(payload)
+                    continue
+                with self.pending_lock:
+                    waiter = self.pending.get(request_id) if kind == CHUNK else self.pending.pop(request_id, None)
+                if kind == ERROR:
+                    payload = RequestError(payload)
+                if isinstance(waiter, queue.Queue):
+                    waiter.put(None if kind == REPLY else payload)
+                elif kind == ERROR:
+                    waiter.set_exception(payload)
+                elif waiter is not None:
+                    waiter.set_result(payload)
+        except Exception as reason:
+            error = reason
+        finally:
+            with self.pending_lock:
+                self.lost.set()
+                waiters, self.pending = self.pending, {}
+                subscriptions, self.subscriptions = self.subscriptions, {}
+            for waiter in waiters.values():
+                lost = ConnectionError(f'connection to {self.host}:{self.port} lost: {error}')
+                if isinstance(waiter, queue.Queue):
+                    waiter.put(lost)
+                else:
+                    waiter.set_exception(lost)
+            for subscription in subscriptions.values():
+                subscription.deliver_(ConnectionError(f'connection to {self.host}:{self.port} lost: {error}'))
 
-    def __init__(self, host: str = utils.LOCAL_HOST, port: int = utils.LOCAL_PORT):
+    def prepare_(self, command: list) -> tuple[bytes, Future | queue.Queue]:
         """
-        Initializes the IDZServer.
+        Gives a request an ID and registers what will wait for its reply.
 
         Args:
-            host (str): The host address. Defaults to utils.LOCAL_HOST.
-            port (int): The port number. Defaults to utils.LOCAL_PORT.
-        """
-        super().__init__(host, port)
-        self.data_base_connect = None
-        self.data_base_cursor = None
-        self.requests = []
+            command (list): The request.
 
-    def clean_data_base(self) -> list[str]:
+        Returns:
+            tuple[bytes, Future | queue.Queue]: The encoded request, and a future resolved with the
+                reply, or a queue receiving the chunks if the request is streamed.
+
+        Raises:
+            ValueError: If the type of the request is unknown.
+            ConnectionError: If the connection is lost, so no request is written to a dead socket.
         """
-        Cleans the database by deleting all data.
+        check_request_type(command)
+        request_id = next(self.request_ids)
+        if get_request_type(command) in STREAMING_REQUESTS:
+            waiter = queue.Queue()
+        else:
+            waiter = Future()
+        with self.pending_lock:
+            self.check_lost_()
+            if get_request_type(command) in REPLYING_REQUESTS or get_request_type(command) in STREAMING_REQUESTS:
+                self.pending[request_id] = waiter
+            else:
+                waiter.set_result(None)
+        return self.codec.encode([request_id, command]), waiter
+
+    def check_lost_(self):
         """
-        self.create_data_base()
-        info = database.execute_delete_all(self.data_base_cursor, self.data_base_connect, 'Tasks')
-        return info
+        Fails a request made after the connection was lost, which no reply would ever resolve.
 
-    def create_data_base(self):
+        Raises:
+            ConnectionError: If the connection is lost.
         """
-        Creates or connects to the database and initializes the cursor.
+        if self.lost.is_set():
+            raise ConnectionError(f'connection to {self.host}:{self.port} lost')
+
+    def send_(self, payloads: list[bytes]):
         """
-        try:
-            self.data_base_connect = database.connect('tasks.db')
-            self.data_base_cursor = database.get_cursor(self.data_base_connect)
+        Sends encoded requests back to back.
 
-        except:
-            database.create('tasks.db')
-            self.data_base_connect = database.connect('tasks.db')
-            database.execute_table_create(database.get_cursor(self.data_base_connect), self.data_base_connect, 'Tasks', 
-                                        ['user','user_id','lesson', 'date', 'wait_date', 'text'],
-                                        [TEXT, TEXT, TEXT, TEXT, TEXT, TEXT]
-            )
-            self.data_base_cursor = database.get_cursor(self.data_base_connect)
+        Args:
+            payloads (list[bytes]): The encoded requests.
+        """
+        with self.send_lock:
+            protocol.send_frames(self.socket, payloads)
 
-    def wait_requests_(self, buffer_size: int = 1024, tick: int | float = 0.8):
+    @staticmethod
+    def wait_stream_(chunks: queue.Queue):
         """
-        Continuously listens for incoming requests from clients.
+        Receives the chunks of a streamed reply as they arrive.
 
         Args:
-            buffer_size (int): The size of the receive buffer. Defaults to 1024.
-            tick (int | float): The time to sleep between checks. Defaults to 0.8.
+            chunks (queue.Queue): The queue the chunks of the stream are put into.
+
+        Yields:
+            Any: The rows of the reply, one at a time.
         """
-        while True:
-            sleep(tick)
-            for client in self.clients:
-                try:
-                    command = client.obj.recv(buffer_size).decode()
-                    if 'end' in command:
-                        command = command.split('end')[0]
-                    if command != '':
-                        LogRecuestRecved(command)
-                        self.requests.append(f'{command}|{client.id}')
-                except:...
+        while (chunk := chunks.get()) is not None:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield from chunk
 
-    def request_add_info(self, request: str, client_id: str):
+    def submit(self, request: Requests):
         """
-        Handles the request to add information to the database.
+        Sends a request to the server without waiting for its response.
 
         Args:
-            request (str): The request string containing the information to add.
-            client_id (str): The ID of the client making the request.
+            request (Requests): The request to send, or a function returning it.
+
+        Returns:
+            Future: A future resolved with the response data if the request is "getable" and with
+                None otherwise; for a streamed request, a generator of rows instead.
         """
-        self.create_data_base()
-        info: list = literal_eval(request.split('*')[1])
-        info.insert(1, str(client_id))
-        database.execute_add_info(
-            self.data_base_cursor,
-            self.data_base_connect,
-            'Tasks',
-            info
-        )
-        LogInformationAdded(info)
+        command = request() if callable(request) else request
+        payload, waiter = self.prepare_(command)
+        self.send_([payload])
+        if isinstance(waiter, queue.Queue):
+            return self.wait_stream_(waiter)
+        return waiter
 
-    def get_client_by_id(self, client_id: str):
+    def request(self, request: Requests):
         """
-        Retrieves a client object by its ID.
+        Sends a request to the server and waits for a response if applicable.
 
         Args:
-            client_id (str): The ID of the client to retrieve.
+            request (Requests): The request to send, or a function returning it.
 
         Returns:
-            Client: The client object if found, None otherwise.
+            Any: The response data if the request is "getable", a generator of rows if the
+                request is streamed, None otherwise.
         """
-        for client in self.clients:
-            if client.id == client_id:
-                return client
+        reply = self.submit(request)
+        if isinstance(reply, Future):
+            return reply.result()
+        return reply
 
-    def request_get_all(self, request: str, client_id: str):
+    def pipeline(self, requests: list[Requests]) -> list:
         """
-        Handles the request to get all information from the database.
+        Sends many requests back to back and waits for all their responses.
+
+        All requests leave in a single write, without waiting for the server between them.
 
         Args:
-            request (str): The request string.
-            client_id (str): The ID of the client making the request.
+            requests (list[Requests]): The requests to send, or functions returning them.
+
+        Returns:
+            list: The response of each request, in order: the data if the request is "getable",
+                the list of rows if it is streamed, None otherwise.
+
+        Raises:
+            ValueError: If the type of a request is unknown, before any request is sent.
         """
-        self.create_data_base()
-        info = database.execute_get_all_info(self.data_base_cursor, self.data_base_connect, 'Tasks')
-        client = self.get_client_by_id(client_id)
-        client.obj.send(f'{info}'.encode())
+        commands = [request() if callable(request) else request for request in requests]
+        for command in commands:
+            check_request_type(command)
+        prepared = [self.prepare_(command) for command in commands]
+        self.send_([payload for payload, _ in prepared])
+        return [
+            list(self.wait_stream_(waiter)) if isinstance(waiter, queue.Queue) else waiter.result()
+            for _, waiter in prepared
+        ]
 
-    def request_get_for_data(self, request: str, client_id: str):
+    def iter_all(self, chunk_size: int = 500):
         """
-        Handles the request to get information for a specific date.
+        Iterates over all data, streamed from the server in chunks.
 
         Args:
-            request (str): The request string containing the date.
-            client_id (str): The ID of the client making the request.
-        """
-        self.create_data_base()
-        info = database.execute_get_all_info(self.data_base_cursor, self.data_base_connect, 'Tasks')
-        return_data = []
+            chunk_size (int): The maximum number of rows sent at once. Defaults to 500.
 
-        date = request.split('*')[1]
-        for inf in info:
-            if inf[3] == date:
-                return_data.append(inf)
-        LogInformationGetedForDate(date, client_id)
-        client = self.get_client_by_id(client_id)
-        client.obj.send(f'{return_data}'.encode())
+        Returns:
+            Generator: The rows, yielded as they arrive.
+        """
+        return self.request(Requests.GET_ALL_STREAM(chunk_size))
 
-    def request_get_for_wait_date(self, request: str, client_id: str):
+    def subscribe(self, lesson: str | None = None, user: str | None = None, wait_date: str | None = None,
+                  callback=None) -> Subscription:
         """
-        Handles the request to get information for a specific wait date.
+        Subscribes to the changes of the data, instead of polling for them.
 
         Args:
-            request (str): The request string containing the wait date.
-            client_id (str): The ID of the client making the request.
+            lesson (str | None): Only the changes of this lesson. Defaults to None, any lesson.
+            user (str | None): Only the changes of this user. Defaults to None, any user.
+            wait_date (str | None): Only the changes due on this date. Defaults to None, any date.
+            callback (Callable[[dict], None] | None): Called with every change, see Subscription.
+                Defaults to None, the changes are iterated over instead.
+
+        Returns:
+            Subscription: The subscription, to iterate over and to close.
         """
-        self.create_data_base()
-        info = database.execute_get_all_info(self.data_base_cursor, self.data_base_connect, 'Tasks')
-        return_data = []
+        request_id = next(self.request_ids)
+        subscription = Subscription(self, request_id, callback)
+        waiter = Future()
+        with self.pending_lock:
+            self.check_lost_()
+            self.pending[request_id] = waiter
+            self.subscriptions[request_id] = subscription
+        self.send_([self.codec.encode([request_id, Requests.SUBSCRIBE(lesson, user, wait_date)()])])
+        try:
+            waiter.result()
+        except Exception:
+            with self.pending_lock:
+                self.subscriptions.pop(request_id, None)
+            raise
+        return subscription
+
 
-        date = request.split('*')[1]
-        for inf in info:
-            if inf[4] == date:
-                return_data.append(inf)
-        client = self.get_client_by_id(client_id)
-        client.obj.send(f'{return_data}'.encode())
+class HWIClientPool:
+    """
+    Connected HWIClients shared by many threads.
+
+    The connections are opened and handshaken once, so a request pays neither for the
+    TCP setup nor for the handshake. Every request checks a connection out of the pool
+    and gives it back when its reply has arrived. A connection found lost is replaced,
+    retrying with exponential backoff, and a read whose connection is lost is sent
+    again on another one. Writes are never sent twice: the server may have applied
+    them before the connection was lost, so they fail with a ConnectionError instead.
+
+    Attributes:
+        host (str): The host address of the server.
+        port (int): The port of the server.
+        name (str): The name of the clients.
+        size (int): The number of connections.
+        codecs (tuple[str, ...]): The codecs offered to the server.
+        timeout (float): Seconds to wait for a connection to be opened.
+        retries (int): The number of attempts to open a connection, and to send a read.
+        backoff (float): Seconds to wait after the first failed attempt, doubled after every other.
+        max_backoff (float): The longest wait between two attempts, in seconds.
+        idle (queue.Queue[HWIClient | None]): The connections not checked out, None for a slot to reconnect.
+    """
 
-    def request_delete_info(self, request: str, client_id: str):
+    def __init__(self, host: str = utils.LOCAL_HOST, port: int = utils.LOCAL_PORT, name: str = "Unnamed",
+                 size: int = 4, codecs: tuple[str, ...] = ('binary', 'json'), timeout: float = 5.0,
+                 retries: int = 5, backoff: float = 0.05, max_backoff: float = 2.0):
         """
-        Handles the request to delete information from the database.
+        Initializes the HWIClientPool; no connection is opened before connect.
+
         Args:
-            request (str): The request string containing the information to delete.
-            client_id (str): The ID of the client making the request.
+            host (str): The host address. Defaults to utils.LOCAL_HOST.
+            port (int): The port number. Defaults to utils.LOCAL_PORT.
+            name (str): The name of the clients. Defaults to "Unnamed".
+            size (int): The number of connections. Defaults to 4.
+            codecs (tuple[str, ...]): The codecs offered to the server. Defaults to ('binary', 'json').
+            timeout (float): Seconds to wait for a connection to be opened. Defaults to 5.0.
+            retries (int): The number of attempts to open a connection, and to send a read. Defaults to 5.
+            backoff (float): Seconds to wait after the first failed attempt. Defaults to 0.05.
+            max_backoff (float): The longest wait between two attempts, in seconds. Defaults to 2.0.
         """
-        name, date = request.split('*')[1].split('~')
-        self.create_data_base()
-        info = database.execute_delete_info(
-            self.data_base_cursor,
-            self.data_base_connect,
-            'Tasks',
-            name,
-            date
-        )
-        print(info)
-        client = self.get_client_by_id(client_id)
-        client.obj.send(f'{info}'.encode())
+        self.host = host
+        self.port = port
+        self.name = name
+        self.size = size
+        self.codecs = codecs
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idle: queue.Queue[HWIClient | None] = queue.Queue()
 
-    def request_delete_all(self, request: str, client_id: str):
+    def connect(self):
         """
-        Handles the request to delete all information from the database.
-        Args:
-            request (str): The request string.
-            client_id (str): The ID of the client making the request.
+        Opens every connection of the pool.
+
+        Raises:
+            ConnectionError: If a connection can not be opened after all the retries.
         """
-        self.create_data_base()
-        info = database.execute_delete_all(self.data_base_cursor, self.data_base_connect, 'Tasks')
-        
-        client = self.get_client_by_id(client_id)
-        client.obj.send(f'{info}'.encode())
+        for _ in range(self.size):
+            self.idle.put(self.open_())
 
-    
+    def open_(self) -> HWIClient:
+        """
+        Opens and handshakes a new connection, retrying with exponential backoff.
+
+        Returns:
+            HWIClient: The connected client.
+
+        Raises:
+            ConnectionError: If the last attempt fails.
+        """
+        for attempt in range(self.retries):
+            client = HWIClient(self.host, self.port, self.name, self.codecs)
+            try:
+                client.open(self.timeout)
+                return client
+            except ConnectionError:
+                client.close()
+                if attempt == self.retries - 1:
+                    raise
+                time.sleep(min(self.backoff * 2 ** attempt, self.max_backoff))
+
+    @contextmanager
+    def connection(self):
+        """
+        Checks a connection out of the pool for the duration of a with block.
+
+        A connection raising an OSError in the block, such as a ConnectionError or the
+        BrokenPipeError of a write to a dead socket, is closed and opened again at its next checkout.
+
+        Yields:
+            HWIClient: A connected client, used by the current thread only until the block ends.
+
+        Raises:
+            ConnectionError: If a lost connection can not be opened again.
+        """
+        client = self.idle.get()
+        try:
+            if client is None or client.lost.is_set():
+                if client is not None:
+                    client.close()
+                client = None
+                client = self.open_()
+            try:
+                yield client
+            except OSError:
+                client.close()
+                client = None
+                raise
+        finally:
+            self.idle.put(client)
+
+    def request(self, request: Requests):
+        """
+        Sends a request on a connection of the pool and waits for a response if applicable.
+
+        Args:
+            request (Requests): The request to send, or a function returning it.
+
+        Returns:
+            Any: The response data if the request is "getable", the list of rows if it is
+                streamed, None otherwise.
+
+        Raises:
+            ConnectionError: If a write lost its connection, or a read lost all the connections it was sent on.
+        """
+        command = request() if callable(request) else request
+        for attempt in range(self.retries):
+            with self.connection() as client:
+                try:
+                    reply = client.request(command)
+                    if get_request_type(command) in STREAMING_REQUESTS:
+                        reply = list(reply)
+                    return reply
+                except OSError as error:
+                    client.close()
+                    if get_request_type(command) in WRITE_REQUESTS or attempt == self.retries - 1:
+                        if isinstance(error, ConnectionError):
+                            raise
+                        raise ConnectionError(f'connection to {self.host}:{self.port} lost: {error!r}') from error
+
+    def close(self):
+        """
+        Closes the connections that are not checked out.
+        """
+        while not self.idle.empty():
+            client = self.idle.get()
+            if client is not None:
+                client.close()
+
+
+class HWIRequestHandler_:
+    """
+    Request handlers shared by the thread-based and the asyncio-based servers.
+
+    Every handler receives the decoded request and the id of the client that sent it
+    and returns the data to send back, or None if the request has no reply. The write
+    handlers hand their writes to the storage and return a Future resolved with the
+    reply once the write is stored, for SQLite once the batch holding it is committed.
+
+    The requests of STORAGE_REQUESTS are answered by any storage, the others read the
+    SQLite database directly and fail with another storage.
+
+    Attributes:
+        data_base_file (str): The name of the database file.
+        data_base_readers (int): The number of reader connections in the pool.
+        data_base_timeout (float): Seconds a connection waits for a lock held by another connection or process.
+        data_base_synchronous (str): The `PRAGMA synchronous` level writes are committed at, see
+            database.SYNCHRONOUS_LEVELS.
+        group_commit_window (float): The seconds the group writer waits for more writes to batch.
+        group_commit_size (int): The maximum number of writes committed in one batch.
+        changes_retention (int): The number of latest versions kept in the change log; a client
+            holding an older version gets the whole table from Requests.GET_CHANGES_SINCE.
+        storage (storage.Storage | None): The storage of the Tasks table, an SQLiteStorage of
+            `data_base_file` unless another one is given.
+        data_base (database.ConnectionPool | None): The pool of database connections of an SQLiteStorage.
+        stats (stats.Stats | None): The timing statistics of the server, if it keeps them.
+    """
+
+    data_base_file = 'tasks.db'
+    data_base_readers = 4
+    data_base_timeout = 5.0
+    data_base_synchronous = 'NORMAL'
+    group_commit_window = 0.002
+    group_commit_size = 512
+    changes_retention = 100_000
+    storage = None
+    data_base = None
+    stats = None
+
+    def on_change_(self, action: str, rows: list[Task] | None):
+        """
+        Called by the storage, under its writer, for every stored change of the Tasks table.
+
+        Args:
+            action (str): 'add', 'delete' or 'delete_all'.
+            rows (list[Task] | None): The added or deleted rows as stored, with date keys; None for 'delete_all'.
+        """
+
+    def raw_text_(self, client_id: str) -> bool:
+        """
+        Tells whether the rows sent to a client are read with their text as UTF-8 bytes, see codec.TextRows.
+
+        Only codecs writing the bytes as they are gain from it, so by default the text is read as str.
+
+        Args:
+            client_id (str): The ID of the client.
+
+        Returns:
+            bool: True to read the text as bytes.
+        """
+        return False
+
+    def clean_data_base(self) -> list[str]:
+        """
+        Cleans the database by deleting all data.
+        """
+        self.create_data_base()
+        return self.error_reply_(self.storage.delete_all(lambda result: ['Delete success']), ['Delete error']).result()
+
+    def create_data_base(self):
+        """
+        Opens the storage, by default creating or connecting to the database file.
+
+        The storage is opened once and kept for the lifetime of the server. With an
+        SQLiteStorage, its connection pool is also kept as `data_base` for the requests
+        reading the database directly.
+        """
+        if self.storage is None:
+            self.storage = storage.SQLiteStorage(self.data_base_file, self.data_base_readers, self.data_base_timeout,
+                                                 self.data_base_synchronous, self.group_commit_window,
+                                                 self.group_commit_size, self.changes_retention)
+        self.storage.open()
+        if isinstance(self.storage, storage.SQLiteStorage) and self.data_base is None:
+            self.data_base = self.storage.pool
+            if self.stats is not None:
+                self.data_base.timing_hook = self.stats.record_current
+                # the group writer runs in its own thread, so it times every write under the request making it
+                self.storage.writer.label_hook = self.stats.current_type
+                self.storage.writer.timing_hook = self.stats.record
+
+    @staticmethod
+    def error_reply_(future: Future, error_reply: list[str]) -> Future:
+        """
+        Answers a failed write with an error message instead of an error.
+
+        Args:
+            future (Future): The future of the write.
+            error_reply (list[str]): The reply of a failed write.
+
+        Returns:
+            Future: Resolved with the result of the write, or with the error reply if it failed.
+        """
+        reply = Future()
+
+        def resolve(future: Future):
+            reply.set_result(error_reply if future.exception() is not None else future.result())
+
+        future.add_done_callback(resolve)
+        return reply
+
+    def request_add_info(self, request: list, client_id: str) -> Future:
+        """
+        Handles the request to add information to the database.
+
+        Args:
+            request (list): The request containing the information to add.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            Future: Resolved with a list containing a success message once the row is committed,
+                or failed with the error of the write.
+        """
+        user, lesson, date, wait_date, text = request[1]
+        info = Task(user, str(client_id), lesson, database.date_to_key(date), database.date_to_key(wait_date), text)
+
+        def committed(result):
+            self.on_change_('add', [info])
+            LogInformationAdded(info)
+            return ['Add success']
+
+        return self.storage.insert([info], committed)
+
+    def request_add_many(self, request: list, client_id: str) -> Future:
+        """
+        Handles the request to add many rows of information in a single transaction.
+
+        Args:
+            request (list): The request containing the rows to add.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            Future: Resolved with a list containing a success or error message.
+        """
+        infos = [
+            Task(user, str(client_id), lesson, database.date_to_key(date), database.date_to_key(wait_date), text)
+            for user, lesson, date, wait_date, text in request[1]
+        ]
+
+        def committed(result):
+            if infos:
+                self.on_change_('add', infos)
+            LogInformationAdded(f'{len(infos)} rows')
+            return ['Add success']
+
+        return self.error_reply_(self.storage.insert(infos, committed), ['Add error'])
+
+    def request_get_all(self, request: list, client_id: str) -> list:
+        """
+        Handles the request to get all information from the database.
+
+        Args:
+            request (list): The request.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            list: All rows of the Tasks table.
+        """
+        return codec.TextRows(self.storage.get_all(raw=self.raw_text_(client_id)))
+
+    def request_get_for_data(self, request: list, client_id: str) -> list:
+        """
+        Handles the request to get information for a specific date.
+
+        Args:
+            request (list): The request containing the date.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            list: The rows given on the date.
+        """
+        date = request[1]
+        return_data = codec.TextRows(
+            self.storage.get_for_date(database.date_to_key(date), raw=self.raw_text_(client_id)))
+        LogInformationGetedForDate(date, client_id)
+        return return_data
+
+    def request_get_for_wait_date(self, request: list, client_id: str) -> list:
+        """
+        Handles the request to get information for a specific wait date.
+
+        Args:
+            request (list): The request containing the wait date.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            list: The rows due on the wait date.
+        """
+        date = request[1]
+        return codec.TextRows(
+            self.storage.get_for_wait_date(database.date_to_key(date), raw=self.raw_text_(client_id)))
+
+    def request_delete_info(self, request: list, client_id: str) -> Future:
+        """
+        Handles the request to delete information from the database.
+        Args:
+            request (list): The request containing the information to delete.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            Future: Resolved with a list containing a success or error message.
+        """
+        name, date = request[1], database.date_to_key(request[2])
+
+        def committed(deleted):
+            if deleted:
+                self.on_change_('delete', deleted)
+            LogInformationDeleted(name, date)
+            return ['Delete success']
+
+        return self.error_reply_(self.storage.delete(name, date, committed), ['Delete error'])
+
+    def request_delete_all(self, request: list, client_id: str) -> Future:
+        """
+        Handles the request to delete all information from the database.
+        Args:
+            request (list): The request.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            Future: Resolved with a list containing a success or error message.
+        """
+        def committed(result):
+            self.on_change_('delete_all', None)
+            LogAllInformationDeleted()
+            return ['Delete success']
+
+        return self.error_reply_(self.storage.delete_all(committed), ['Delete error'])
+
+    def request_get_due_between(self, request: list, client_id: str) -> list:
+        """
+        Handles the request to get information due between two dates.
+
+        Args:
+            request (list): The request containing the first and the last wait date.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            list: The rows due in the range, ordered by wait date.
+        """
+        start, end = database.date_to_key(request[1]), database.date_to_key(request[2])
+        return codec.TextRows(self.storage.get_due_between(start, end, raw=self.raw_text_(client_id)))
+
+    def request_get_assigned_since(self, request: list, client_id: str) -> list:
+        """
+        Handles the request to get information given on or after a date.
+
+        Args:
+            request (list): The request containing the date.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            list: The rows given since the date, ordered by date.
+        """
+        date = database.date_to_key(request[1])
+        return codec.TextRows(self.storage.get_assigned_since(date, raw=self.raw_text_(client_id)))
+
+    def request_get_all_page(self, request: list, client_id: str) -> dict:
+        """
+        Handles the request to get one page of all information.
+
+        The cursor token is the id of the last row sent, so the storage finds the next
+        page with a seek on the id instead of skipping the rows already sent.
+
+        Args:
+            request (list): The request containing the cursor token and the page size.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            dict: The 'rows' of the page and the 'cursor' token of the next page, None after the last page.
+        """
+        after = int(request[1]) if request[1] else 0
+        page_size = max(1, min(request[2], MAX_PAGE_SIZE))
+        page = self.storage.get_page(after, page_size, raw=self.raw_text_(client_id))
+        return {
+            'rows': codec.TextRows(row[1:] for row in page),
+            'cursor': str(page[-1][0]) if len(page) == page_size else None,
+        }
+
+    def request_get_all_stream(self, request: list, client_id: str):
+        """
+        Handles the request to stream all information in chunks.
+
+        The chunks are read one after another by the storage. With SQLite, the position
+        of the stream is kept as the id of the last row sent and a reader connection
+        is only held while a chunk is read, never while the client receives it, so slow
+        clients and many open streams can not exhaust the connection pool.
+
+        Args:
+            request (list): The request containing the chunk size.
+            client_id (str): The ID of the client making the request.
+
+        Yields:
+            list: The chunks of rows.
+        """
+        chunk_size = max(1, min(request[1], MAX_PAGE_SIZE))
+        for chunk in self.storage.iterate(chunk_size, raw=self.raw_text_(client_id)):
+            yield codec.TextRows(chunk)
+
+    def request_query(self, request: list, client_id: str) -> list:
+        """
+        Handles the request to get the information matching a filter.
+
+        The filter is compiled into one parameterized statement per shape, see database.compile_query.
+
+        Args:
+            request (list): The request containing the filter, the columns, the ordering and the limit.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            list: The matching rows, each holding the selected columns.
+
+        Raises:
+            ValueError: If the filter, the columns or the ordering is not allowed.
+        """
+        where, columns, order_by, descending, limit = request[1:]
+        conditions, parameters = database.parse_filter(where or {})
+        command = database.compile_query('Tasks', conditions, tuple(columns or database.QUERY_COLUMNS),
+                                         order_by, bool(descending), limit is not None)
+        if limit is not None:
+            parameters.append(max(0, int(limit)))
+        with self.data_base.reader(raw=self.raw_text_(client_id)) as (cursor, connect):
+            return codec.TextRows(database.execute_query(cursor, connect, command, parameters))
+
+    def request_search(self, request: list, client_id: str) -> list:
+        """
+        Handles the request to search the text and the lesson of the information.
+
+        Args:
+            request (list): The request containing the query, the lesson or None and the maximum number of rows.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            list: The matching rows, best match first; empty if the query holds no word.
+        """
+        match = database.fts_match(request[1])
+        if not match:
+            return []
+        limit = max(1, min(request[3], MAX_PAGE_SIZE))
+        with self.data_base.reader(raw=self.raw_text_(client_id)) as (cursor, connect):
+            return codec.TextRows(database.execute_search(cursor, connect, 'Tasks', match, limit, request[2],
+                                                          database.TASK_COLUMNS))
+
+    def request_stats(self, request: list, client_id: str) -> dict:
+        """
+        Handles the request to get the timing statistics of the server.
+
+        Args:
+            request (list): The request.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            dict: The snapshot of the statistics, empty if the server keeps none.
+        """
+        return self.stats.snapshot() if self.stats is not None else {}
+
+    def request_get_changes_since(self, request: list, client_id: str) -> dict:
+        """
+        Handles the request to get the changes of the data after a version of the change log.
+
+        Every change is [action, row_id, user, user_id, lesson, date, wait_date, text] with the
+        action 'add', 'delete' or 'delete_all' (whose other fields are None). Rows are identified
+        by their row_id, so a copy of the data is brought up to date by applying the changes in
+        order. When the version is unknown to the log the whole table is sent instead, as
+        [row_id, user, user_id, lesson, date, wait_date, text] rows, with 'reset' set.
+
+        Args:
+            request (list): The request containing the version and the maximum number of changes.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            dict: The 'version' to ask from next time, 'reset', the 'rows' and the 'changes',
+                and 'more' if the changes were cut at the limit.
+        """
+        version = int(request[1] or 0)
+        limit = max(1, min(request[2], MAX_PAGE_SIZE))
+        with self.data_base.reader(raw=self.raw_text_(client_id)) as (cursor, connect):
+            found = database.execute_get_changes_since(cursor, connect, 'Tasks', version, limit,
+                                                       database.TASK_COLUMNS)
+        if 'rows' in found:
+            return {'version': found['latest'], 'reset': True, 'rows': codec.TextRows(found['rows']),
+                    'changes': [], 'more': False}
+        changes = found['changes']
+        more = len(changes) == limit and changes[-1][0] < found['latest']
+        return {
+            'version': changes[-1][0] if more else found['latest'],
+            'reset': False,
+            'rows': [],
+            'changes': codec.TextRows(change[1:] for change in changes),
+            'more': more,
+        }
+
+    def handle_request_(self, command: list, client_id: str):
+        """
+        Dispatches a request to its handler.
+
+        Args:
+            command (list): The decoded request.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            Any: The reply of the handler, a generator of reply chunks if the request
+                is streamed, or None if the request has no reply.
+
+        Raises:
+            ValueError: If the type of the request is unknown, or needs the SQLite storage
+                the server does not use.
+        """
+        handler = {
+            'GETALL': self.request_get_all,
+            'ADDINFO': self.request_add_info,
+            'ADDMANY': self.request_add_many,
+            'GETFORDATE': self.request_get_for_data,
+            'GETFORWAITDATE': self.request_get_for_wait_date,
+            'DELETEINFO': self.request_delete_info,
+            'DELETEALL': self.request_delete_all,
+            'GETDUEBETWEEN': self.request_get_due_between,
+            'GETASSIGNEDSINCE': self.request_get_assigned_since,
+            'GETALLPAGE': self.request_get_all_page,
+            'GETALLSTREAM': self.request_get_all_stream,
+            'GETCHANGESSINCE': self.request_get_changes_since,
+            'SEARCH': self.request_search,
+            'QUERY': self.request_query,
+            'STATS': self.request_stats,
+        }.get(get_request_type(command))
+        if handler is None:
+            raise ValueError(f'unknown request type {get_request_type(command)!r}')
+        if self.data_base is None and get_request_type(command) not in STORAGE_REQUESTS:
+            raise ValueError(f'{get_request_type(command)} needs the SQLite storage, '
+                             f'not the {self.storage.name} storage')
+        return handler(command, client_id)
+
+
+class PendingRequest_:
+    """
+    A request received by HWIServer, not answered yet.
+
+    A request waits for some earlier requests of its connection. Instead of parking a
+    worker on them, it counts the ones left and is queued for the workers by the last
+    of them to finish.
+
+    Attributes:
+        client (server.ServerClient_): The client that sent the request.
+        request_id (int): The ID the client gave the request.
+        command (list): The decoded request.
+        started (float): When the request was received, as time.perf_counter().
+        queued (float): When the request was decoded.
+        ready (float): When the earlier requests it waits for were finished.
+        waiting (int): The number of earlier requests it still waits for.
+        dependents (list[PendingRequest_]): The later requests waiting for it.
+    """
+
+    __slots__ = ('client', 'request_id', 'command', 'started', 'queued', 'ready', 'waiting', 'dependents')
+
+    def __init__(self, client: server.ServerClient_, request_id: int, command: list, started: float, queued: float):
+        """
+        Initializes a PendingRequest_ waiting for nothing yet.
+
+        Args:
+            client (server.ServerClient_): The client that sent the request.
+            request_id (int): The ID the client gave the request.
+            command (list): The decoded request.
+            started (float): When the request was received, as time.perf_counter().
+            queued (float): When the request was decoded.
+        """
+        self.client = client
+        self.request_id = request_id
+        self.command = command
+        self.started = started
+        self.queued = queued
+        self.ready = queued
+        self.waiting = 0
+        self.dependents: list[PendingRequest_] = []
+
+
+class HWIServer(server.Server, HWIRequestHandler_):
+    """
+    A server class for handling client requests and database operations.
+
+    The I/O loop decodes the requests and puts them into a blocking queue drained by a
+    pool of worker threads. Reads run in parallel on the reader connections of the
+    pool while writes are serialized by its writer. A write waits for the earlier
+    requests of its connection and a read waits for the last earlier write, so a
+    client reads its own writes; a waiting request is only queued for the workers
+    once the requests it waits for are finished, so it never holds a worker, and
+    replies are sent without blocking, see server.Server.send_. A write handed to the group writer frees its worker
+    and is answered, and its connection released to the following requests, once
+    its batch is committed, so the writes of many clients share one commit.
+
+    The Tasks table is kept by a storage, an SQLiteStorage of `data_base_file` by
+    default; a MemoryStorage serves the requests of STORAGE_REQUESTS from memory.
+
+    Every request is timed stage by stage into `stats`, which clients read with
+    Requests.STATS and which can be logged periodically.
+
+    Clients can subscribe to the changes of the Tasks table: every committed change is
+    queued by the write handler and a publisher thread pushes it to the matching
+    subscriptions, so a slow subscriber never holds up writes. When `changes_poll` is
+    set the changes are instead read from the change log of the database every
+    `changes_poll` seconds, so the writes of other processes sharing the database,
+    see PreforkHWIServer, are pushed too.
+
+    Attributes:
+        data_base_file (str): The name of the database file.
+        storage (storage.Storage | None): The storage of the Tasks table.
+        data_base (database.ConnectionPool | None): The pool of database connections of an SQLiteStorage.
+        workers (int): The number of worker threads answering requests.
+        requests (queue.Queue[PendingRequest_]): The requests ready for a worker.
+        cache_size (int): The maximum number of cached replies, 0 disables the cache.
+        cache (OrderedDict[tuple, bytes]): The encoded replies of CACHED_REQUESTS, least recently used first.
+        cache_lock (Lock): Guards the cache and its counters.
+        cache_generation (int): Incremented on every change, so a reply read before a change is not cached.
+        cache_hits (int): The number of requests answered from the cache.
+        cache_misses (int): The number of cacheable requests answered from the database.
+        stats (stats.Stats): The timing statistics of the requests.
+        stats_interval (float): The seconds between two logs of the statistics, 0 to never log them.
+        subscriptions (dict[str, dict[int, tuple]]): The client, lesson, user and wait date key of every
+            subscription, by client ID and request ID.
+        subscriptions_lock (Lock): Guards `subscriptions`.
+        pushes (queue.Queue): The changes waiting to be pushed to the subscriptions.
+        changes_poll (float): The seconds between two reads of the change log for the subscriptions,
+            0 to push the changes of this server only, as they are committed.
+    """
+
+    def __init__(self, host: str = utils.LOCAL_HOST, port: int = utils.LOCAL_PORT, data_base_file: str = 'tasks.db',
+                 workers: int = 4, cache_size: int = 1024, stats_interval: float = 0, reuse_port: bool = False,
+                 synchronous: str = 'NORMAL', storage: storage.Storage | None = None):
+        """
+        Initializes the IDZServer.
+
+        Args:
+            host (str): The host address. Defaults to utils.LOCAL_HOST.
+            port (int): The port number. Defaults to utils.LOCAL_PORT.
+            data_base_file (str): The name of the database file. Defaults to 'tasks.db'.
+            workers (int): The number of worker threads answering requests. Defaults to 4.
+            cache_size (int): The maximum number of cached replies, 0 disables the cache. Defaults to 1024.
+            stats_interval (float): The seconds between two logs of the statistics, 0 to never log them. Defaults to 0.
+            reuse_port (bool): Listen with SO_REUSEPORT, see PreforkHWIServer. Defaults to False.
+            synchronous (str): The `PRAGMA synchronous` level writes are acknowledged at, see
+                database.SYNCHRONOUS_LEVELS. Defaults to 'NORMAL'.
+            storage (storage.Storage | None): The storage of the Tasks table, None for an
+                SQLiteStorage of `data_base_file`. Defaults to None.
+        """
+        super().__init__(host, port, reuse_port)
+        self.data_base_file = data_base_file
+        self.storage = storage
+        self.data_base = None
+        self.data_base_synchronous = synchronous
+        self.data_base_readers = workers
+        self.workers = workers
+        self.requests = queue.Queue()
+        self.cache_size = cache_size
+        self.cache: OrderedDict[tuple, bytes] = OrderedDict()
+        self.cache_lock = Lock()
+        self.cache_generation = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.stats = stats.Stats()
+        self.stats_interval = stats_interval
+        self.subscriptions: dict[str, dict[int, tuple]] = {}
+        self.subscriptions_lock = Lock()
+        self.pushes = queue.Queue()
+        self.changes_poll = 0.0
+
+    def on_request_(self, client: server.ServerClient_, payload: memoryview):
+        """
+        Decodes a request received by the I/O loop and queues it for the workers.
+
+        A request that can not be decoded or has not the shape of a request is dropped,
+        answered with an error if its ID could be read.
+
+        Args:
+            client (server.ServerClient_): The client that sent the request.
+            payload (memoryview): The encoded request.
+        """
+        started = time.perf_counter()
+        request = None
+        try:
+            request = client.codec.decode(payload)
+            request_id, command = parse_request(request)
+        except Exception as error:
+            LogRequestFailed(bytes(payload), error)
+            if isinstance(request, list) and request and type(request[0]) is int:
+                try:
+                    self.send_(client, client.codec.encode([request[0], ERROR, str(error)]))
+                except OSError:...
+            return
+        queued = time.perf_counter()
+        self.stats.record(get_request_type(command), 'decode', queued - started)
+        self.stats.count(get_request_type(command), 'requests')
+        LogRecuestRecved(command)
+        pending = PendingRequest_(client, request_id, command, started, queued)
+        with client.order_lock:
+            if get_request_type(command) in WRITE_REQUESTS:
+                after = list(client.in_flight)
+                client.last_write = pending
+            else:
+                after = [client.last_write] if client.last_write is not None else []
+            for earlier in after:
+                earlier.dependents.append(pending)
+            pending.waiting = len(after)
+            client.in_flight.add(pending)
+        if not after:
+            self.requests.put(pending)
+
+    def get_client_by_id(self, client_id: str):
+        """
+        Retrieves a client object by its ID.
+
+        Args:
+            client_id (str): The ID of the client to retrieve.
+
+        Returns:
+            Client: The client object if found, None otherwise.
+        """
+        return self.clients.get(client_id)
 
     def request_parse_(self):
         """
-        Continuously parses and handles incoming requests.
+        Answers queued requests one after another, blocking while the queue is empty.
         """
         while True:
-            
-            if len(self.requests) > 0:
-                request = self.requests.pop(0)
-                command, client_id = request.split('|')
-               
-               
-                if get_request_type(command) == 'GETALL':
-                    self.request_get_all(command, client_id)
-                if get_request_type(command) == 'ADDINFO':
-                    self.recuest_add_info(command, client_id)
-                if get_request_type(command) == 'GETFORDATE':
-                    self.request_get_for_data(command, client_id)
-                if get_request_type(command) == 'GETFORWAITDATE':
-                    self.request_get_for_wait_date(command, client_id)
-                if get_request_type(command) == 'DELETEINFO':
-                    self.request_delete_info(command, client_id)
-                if get_request_type(command) == 'DELETEALL':
-                    self.request_delete_all(command, client_id)
-                
+            request = self.requests.get()
+            dequeued = time.perf_counter()
+            request_type = get_request_type(request.command)
+            self.stats.record(request_type, 'wait', request.ready - request.queued)
+            self.stats.record(request_type, 'queue', dequeued - request.ready)
+            pending = None
+            try:
+                pending = self.answer_(request.client, request.request_id, request.command)
+            finally:
+                if pending is None:
+                    self.finish_(request)
+            if pending is not None:
+                pending.add_done_callback(partial(self.finish_, request))
+
+    def finish_(self, request: PendingRequest_, pending: Future | None = None):
+        """
+        Finishes an answered request and queues the later requests of its client that waited only for it.
+
+        Args:
+            request (PendingRequest_): The answered request.
+            pending (Future | None): The write future of the request, once resolved. Defaults to None.
+        """
+        client = request.client
+        with client.order_lock:
+            client.in_flight.discard(request)
+            if client.last_write is request:
+                client.last_write = None
+            ready = []
+            for dependent in request.dependents:
+                dependent.waiting -= 1
+                if not dependent.waiting:
+                    ready.append(dependent)
+        finished = time.perf_counter()
+        for dependent in ready:
+            dependent.ready = finished
+            self.requests.put(dependent)
+        self.stats.record(get_request_type(request.command), 'total', finished - request.started)
+
+    def answer_(self, client: server.ServerClient_, request_id: int, command: list) -> Future | None:
+        """
+        Handles a single request and sends its reply.
+
+        A failed request is answered with an error instead of stopping the worker.
+
+        Args:
+            client (server.ServerClient_): The client that sent the request.
+            request_id (int): The ID the client gave the request.
+            command (list): The decoded request.
+
+        Returns:
+            Future | None: The write future of the request, answered once it is resolved;
+                None if the request is already answered.
+        """
+        request_type = get_request_type(command)
+        self.stats.begin(request_type)
+        try:
+            if request_type in SUBSCRIPTION_REQUESTS:
+                self.reply_(client, request_type, [request_id, REPLY, self.subscribe_(client, request_id, command)])
+                return
+            if self.cache_size and request_type in CACHED_REQUESTS:
+                self.answer_cached_(client, request_id, command)
+                return
+            started = time.perf_counter()
+            info = self.handle_request_(command, client.id)
+            self.stats.record(request_type, 'dispatch', time.perf_counter() - started)
+            if isinstance(info, Future):
+                info.add_done_callback(partial(self.answer_write_, client, request_id, command))
+                return info
+            if request_type in REPLYING_REQUESTS:
+                self.reply_(client, request_type, [request_id, REPLY, info])
+            if request_type in STREAMING_REQUESTS:
+                for chunk in info:
+                    self.reply_(client, request_type, [request_id, CHUNK, chunk])
+                self.reply_(client, request_type, [request_id, REPLY, []])
+        except OSError:...
+        except Exception as error:
+            self.answer_error_(client, request_id, command, error)
+        finally:
+            self.stats.begin(None)
+
+    def answer_write_(self, client: server.ServerClient_, request_id: int, command: list, pending: Future):
+        """
+        Sends the reply of a write once its batch is committed, called by the group writer.
+
+        Args:
+            client (server.ServerClient_): The client that sent the request.
+            request_id (int): The ID the client gave the request.
+            command (list): The decoded request.
+            pending (Future): The resolved write future of the request.
+        """
+        request_type = get_request_type(command)
+        try:
+            info = pending.result()
+            if request_type in REPLYING_REQUESTS:
+                self.reply_(client, request_type, [request_id, REPLY, info])
+        except OSError:...
+        except Exception as error:
+            self.answer_error_(client, request_id, command, error)
+
+    def answer_error_(self, client: server.ServerClient_, request_id: int, command: list, error: Exception):
+        """
+        Counts and logs a failed request and answers it with an error if it has a reply
+        or is of an unknown type.
+
+        Args:
+            client (server.ServerClient_): The client that sent the request.
+            request_id (int): The ID the client gave the request.
+            command (list): The decoded request.
+            error (Exception): The error the request failed with.
+        """
+        request_type = get_request_type(command)
+        self.stats.count(request_type, 'errors')
+        LogRequestFailed(command, error)
+        if request_type in REPLYING_REQUESTS or request_type in STREAMING_REQUESTS or request_type not in REQUEST_TYPES:
+            try:
+                self.send_(client, client.codec.encode([request_id, ERROR, str(error)]))
+            except OSError:...
+
+    def reply_(self, client: server.ServerClient_, request_type: str, reply: list | bytes):
+        """
+        Encodes and sends a reply, timing both stages.
+
+        Args:
+            client (server.ServerClient_): The client to send the reply to.
+            request_type (str): The type of the request answered.
+            reply (list | bytes): The reply envelope, or the already encoded reply.
+        """
+        started = time.perf_counter()
+        if not isinstance(reply, bytes):
+            reply = client.codec.encode(reply)
+        encoded = time.perf_counter()
+        self.send_(client, reply)
+        self.stats.record(request_type, 'encode', encoded - started)
+        self.stats.record(request_type, 'send', time.perf_counter() - encoded)
+
+    def answer_cached_(self, client: server.ServerClient_, request_id: int, command: list):
+        """
+        Answers a request of CACHED_REQUESTS from the cache, reading and caching the reply on a miss.
+
+        A hit skips both the database and the encoding of the rows: the cached bytes are
+        put into the reply envelope as they are.
+
+        Args:
+            client (server.ServerClient_): The client that sent the request.
+            request_id (int): The ID the client gave the request.
+            command (list): The decoded request.
+        """
+        request_type = get_request_type(command)
+        key = (client.codec.name, request_type, *map(database.date_to_key, command[1:]))
+        with self.cache_lock:
+            payload = self.cache.get(key)
+            if payload is None:
+                self.cache_misses += 1
+                generation = self.cache_generation
+            else:
+                self.cache_hits += 1
+                self.cache.move_to_end(key)
+        self.stats.count(request_type, 'cache_misses' if payload is None else 'cache_hits')
+        started = time.perf_counter()
+        if payload is None:
+            info = self.handle_request_(command, client.id)
+            self.stats.record(request_type, 'dispatch', time.perf_counter() - started)
+            started = time.perf_counter()
+            payload = client.codec.encode(info)
+            with self.cache_lock:
+                if generation == self.cache_generation:
+                    self.cache[key] = payload
+                    if len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+        encode = client.codec.encode
+        reply = client.codec.encode_list([encode(request_id), encode(REPLY), payload])
+        encoded = time.perf_counter()
+        self.send_(client, reply)
+        self.stats.record(request_type, 'encode', encoded - started)
+        self.stats.record(request_type, 'send', time.perf_counter() - encoded)
+
+    def on_change_(self, action: str, rows: list[Task] | None):
+        """
+        Drops the cached replies a change of the Tasks table makes stale and queues
+        the change for the subscribers.
+
+        Args:
+            action (str): 'add', 'delete' or 'delete_all'.
+            rows (list[Task] | None): The added or deleted rows as stored, with date keys; None for 'delete_all'.
+        """
+        with self.cache_lock:
+            self.cache_generation += 1
+            if rows is None:
+                self.cache.clear()
+            else:
+                dates, wait_dates = {row.date for row in rows}, {row.wait_date for row in rows}
+                for name in codec.CODECS:
+                    self.cache.pop((name, 'GETALL'), None)
+                    for date in dates:
+                        self.cache.pop((name, 'GETFORDATE', date), None)
+                    for wait_date in wait_dates:
+                        self.cache.pop((name, 'GETFORWAITDATE', wait_date), None)
+        if self.subscriptions and not self.changes_poll:
+            self.pushes.put((action, rows))
+
+    def subscribe_(self, client: server.ServerClient_, request_id: int, command: list) -> list[str]:
+        """
+        Adds or removes a subscription of a client.
+
+        Args:
+            client (server.ServerClient_): The client that sent the request.
+            request_id (int): The ID the client gave the request, which identifies a new subscription.
+            command (list): The SUBSCRIBE or UNSUBSCRIBE request.
+
+        Returns:
+            list[str]: A list containing a success message.
+        """
+        if get_request_type(command) == 'SUBSCRIBE':
+            lesson, user, wait_date = command[1:4]
+            wait_date = database.date_to_key(wait_date) if wait_date is not None else None
+            with self.subscriptions_lock:
+                self.subscriptions.setdefault(client.id, {})[request_id] = (client, lesson, user, wait_date)
+            return ['Subscribe success']
+        with self.subscriptions_lock:
+            self.subscriptions.get(client.id, {}).pop(command[1], None)
+            if not self.subscriptions.get(client.id, True):
+                del self.subscriptions[client.id]
+        return ['Unsubscribe success']
+
+    def publish_(self):
+        """
+        Pushes the queued changes to the subscriptions whose filters they match, blocking
+        while there are none.
+        """
+        while True:
+            action, rows = self.pushes.get()
+            with self.subscriptions_lock:
+                subscribers = [
+                    (request_id, *subscription)
+                    for subscriptions in self.subscriptions.values()
+                    for request_id, subscription in subscriptions.items()
+                ]
+            for request_id, client, lesson, user, wait_date in subscribers:
+                matched = [
+                    row._replace(date=database.key_to_date(row.date), wait_date=database.key_to_date(row.wait_date))
+                    for row in rows or []
+                    if (lesson is None or row.lesson == lesson) and (user is None or row.user == user)
+                    and (wait_date is None or row.wait_date == wait_date)
+                ]
+                if rows is not None and not matched:
+                    continue
+                try:
+                    self.send_(client, client.codec.encode([request_id, PUSH, {'action': action, 'rows': matched}]))
+                except OSError:...
+
+    def poll_changes_(self):
+        """
+        Queues the changes of the change log for the subscriptions every `changes_poll` seconds.
+
+        The changes logged since the last read are grouped into runs of one action, each
+        queued like a change committed by this server. While there are no subscriptions
+        the log is not read, only its latest version.
+        """
+        with self.data_base.reader() as (cursor, connect):
+            version = database.execute_get_latest_version(cursor, 'Tasks')
+        while True:
+            time.sleep(self.changes_poll)
+            try:
+                with self.data_base.reader() as (cursor, connect):
+                    if not self.subscriptions:
+                        version = database.execute_get_latest_version(cursor, 'Tasks')
+                        continue
+                    changes = database.execute_get_logged_changes(cursor, 'Tasks', version, MAX_PAGE_SIZE,
+                                                                  database.TASK_STORED_COLUMNS)
+            except sqlite3.Error as error:
+                LogChangesPollFailed(error)
+                continue
+            if changes:
+                version = changes[-1][0]
+            for action, group in itertools.groupby(changes, key=lambda change: change[1]):
+                rows = None if action == 'delete_all' else [Task(*change[3:]) for change in group]
+                self.pushes.put((action, rows))
+
+    def drop_(self, client: server.ServerClient_):
+        """
+        Forgets a disconnected client together with its subscriptions.
+
+        Args:
+            client (server.ServerClient_): The disconnected client.
+        """
+        super().drop_(client)
+        with self.subscriptions_lock:
+            self.subscriptions.pop(client.id, None)
+
+    def raw_text_(self, client_id: str) -> bool:
+        """
+        Reads the text of the rows as UTF-8 bytes for the clients whose codec writes them as they are.
+
+        Args:
+            client_id (str): The ID of the client.
+
+        Returns:
+            bool: True if the codec of the client has raw_text set.
+        """
+        client = self.clients.get(client_id)
+        return client is not None and client.codec.raw_text
+
+    def cache_info(self) -> dict:
+        """
+        Returns the counters of the reply cache.
+
+        Returns:
+            dict: The 'hits', 'misses', current 'size' and 'max_size' of the cache.
+        """
+        with self.cache_lock:
+            return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                    'size': len(self.cache), 'max_size': self.cache_size}
+
+    def request_stats(self, request: list, client_id: str) -> dict:
+        """
+        Handles the request to get the timing statistics of the server.
+
+        Args:
+            request (list): The request.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            dict: The snapshot of the statistics with the cache counters, the batching of
+                the group writer, the number of connected clients and of queued requests.
+        """
+        return {**super().request_stats(request, client_id), 'cache': self.cache_info(),
+                'storage': self.storage.info() if self.storage is not None else {},
+                'clients': len(self.clients), 'queued': self.requests.qsize()}
+
+    def dump_stats_(self):
+        """
+        Logs the statistics every `stats_interval` seconds.
+        """
+        while True:
+            time.sleep(self.stats_interval)
+            if LogEnabled(LEVEL_INFO):
+                LogStats(self.request_stats(['STATS'], None))
+
+    def run(self, daemon: bool = False):
+        """
+        Starts the server by running the I/O loop and the worker threads in separate threads.
+
+        Args:
+            daemon (bool): Run the I/O loop in a daemon thread, so the server stops with the
+                program instead of keeping it alive. Defaults to False.
+        """
+        self.create_data_base()
+        Thread(target=self.listen_, daemon=daemon).start()
+        for _ in range(self.workers):
+            Thread(target=self.request_parse_, daemon=True).start()
+        if self.stats_interval > 0:
+            Thread(target=self.dump_stats_, daemon=True).start()
+        Thread(target=self.publish_, daemon=True).start()
+        if self.changes_poll > 0 and self.data_base is not None:
+            Thread(target=self.poll_changes_, daemon=True).start()
+
+
+def serve_prefork_worker_(host: str, port: int, data_base_file: str, workers: int, data_base_timeout: float,
+                          stats_interval: float, changes_poll: float):
+    """
+    Runs an HWIServer in a worker process of PreforkHWIServer.
+
+    Args:
+        host (str): The host address.
+        port (int): The port number, shared by all worker processes.
+        data_base_file (str): The name of the database file.
+        workers (int): The number of worker threads of the server.
+        data_base_timeout (float): Seconds a connection waits for a lock held by another process.
+        stats_interval (float): The seconds between two logs of the statistics, 0 to never log them.
+        changes_poll (float): The seconds between two reads of the change log for the subscriptions.
+    """
+    hwi_server = HWIServer(host, port, data_base_file, workers, cache_size=0, stats_interval=stats_interval,
+                           reuse_port=True)
+    hwi_server.data_base_timeout = data_base_timeout
+    hwi_server.changes_poll = changes_poll
+    hwi_server.run()
+
+
+class PreforkHWIServer(HWIRequestHandler_):
+    """
+    Runs several HWIServer processes on the same host and port.
+
+    Every process binds the port with SO_REUSEPORT and runs its own I/O loop and
+    workers, so the kernel spreads the connections over the processes and reads use
+    several cores. The processes share the WAL-mode database: readers never block,
+    and a write waits up to `data_base_timeout` for the write lock held by another
+    process. A supervisor restarts the processes that die.
+
+    The reply cache is disabled in the processes, since a write in one process can
+    not invalidate the cache of another, and Requests.STATS reports the statistics of
+    the process that answers it. For the same reason every process pushes the changes
+    to its subscribers from the change log of the database, read every `changes_poll`
+    seconds, so a subscriber sees the writes of all processes, see HWIServer.
+
+    Attributes:
+        host (str): The host address of the server.
+        port (int): The port number of the server.
+        data_base_file (str): The name of the database file.
+        processes (int): The number of server processes.
+        workers (int): The number of worker threads of every process.
+        stats_interval (float): The seconds between two logs of the statistics, 0 to never log them.
+        children (list[multiprocessing.Process | None]): The server processes, by index.
+    """
+
+    data_base_timeout = 30.0
+    changes_poll = 0.05
+
+    def __init__(self, host: str = utils.LOCAL_HOST, port: int = utils.LOCAL_PORT, data_base_file: str = 'tasks.db',
+                 processes: int | None = None, workers: int = 4, stats_interval: float = 0):
+        """
+        Initializes the PreforkHWIServer.
+
+        Args:
+            host (str): The host address. Defaults to utils.LOCAL_HOST.
+            port (int): The port number. Defaults to utils.LOCAL_PORT.
+            data_base_file (str): The name of the database file. Defaults to 'tasks.db'.
+            processes (int | None): The number of server processes. Defaults to the number of CPUs.
+            workers (int): The number of worker threads of every process. Defaults to 4.
+            stats_interval (float): The seconds between two logs of the statistics, 0 to never log them. Defaults to 0.
+        """
+        self.host = host
+        self.port = port
+        self.data_base_file = data_base_file
+        self.data_base = None
+        self.processes = processes or os.cpu_count() or 1
+        self.workers = workers
+        self.stats_interval = stats_interval
+        self.children: list[multiprocessing.Process | None] = [None] * self.processes
+
+    def start_child_(self, index: int):
+        """
+        Starts the server process with an index.
+
+        Args:
+            index (int): The index of the process.
+        """
+        child = multiprocessing.Process(
+            target=serve_prefork_worker_,
+            args=(self.host, self.port, self.data_base_file, self.workers, self.data_base_timeout, self.stats_interval,
+                  self.changes_poll),
+            name=f'hwi-server-{index}',
+        )
+        child.start()
+        self.children[index] = child
+        LogWorkerStarted(index, child.pid)
+
+    def run(self):
+        """
+        Prepares the database, starts the server processes and restarts them when they die.
+
+        The schema is created and migrated once, before the processes start, and the
+        supervisor sleeps until a process exits. Blocks the calling thread until it is
+        interrupted, then stops the processes.
+        """
+        self.create_data_base()
+        self.storage.close()
+        self.storage = None
+        self.data_base = None
+        started = [0.0] * self.processes
+        try:
+            for index in range(self.processes):
+                self.start_child_(index)
+                started[index] = time.monotonic()
+            while True:
+                sentinels = {child.sentinel: index for index, child in enumerate(self.children)}
+                for sentinel in multiprocessing.connection.wait(list(sentinels)):
+                    index = sentinels[sentinel]
+                    child = self.children[index]
+                    child.join()
+                    LogWorkerDied(index, child.pid, child.exitcode)
+                    # a process dying right after its start is not restarted in a tight loop
+                    time.sleep(max(0.0, 1.0 - (time.monotonic() - started[index])))
+                    self.start_child_(index)
+                    started[index] = time.monotonic()
+        finally:
+            for child in self.children:
+                if child is not None and child.is_alive():
+                    child.terminate()
+            for child in self.children:
+                if child is not None:
+                    child.join()
+
+
+class AsyncHWIServer(HWIRequestHandler_):
+    """
+    An asyncio-based server answering the same requests as HWIServer.
+
+    Every connection is served by its own coroutine built on asyncio streams, so
+    thousands of clients can be connected at once. Database work runs in a pool of
+    worker threads, one per reader connection, to keep the event loop free.
+
+    The requests of a connection are answered concurrently and their replies may be
+    sent out of order. A write waits for the earlier requests of its connection and a
+    read waits for the last earlier write, so a client reads its own writes.
+
+    Changes are not pushed, so SUBSCRIBE and UNSUBSCRIBE are answered with an error.
+
+    Attributes:
+        host (str): The host address of the server.
+        port (int): The port number of the server.
+        data_base_file (str): The name of the database file.
+        storage (storage.Storage | None): The storage of the Tasks table.
+        data_base (database.ConnectionPool | None): The pool of database connections of an SQLiteStorage.
+        clients (dict[str, asyncio.StreamWriter]): Connected clients by their ID.
+        executor (ThreadPoolExecutor): The executor running the request handlers.
+        stats (stats.Stats): The counters of requests and errors by request type, with the
+            timing of the database work.
+    """
+
+    def __init__(self, host: str = utils.LOCAL_HOST, port: int = utils.LOCAL_PORT, data_base_file: str = 'tasks.db',
+                 storage: storage.Storage | None = None):
+        """
+        Initializes the AsyncHWIServer.
+
+        Args:
+            host (str): The host address. Defaults to utils.LOCAL_HOST.
+            port (int): The port number. Defaults to utils.LOCAL_PORT.
+            data_base_file (str): The name of the database file. Defaults to 'tasks.db'.
+            storage (storage.Storage | None): The storage of the Tasks table, None for an
+                SQLiteStorage of `data_base_file`. Defaults to None.
+        """
+        self.host = host
+        self.port = port
+        self.data_base_file = data_base_file
+        self.storage = storage
+        self.data_base = None
+        self.clients: dict[str, asyncio.StreamWriter] = {}
+        self.executor = ThreadPoolExecutor(max_workers=self.data_base_readers)
+        self.stats = stats.Stats()
+
+    async def handle_client_(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serves a single client connection until it is closed.
+
+        A request that can not be decoded or has not the shape of a request is dropped,
+        answered with an error if its ID could be read, like HWIServer.on_request_ does.
+
+        Args:
+            reader (asyncio.StreamReader): The stream to read requests from.
+            writer (asyncio.StreamWriter): The stream to write replies to.
+        """
+        host, port = writer.get_extra_info('peername')[:2]
+        try:
+            name, client_id, *offered = (await self.read_frame_(reader)).decode().split('|')
+        except (asyncio.IncompleteReadError, ConnectionError, protocol.ProtocolError, ValueError):
+            writer.close()
+            return
+        client_codec = codec.negotiate(offered[0].split(',') if offered else [])
+        self.clients[client_id] = writer
+        await self.write_frame_(writer, client_codec.name.encode())
+        LogClientConnectToServer(port, host, name, client_id)
+
+        requests: set[asyncio.Task] = set()
+        last_write: asyncio.Task | None = None
+        try:
+            while True:
+                payload = await self.read_frame_(reader)
+                request = None
+                try:
+                    request = client_codec.decode(payload)
+                    request_id, command = parse_request(request)
+                except Exception as error:
+                    LogRequestFailed(payload, error)
+                    if isinstance(request, list) and request and type(request[0]) is int:
+                        await self.write_frame_(writer, client_codec.encode([request[0], ERROR, str(error)]))
+                    continue
+                LogRecuestRecved(command)
+                if get_request_type(command) in WRITE_REQUESTS:
+                    after = set(requests)
+                else:
+                    after = {last_write} if last_write is not None and not last_write.done() else set()
+                task = asyncio.create_task(self.answer_(writer, client_codec, client_id, request_id, command, after))
+                requests.add(task)
+                task.add_done_callback(requests.discard)
+                if get_request_type(command) in WRITE_REQUESTS:
+                    last_write = task
+        except (asyncio.IncompleteReadError, ConnectionError, protocol.ProtocolError):...
+        finally:
+            # a client reconnecting with the same ID may already have replaced this connection
+            if self.clients.get(client_id) is writer:
+                self.clients.pop(client_id, None)
+            writer.close()
+
+    async def answer_(self, writer: asyncio.StreamWriter, client_codec: codec.Codec, client_id: str,
+                      request_id: int, command: list, after: set[asyncio.Task]):
+        """
+        Handles a single request and writes its reply.
+
+        Args:
+            writer (asyncio.StreamWriter): The stream to write the reply to.
+            client_codec (codec.Codec): The codec negotiated with the client.
+            client_id (str): The ID of the client making the request.
+            request_id (int): The ID the client gave the request.
+            command (list): The decoded request.
+            after (set[asyncio.Task]): The earlier requests to wait for.
+        """
+        if after:
+            await asyncio.wait(after)
+        loop = asyncio.get_running_loop()
+        self.stats.count(get_request_type(command), 'requests')
+        try:
+            if get_request_type(command) in SUBSCRIPTION_REQUESTS:
+                raise ValueError(f'{type(self).__name__} does not push changes, use HWIServer to subscribe')
+            info = await loop.run_in_executor(self.executor, self.dispatch_, command, client_id)
+            if isinstance(info, Future):
+                info = await asyncio.wrap_future(info)
+            if get_request_type(command) in REPLYING_REQUESTS:
+                await self.write_frame_(writer, client_codec.encode([request_id, REPLY, info]))
+            if get_request_type(command) in STREAMING_REQUESTS:
+                while (chunk := await loop.run_in_executor(self.executor, next, info, None)) is not None:
+                    await self.write_frame_(writer, client_codec.encode([request_id, CHUNK, chunk]))
+                await self.write_frame_(writer, client_codec.encode([request_id, REPLY, []]))
+        except ConnectionError:...
+        except Exception as error:
+            self.stats.count(get_request_type(command), 'errors')
+            LogRequestFailed(command, error)
+            if (get_request_type(command) in REPLYING_REQUESTS or get_request_type(command) in STREAMING_REQUESTS
+                    or get_request_type(command) not in REQUEST_TYPES):
+                try:
+                    await self.write_frame_(writer, client_codec.encode([request_id, ERROR, str(error)]))
+                except ConnectionError:...
+
+    def dispatch_(self, command: list, client_id: str):
+        """
+        Dispatches a request on a worker thread, so the database work is timed under its type.
+
+        Args:
+            command (list): The decoded request.
+            client_id (str): The ID of the client making the request.
+
+        Returns:
+            Any: The reply of the handler, see HWIRequestHandler_.handle_request_.
+        """
+        self.stats.begin(get_request_type(command))
+        try:
+            return self.handle_request_(command, client_id)
+        finally:
+            self.stats.begin(None)
+
+    @staticmethod
+    async def read_frame_(reader: asyncio.StreamReader) -> bytes:
+        """
+        Reads a single frame from a stream.
+
+        Args:
+            reader (asyncio.StreamReader): The stream to read from.
+
+        Returns:
+            bytes: The payload of the frame.
+        """
+        size = protocol.unpack_header(await reader.readexactly(protocol.HEADER.size))
+        return await reader.readexactly(size)
+
+    @staticmethod
+    async def write_frame_(writer: asyncio.StreamWriter, payload: bytes):
+        """
+        Writes a single frame to a stream.
+
+        Args:
+            writer (asyncio.StreamWriter): The stream to write to.
+            payload (bytes): The payload of the frame.
+        """
+        writer.write(protocol.pack_header(len(payload)))
+        writer.write(payload)
+        await writer.drain()
+
+    async def serve(self):
+        """
+        Starts the server and serves clients forever.
+        """
+        self.create_data_base()
+        server = await asyncio.start_server(self.handle_client_, self.host, self.port)
+        LogServerCreated(self.port, self.host)
+        LogServerStartListening()
+        async with server:
+            await server.serve_forever()
+
     def run(self):
         """
-        Starts the server by running the listen, wait_requests, and request_parse methods in separate threads.
+        Runs the server in a new event loop, blocking the calling thread.
+        """
+        asyncio.run(self.serve())
+
+
+class AsyncHWIClient:
+    """
+    An asyncio-based client for sending requests and receiving data.
+
+    Every request carries an ID and the server tags its replies with it, so any number
+    of requests can be in flight on one connection: a reader task reads the replies and
+    resolves the future of the matching request.
+
+    Attributes:
+        host (str): The host address of the server.
+        port (int): The port number of the server.
+        name (str): The name of the client.
+        id (uuid.UUID): A unique identifier for the client.
+        codecs (tuple[str, ...]): The codecs offered to the server, in order of preference.
+        codec (codec.Codec): The codec negotiated with the server.
+        pending (dict[int, asyncio.Future | asyncio.Queue]): What waits for the replies of the requests in flight, by request ID.
+        request_ids (itertools.count): The source of request IDs.
+        lost (bool): Set when the connection is lost; requests fail with a ConnectionError from then on.
+    """
+
+    def __init__(self, host: str = utils.LOCAL_HOST, port: int = utils.LOCAL_PORT, name: str = "Unnamed",
+                 codecs: tuple[str, ...] = ('binary', 'json')):
+        """
+        Initializes the AsyncHWIClient.
+
+        Args:
+            host (str): The host address. Defaults to utils.LOCAL_HOST.
+            port (int): The port number. Defaults to utils.LOCAL_PORT.
+            name (str): The name of the client. Defaults to "Unnamed".
+            codecs (tuple[str, ...]): The codecs offered to the server. Defaults to ('binary', 'json').
+        """
+        self.host = host
+        self.port = port
+        self.name = name
+        self.id = uuid.uuid4()
+        self.codecs = codecs
+        self.codec = codec.CODECS[codec.DEFAULT_CODEC]
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.reader_task: asyncio.Task | None = None
+        self.pending: dict[int, asyncio.Future | asyncio.Queue] = {}
+        self.request_ids = itertools.count(1)
+        self.lost = False
+        LogClientCreated(self.host, self.port)
+
+    async def connect(self):
+        """
+        Connects to the server, sends the client's name, ID and codecs, reads the negotiated codec
+        and starts the task reading replies.
+
+        Raises:
+            ConnectionError: If the connection or the handshake fails.
+        """
+        try:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        except OSError as error:
+            raise ConnectionError(f'could not connect to {self.host}:{self.port}: {error}') from error
+        LogClientConnected(self.host, self.port)
+        try:
+            await AsyncHWIServer.write_frame_(self.writer, f'{self.name}|{self.id}|{",".join(self.codecs)}'.encode())
+            self.codec = codec.CODECS[(await AsyncHWIServer.read_frame_(self.reader)).decode()]
+        except (asyncio.IncompleteReadError, OSError, ValueError, KeyError, protocol.ProtocolError) as error:
+            self.writer.close()
+            raise ConnectionError(f'handshake with {self.host}:{self.port} failed: {error!r}') from error
+        self.lost = False
+        self.reader_task = asyncio.create_task(self.read_replies_())
+
+    async def read_replies_(self):
+        """
+        Continuously reads reply frames and hands them to the requests waiting for them.
+
+        However the reading ends, the connection is marked lost and every request in flight
+        fails with a ConnectionError.
+        """
+        error = None
+        try:
+            while True:
+                request_id, kind, payload = self.codec.decode(await AsyncHWIServer.read_frame_(self.reader))
+                waiter = self.pending.get(request_id) if kind == CHUNK else self.pending.pop(request_id, None)
+                if kind == ERROR:
+                    payload = RequestError(payload)
+                if isinstance(waiter, asyncio.Queue):
+                    waiter.put_nowait(None if kind == REPLY else payload)
+                elif waiter is None or waiter.done():
+                    continue
+                elif kind == ERROR:
+                    waiter.set_exception(payload)
+                else:
+                    waiter.set_result(payload)
+        except Exception as reason:
+            error = reason
+        finally:
+            self.lost = True
+            waiters, self.pending = self.pending, {}
+            for waiter in waiters.values():
+                lost = ConnectionError(f'connection to {self.host}:{self.port} lost: {error}')
+                if isinstance(waiter, asyncio.Queue):
+                    waiter.put_nowait(lost)
+                elif not waiter.done():
+                    waiter.set_exception(lost)
+
+    def submit(self, request: Requests) -> asyncio.Future | asyncio.Queue:
+        """
+        Sends a request to the server without waiting for its response.
+
+        Args:
+            request (Requests): The request to send, or a function returning it.
+
+        Returns:
+            asyncio.Future | asyncio.Queue: A future resolved with the response data if the request
+                is "getable" and with None otherwise; for a streamed request, a queue receiving the
+                chunks of rows, ended by None.
+
+        Raises:
+            ValueError: If the type of the request is unknown.
+            ConnectionError: If the connection is lost.
+        """
+        command = request() if callable(request) else request
+        check_request_type(command)
+        if self.lost:
+            raise ConnectionError(f'connection to {self.host}:{self.port} lost')
+        request_id = next(self.request_ids)
+        if get_request_type(command) in STREAMING_REQUESTS:
+            waiter = asyncio.Queue()
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+        if get_request_type(command) in REPLYING_REQUESTS or get_request_type(command) in STREAMING_REQUESTS:
+            self.pending[request_id] = waiter
+        else:
+            waiter.set_result(None)
+        payload = self.codec.encode([request_id, command])
+        self.writer.write(protocol.pack_header(len(payload)))
+        self.writer.write(payload)
+        return waiter
+
+    @staticmethod
+    async def wait_stream_(chunks: asyncio.Queue):
+        """
+        Receives the chunks of a streamed reply as they arrive.
+
+        Args:
+            chunks (asyncio.Queue): The queue the chunks of the stream are put into.
+
+        Yields:
+            Any: The rows of the reply, one at a time.
+        """
+        while (chunk := await chunks.get()) is not None:
+            if isinstance(chunk, Exception):
+                raise chunk
+            for row in chunk:
+                yield row
+
+    async def request(self, request: Requests):
+        """
+        Sends a request to the server and waits for a response if applicable.
+
+        Args:
+            request (Requests): The request to send, or a function returning it.
+
+        Returns:
+            Any: The response data if the request is "getable", the list of rows if it is
+                streamed, None otherwise.
+        """
+        waiter = self.submit(request)
+        await self.writer.drain()
+        if isinstance(waiter, asyncio.Queue):
+            return [row async for row in self.wait_stream_(waiter)]
+        return await waiter
+
+    async def pipeline(self, requests: list[Requests]) -> list:
+        """
+        Sends many requests back to back and waits for all their responses.
+
+        Args:
+            requests (list[Requests]): The requests to send, or functions returning them.
+
+        Returns:
+            list: The response of each request, in order: the data if the request is "getable",
+                the list of rows if it is streamed, None otherwise.
+        """
+        waiters = [self.submit(request) for request in requests]
+        await self.writer.drain()
+        return [
+            [row async for row in self.wait_stream_(waiter)] if isinstance(waiter, asyncio.Queue) else await waiter
+            for waiter in waiters
+        ]
+
+    async def iter_all(self, chunk_size: int = 500):
+        """
+        Iterates over all data, streamed from the server in chunks.
+
+        Args:
+            chunk_size (int): The maximum number of rows sent at once. Defaults to 500.
+
+        Yields:
+            Any: The rows, one at a time, as they arrive.
+        """
+        chunks = self.submit(Requests.GET_ALL_STREAM(chunk_size))
+        await self.writer.drain()
+        async for row in self.wait_stream_(chunks):
+            yield row
+
+    async def close(self):
+        """
+        Closes the connection to the server.
         """
-        Thread(target=self.listen_).start()
-        Thread(target=self.wait_requests_).start()
-        Thread(target=self.request_parse_).start()
+        self.writer.close()
+        await self.writer.wait_closed()
@@ -0,0 +1,302 @@
+"""
+This module is a load generator and latency benchmark for HWIServer.
+
+It starts an HWIServer on a temporary database, seeds it with a reproducible dataset
+and drives concurrent HWIClients with a weighted mix of requests. Throughput and
+latency percentiles are printed and saved as JSON, so changes to the server, the
+protocol or the database show up as numbers.
+
+Usage:
+    python -m src.bench --clients 8 --requests 500 --mix GETFORDATE=6,GETALL=1,ADDINFO=2,DELETEINFO=1
+    python -m src.bench --storage memory
+
+Functions:
+    parse_mix: Parses a request mix such as 'GETFORDATE=6,GETALL=1'
+    percentile: Nearest-rank percentile of sorted samples
+    seed_rows: Builds the seeded dataset
+    run_bench: Runs a benchmark and returns its results
+    main: Command line entry point
+"""
+
+from src import api
+from src.core import storage
+from src.core.debug import *
+
+from threading import Barrier, Thread
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import socket
+import sqlite3
+import tempfile
+import time
+
+# requests the mix can be made of, with the function building one from the dataset
+MIX_REQUESTS = {
+    'ADDINFO': lambda rng, users, dates: api.Requests.ADD_INFO(
+        [rng.choice(users), rng.choice(LESSONS), rng.choice(dates), rng.choice(dates), f'task {rng.random():.6f}']),
+    'GETALL': lambda rng, users, dates: api.Requests.GET_ALL,
+    'GETFORDATE': lambda rng, users, dates: api.Requests.GET_FOR_DATE(rng.choice(dates)),
+    'GETFORWAITDATE': lambda rng, users, dates: api.Requests.GET_FOR_WAIT_DATE(rng.choice(dates)),
+    'DELETEINFO': lambda rng, users, dates: api.Requests.DELETE_INFO(rng.choice(users), rng.choice(dates)),
+}
+
+DEFAULT_MIX = 'GETFORDATE=6,GETALL=1,ADDINFO=2,DELETEINFO=1'
+
+LESSONS = ['math', 'physics', 'history', 'literature', 'english', 'biology', 'chemistry', 'informatics']
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    """
+    Parses a request mix.
+
+    Args:
+        mix (str): Comma separated `TYPE=weight` pairs, e.g. 'GETFORDATE=6,GETALL=1'.
+
+    Returns:
+        dict[str, int]: The weight of every request type.
+
+    Raises:
+        ValueError: If a request type is unknown or a weight is not a positive integer.
+    """
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.strip().partition('=')
+        name = name.upper()
+        if name not in MIX_REQUESTS:
+            raise ValueError(f'unknown request type {name!r}, expected one of {sorted(MIX_REQUESTS)}')
+        weights[name] = int(weight or 1)
+        if weights[name] <= 0:
+            raise ValueError(f'the weight of {name} must be positive')
+    return weights
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of sorted samples.
+
+    Args:
+        samples (list[float]): The samples, sorted.
+        fraction (float): The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The percentile, 0.0 if there are no samples.
+    """
+    if not samples:
+        return 0.0
+    return samples[max(0, math.ceil(fraction * len(samples)) - 1)]
+
+def seed_rows(rng: random.Random, rows: int, users: list[str], dates: list[str]) -> list[list]:
+    """
+    Builds the seeded dataset.
+
+    Args:
+        rng (random.Random): The seeded random generator.
+        rows (int): The number of rows.
+        users (list[str]): The user names to pick from.
+        dates (list[str]): The 'DD.MM.YYYY' dates to pick from.
+
+    Returns:
+        list[list]: The rows, in the form taken by Requests.ADD_MANY.
+    """
+    return [
+        [rng.choice(users), rng.choice(LESSONS), rng.choice(dates), rng.choice(dates), f'task {index}']
+        for index in range(rows)
+    ]
+
+def free_port(host: str) -> int:
+    """
+    Finds a free local port.
+
+    Args:
+        host (str): The host address to bind.
+
+    Returns:
+        int: The port number.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind((host, 0))
+        return probe.getsockname()[1]
+
+def run_bench(clients: int = 8, requests: int = 500, mix: str = DEFAULT_MIX, rows: int = 2000, users: int = 50,
+              days: int = 60, seed: int = 1, workers: int = 4, cache_size: int = 1024,
+              codecs: tuple[str, ...] = ('binary', 'json'), host: str = '127.0.0.1',
+              storage_name: str = 'sqlite') -> dict:
+    """
+    Runs a benchmark against a fresh HWIServer and returns its results.
+
+    Every client runs in its own thread and sends its requests one after another,
+    so `clients` is the number of requests in flight. ADDINFO is answered once its
+    row is committed, so its latency includes the group commit.
+
+    Args:
+        clients (int): The number of concurrent clients. Defaults to 8.
+        requests (int): The number of requests sent by every client. Defaults to 500.
+        mix (str): The request mix, see parse_mix. Defaults to DEFAULT_MIX.
+        rows (int): The number of rows seeded before the run. Defaults to 2000.
+        users (int): The number of distinct users in the dataset. Defaults to 50.
+        days (int): The number of distinct dates in the dataset. Defaults to 60.
+        seed (int): The seed of the dataset and of the request sequence. Defaults to 1.
+        workers (int): The number of worker threads of the server. Defaults to 4.
+        cache_size (int): The size of the reply cache of the server, 0 disables it. Defaults to 1024.
+        codecs (tuple[str, ...]): The codecs offered by the clients. Defaults to ('binary', 'json').
+        host (str): The host address the server listens on. Defaults to '127.0.0.1'.
+        storage_name (str): The storage of the server, 'sqlite' or 'memory'. Defaults to 'sqlite'.
+
+    Returns:
+        dict: The configuration, the totals and the latency of every request type, in milliseconds.
+    """
+    weights = parse_mix(mix)
+    rng = random.Random(seed)
+    user_names = [f'user{index}' for index in range(users)]
+    dates = [time.strftime('%d.%m.%Y', time.gmtime(1725148800 + day * 86400)) for day in range(days)]
+
+    with tempfile.TemporaryDirectory(prefix='hwi-bench-', ignore_cleanup_errors=True) as directory:
+        port = free_port(host)
+        server = api.HWIServer(host, port, os.path.join(directory, 'bench.db'), workers=workers,
+                               cache_size=cache_size,
+                               storage=storage.MemoryStorage() if storage_name == 'memory' else None)
+        connections: list[api.HWIClient] = []
+        try:
+            server.run(daemon=True)
+
+            seeder = api.HWIClient(host, port, 'bench-seed', codecs)
+            connections.append(seeder)
+            seeder.connect()
+            dataset = seed_rows(rng, rows, user_names, dates)
+            for start in range(0, len(dataset), 1000):
+                seeder.request(api.Requests.ADD_MANY(dataset[start:start + 1000]))
+
+            latencies: dict[str, list[float]] = {name: [] for name in weights}
+            errors: dict[str, int] = {name: 0 for name in weights}
+            connect_errors = []
+            barrier = Barrier(clients + 1)
+
+            def drive(index: int):
+                client_rng = random.Random(seed * 1000003 + index)
+                names, counts = list(weights), list(weights.values())
+                client = api.HWIClient(host, port, f'bench-{index}', codecs)
+                connections.append(client)
+                try:
+                    client.open()
+                    plan = [(name, MIX_REQUESTS[name](client_rng, user_names, dates))
+                            for name in client_rng.choices(names, counts, k=requests)]
+                except ConnectionError as error:
+                    # a client that could not connect still releases the others
+                    connect_errors.append(error)
+                    barrier.wait()
+                    return
+                except BaseException:
+                    barrier.abort()
+                    raise
+                samples = {name: [] for name in weights}
+                failed = {name: 0 for name in weights}
+                barrier.wait()
+                for name, request in plan:
+                    started = time.perf_counter()
+                    try:
+                        client.request(request)
+                    except (api.RequestError, ConnectionError):
+                        failed[name] += 1
+                        continue
+                    samples[name].append(time.perf_counter() - started)
+                for name in weights:
+                    latencies[name].extend(samples[name])
+                    errors[name] += failed[name]
+
+            threads = [Thread(target=drive, args=(index,), daemon=True) for index in range(clients)]
+            for thread in threads:
+                thread.start()
+            barrier.wait()
+            started = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            def summary(samples: list[float]) -> dict:
+                samples = sorted(sample * 1000 for sample in samples)
+                return {
+                    'count': len(samples),
+                    'mean_ms': sum(samples) / len(samples) if samples else 0.0,
+                    'p50_ms': percentile(samples, 0.50),
+                    'p95_ms': percentile(samples, 0.95),
+                    'p99_ms': percentile(samples, 0.99),
+                    'max_ms': samples[-1] if samples else 0.0,
+                }
+
+            completed = sum(len(samples) for samples in latencies.values())
+            return {
+                'config': {
+                    'clients': clients, 'requests': requests, 'mix': weights, 'rows': rows, 'users': users,
+                    'days': days, 'seed': seed, 'workers': workers, 'cache_size': cache_size,
+                    'codec': seeder.codec.name,
+                    'storage': storage_name,
+                },
+                'environment': {
+                    'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                    'platform': platform.platform(), 'cpus': os.cpu_count(),
+                },
+                'elapsed_s': elapsed,
+                'throughput_rps': completed / elapsed if elapsed else 0.0,
+                'errors': sum(errors.values()),
+                'connect_errors': len(connect_errors),
+                'total': summary([sample for samples in latencies.values() for sample in samples]),
+                'requests': {name: {**summary(latencies[name]), 'errors': errors[name]} for name in weights},
+                'cache': server.cache_info(),
+            }
+        finally:
+            # the server has no way to stop, but its clients and database files are released
+            for connection in connections:
+                connection.close()
+            if server.storage is not None:
+                server.storage.close()
+
+def main(argv: list[str] | None = None) -> dict:
+    """
+    Command line entry point: runs a benchmark, prints a report and saves the results as JSON.
+
+    Args:
+        argv (list[str] | None): The command line arguments. Defaults to sys.argv.
+
+    Returns:
+        dict: The results of the benchmark.
+    """
+    parser = argparse.ArgumentParser(prog='python -m src.bench', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8, help='number of concurrent clients')
+    parser.add_argument('--requests', type=int, default=500, help='requests sent by every client')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'weighted request mix, default {DEFAULT_MIX}')
+    parser.add_argument('--rows', type=int, default=2000, help='rows seeded before the run')
+    parser.add_argument('--users', type=int, default=50, help='distinct users in the dataset')
+    parser.add_argument('--days', type=int, default=60, help='distinct dates in the dataset')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the dataset and of the requests')
+    parser.add_argument('--workers', type=int, default=4, help='worker threads of the server')
+    parser.add_argument('--cache-size', type=int, default=1024, help='reply cache size of the server, 0 disables it')
+    parser.add_argument('--codec', choices=('binary', 'json'), default='binary', help='codec of the clients')
+    parser.add_argument('--storage', choices=('sqlite', 'memory'), default='sqlite', help='storage of the server')
+    parser.add_argument('--output', default='bench-results.json', help='file the results are saved to')
+    parser.add_argument('--log', action='store_true', help='keep the server log on')
+    args = parser.parse_args(argv)
+
+    if not args.log:
+        LogConfigure(LEVEL_ERROR)
+    results = run_bench(args.clients, args.requests, args.mix, args.rows, args.users, args.days, args.seed,
+                        args.workers, args.cache_size, (args.codec,), storage_name=args.storage)
+
+    print(f"{results['total']['count']} requests in {results['elapsed_s']:.2f}s: "
+          f"{results['throughput_rps']:.0f} req/s, {results['errors']} errors, "
+          f"{results['connect_errors']} clients failed to connect")
+    print(f"{'request':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in [*results['requests'].items(), ('total', results['total'])]:
+        print(f"{name:<16}{row['count']:>8}{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}"
+              f"{row['p99_ms']:>10.3f}{row['max_ms']:>10.3f}")
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"results saved to {args.output}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ from src.core.utils import (
 )
 
 from src.core.debug import *
+from src.core.protocol import send_frame, recv_frame
 from ast import literal_eval
 
 class Client:
@@ -52,9 +53,30 @@ class Client:
         except:
             LogClientNotConnected(self.host, self.port)
 
+    def open_(self, timeout: float | None = None):
+        """
+        Connect a new socket to the specified host and port, replacing the current one.
+
+        Unlike connect_, a failed attempt is raised instead of ending the program, so the
+        caller can retry it.
+
+        Args:
+            timeout (float | None, optional): Seconds to wait for the connection. Defaults to None, no limit.
+
+        Raises:
+            ConnectionError: If the connection attempt fails.
+        """
+        self.socket.close()
+        try:
+            self.socket = socket.create_connection((self.host, self.port), timeout)
+        except OSError as error:
+            raise ConnectionError(f'could not connect to {self.host}:{self.port}: {error}') from error
+        self.socket.settimeout(None)
+        LogClientConnected(self.host, self.port)
+
     def send_string_(self, string: str):
         """
-        Send a string over the established connection.
+        Send a string over the established connection as a single frame.
 
         Args:
             string (str): The string to be sent.
@@ -63,16 +85,12 @@ class Client:
             This method silently fails if an exception occurs during sending.
         """
         try:
-            self.socket.send(string.encode())
+            send_frame(self.socket, string.encode())
         except: ...
 
-    def recv_string_(self, buffer_size: int = 1024):
+    def recv_string_(self):
         """
-        Receive a string from the established connection.
-
-        Args:
-            buffer_size (int, optional): The maximum amount of data to be received at once.
-                Defaults to 1024 bytes.
+        Receive a single frame from the established connection as a string.
 
         Returns:
             str: The received string, or None if an exception occurs.
@@ -81,5 +99,5 @@ class Client:
             This method silently fails and returns None if an exception occurs during receiving.
         """
         try:
-            return self.socket.recv(buffer_size).decode()
+            return recv_frame(self.socket).decode()
         except: ...
\ No newline at end of file
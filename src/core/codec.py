@@ -0,0 +1,375 @@
+"""
+This module provides the codecs used to serialize request and reply payloads.
+
+The codec of a connection is negotiated during the `name|id` handshake: the client
+lists the codecs it supports in order of preference and the server answers with the
+name of the first one it supports.
+
+Rows read from the database can be handed over as TextRows, with their text still
+in the UTF-8 bytes stored by SQLite, so the binary codec writes them into the output
+buffer as they are instead of decoding them to str and encoding them back.
+
+Classes:
+    TextRows: Rows whose text fields are UTF-8 bytes
+    Codec: Base class of all codecs
+    JSONCodec: Compact JSON text codec
+    BinaryCodec: Compact tagged binary codec built on struct
+
+Constants:
+    CODECS (dict[str, Codec]): The supported codecs by name.
+    DEFAULT_CODEC (str): The codec used when the client does not offer any.
+"""
+
+import json
+import struct
+from typing import Any
+
+
+class TextRows(list):
+    """
+    Rows whose text fields are UTF-8 bytes, as read with `text_factory = bytes`, or str.
+
+    The codecs write the bytes fields as strings: the client receives the same rows as
+    if the text had been read as str. Other fields are written as usual.
+    """
+
+    __slots__ = ()
+
+
+class Codec:
+    """
+    Base class of all codecs.
+
+    Attributes:
+        name (str): The name used to negotiate the codec.
+        raw_text (bool): Whether the codec writes the bytes fields of TextRows without decoding them,
+            so reading their text as bytes saves work.
+    """
+
+    name = ''
+    raw_text = False
+
+    def encode(self, obj: Any) -> bytes:
+        """
+        Serialize an object.
+
+        Args:
+            obj (Any): The object built from None, bool, int, float, str, bytes, lists, tuples
+                (named tuples included), dicts and TextRows.
+
+        Returns:
+            bytes: The serialized object.
+        """
+        raise NotImplementedError
+
+    def encode_list(self, items: list[bytes]) -> bytes:
+        """
+        Serialize a list from its already serialized items.
+
+        Args:
+            items (list[bytes]): The serialized items.
+
+        Returns:
+            bytes: The serialized list.
+        """
+        raise NotImplementedError
+
+    def decode(self, data: bytes | bytearray | memoryview) -> Any:
+        """
+        Deserialize an object. Tuples are returned as lists.
+
+        Args:
+            data (bytes | bytearray | memoryview): The serialized object.
+
+        Returns:
+            Any: The deserialized object.
+        """
+        raise NotImplementedError
+
+
+class JSONCodec(Codec):
+    """
+    Compact JSON codec, readable by any client.
+
+    JSON has no bytes, so bytes, like the text fields of TextRows, are written as UTF-8 strings.
+    """
+
+    name = 'json'
+
+    def __init__(self):
+        """
+        Initialize the JSONCodec.
+        """
+        self.encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=self.default_)
+        self.decoder = json.JSONDecoder()
+
+    @staticmethod
+    def default_(obj: Any) -> str:
+        """
+        Convert the objects the JSON encoder does not know.
+
+        Args:
+            obj (Any): The object.
+
+        Returns:
+            str: The text of a bytes object.
+
+        Raises:
+            TypeError: If the object is not bytes.
+        """
+        if isinstance(obj, (bytes, bytearray)):
+            return obj.decode()
+        raise TypeError(f'can not encode object of type {type(obj).__name__}')
+
+    def encode(self, obj: Any) -> bytes:
+        return self.encoder.encode(obj).encode()
+
+    def encode_list(self, items: list[bytes]) -> bytes:
+        return b'[' + b','.join(items) + b']'
+
+    def decode(self, data: bytes | bytearray | memoryview) -> Any:
+        return self.decoder.decode(str(data, 'utf-8'))
+
+
+# binary codec type tags
+NONE, TRUE, FALSE = b'N', b'T', b'F'
+INT, BIG_INT, FLOAT = b'i', b'I', b'd'
+STR, SHORT_STR, BYTES = b's', b'S', b'y'
+LIST, SHORT_LIST, DICT = b'l', b'L', b'm'
+
+I64 = struct.Struct('!q')
+F64 = struct.Struct('!d')
+U32 = struct.Struct('!I')
+
+
+class BinaryCodec(Codec):
+    """
+    Compact tagged binary codec.
+
+    Every value is a one-byte type tag followed by its data: fixed-size ints and floats,
+    length-prefixed UTF-8 strings and bytes, and count-prefixed lists and dicts. Strings
+    shorter than 256 bytes and lists shorter than 256 items use a one-byte length.
+    """
+
+    name = 'binary'
+    raw_text = True
+
+    def encode(self, obj: Any) -> bytes:
+        buffer = bytearray()
+        self.encode_into_(buffer, obj)
+        return bytes(buffer)
+
+    def encode_list(self, items: list[bytes]) -> bytes:
+        size = len(items)
+        if size < 256:
+            return SHORT_LIST + bytes((size,)) + b''.join(items)
+        return LIST + U32.pack(size) + b''.join(items)
+
+    def encode_into_(self, buffer: bytearray, obj: Any):
+        """
+        Serialize an object at the end of a buffer.
+
+        Args:
+            buffer (bytearray): The output buffer.
+            obj (Any): The object to serialize.
+        """
+        kind = type(obj)
+        if kind is str:
+            data = obj.encode()
+            size = len(data)
+            if size < 256:
+                buffer += SHORT_STR
+                buffer.append(size)
+            else:
+                buffer += STR
+                buffer += U32.pack(size)
+            buffer += data
+        elif kind is list or kind is tuple:
+            size = len(obj)
+            if size < 256:
+                buffer += SHORT_LIST
+                buffer.append(size)
+            else:
+                buffer += LIST
+                buffer += U32.pack(size)
+            encode_into = self.encode_into_
+            for item in obj:
+                # rows are mostly made of short strings, so they are written inline
+                if type(item) is str:
+                    data = item.encode()
+                    if len(data) < 256:
+                        buffer += SHORT_STR
+                        buffer.append(len(data))
+                        buffer += data
+                        continue
+                encode_into(buffer, item)
+        elif kind is TextRows:
+            self.encode_text_rows_(buffer, obj)
+        elif obj is None:
+            buffer += NONE
+        elif kind is bool:
+            buffer += TRUE if obj else FALSE
+        elif kind is int:
+            if -2**63 <= obj < 2**63:
+                buffer += INT
+                buffer += I64.pack(obj)
+            else:
+                data = str(obj).encode()
+                buffer += BIG_INT
+                buffer += U32.pack(len(data))
+                buffer += data
+        elif kind is float:
+            buffer += FLOAT
+            buffer += F64.pack(obj)
+        elif kind is bytes or kind is bytearray:
+            buffer += BYTES
+            buffer += U32.pack(len(obj))
+            buffer += obj
+        elif kind is dict:
+            buffer += DICT
+            buffer += U32.pack(len(obj))
+            for key, value in obj.items():
+                self.encode_into_(buffer, key)
+                self.encode_into_(buffer, value)
+        elif isinstance(obj, tuple):
+            # named tuples, such as database.Task rows
+            self.encode_into_(buffer, tuple(obj))
+        else:
+            raise TypeError(f'can not encode object of type {kind.__name__}')
+
+    def encode_text_rows_(self, buffer: bytearray, rows: TextRows):
+        """
+        Serialize rows whose text fields are UTF-8 bytes at the end of a buffer, as a list of lists.
+
+        The bytes are copied into the buffer once and never go through str.
+
+        Args:
+            buffer (bytearray): The output buffer.
+            rows (TextRows): The rows.
+        """
+        size = len(rows)
+        if size < 256:
+            buffer += SHORT_LIST
+            buffer.append(size)
+        else:
+            buffer += LIST
+            buffer += U32.pack(size)
+        encode_into = self.encode_into_
+        for row in rows:
+            size = len(row)
+            if size < 256:
+                buffer += SHORT_LIST
+                buffer.append(size)
+            else:
+                buffer += LIST
+                buffer += U32.pack(size)
+            for field in row:
+                if type(field) is str:
+                    field = field.encode()
+                if type(field) is bytes:
+                    if len(field) < 256:
+                        buffer += SHORT_STR
+                        buffer.append(len(field))
+                    else:
+                        buffer += STR
+                        buffer += U32.pack(len(field))
+                    buffer += field
+                elif field is None:
+                    buffer += NONE
+                else:
+                    encode_into(buffer, field)
+
+    def decode(self, data: bytes | bytearray | memoryview) -> Any:
+        data = bytes(data)
+        obj, offset = self.decode_from_(data, 0)
+        if offset != len(data):
+            raise ValueError('trailing data after the encoded object')
+        return obj
+
+    def decode_from_(self, data: bytes, offset: int) -> tuple[Any, int]:
+        """
+        Deserialize the object starting at an offset of a buffer.
+
+        Args:
+            data (bytes): The buffer.
+            offset (int): The position of the type tag.
+
+        Returns:
+            tuple[Any, int]: The object and the position right after it.
+        """
+        tag = data[offset]
+        offset += 1
+        if tag == 83: # S
+            end = offset + 1 + data[offset]
+            return data[offset + 1:end].decode(), end
+        if tag == 76 or tag == 108: # L l
+            if tag == 76:
+                count = data[offset]
+                offset += 1
+            else:
+                count, = U32.unpack_from(data, offset)
+                offset += 4
+            items = []
+            append = items.append
+            decode_from = self.decode_from_
+            for _ in range(count):
+                # short strings are read inline, like they are written
+                if data[offset] == 83:
+                    end = offset + 2 + data[offset + 1]
+                    append(data[offset + 2:end].decode())
+                    offset = end
+                    continue
+                item, offset = decode_from(data, offset)
+                append(item)
+            return items, offset
+        if tag == 115: # s
+            size, = U32.unpack_from(data, offset)
+            offset += 4
+            return data[offset:offset + size].decode(), offset + size
+        if tag == 78: # N
+            return None, offset
+        if tag == 84: # T
+            return True, offset
+        if tag == 70: # F
+            return False, offset
+        if tag == 105: # i
+            return I64.unpack_from(data, offset)[0], offset + 8
+        if tag == 100: # d
+            return F64.unpack_from(data, offset)[0], offset + 8
+        if tag == 73: # I
+            size, = U32.unpack_from(data, offset)
+            offset += 4
+            return int(data[offset:offset + size]), offset + size
+        if tag == 121: # y
+            size, = U32.unpack_from(data, offset)
+            offset += 4
+            return data[offset:offset + size], offset + size
+        if tag == 109: # m
+            count, = U32.unpack_from(data, offset)
+            offset += 4
+            items = {}
+            for _ in range(count):
+                key, offset = self.decode_from_(data, offset)
+                items[key], offset = self.decode_from_(data, offset)
+            return items, offset
+        raise ValueError(f'unknown type tag {tag!r}')
+
+
+CODECS: dict[str, Codec] = {codec.name: codec for codec in (BinaryCodec(), JSONCodec())}
+DEFAULT_CODEC = JSONCodec.name
+
+
+def negotiate(offered: list[str]) -> Codec:
+    """
+    Pick the codec of a connection.
+
+    Args:
+        offered (list[str]): The codec names offered by the client, in order of preference.
+
+    Returns:
+        Codec: The first offered codec that is supported, or the default codec.
+    """
+    for name in offered:
+        if name in CODECS:
+            return CODECS[name]
+    return CODECS[DEFAULT_CODEC]
@@ -2,20 +2,153 @@
 This module provides functions for interacting with SQLite databases.
 
 It includes operations such as creating and connecting to databases,
-executing SQL commands, and performing common database operations.
+executing SQL commands, and performing common database operations, and a
+connection pool keeping long-lived connections open for the server.
+
+Dates are stored as 'YYYY-MM-DD' keys, which sort and compare like the dates
+themselves, and are shown to clients as 'DD.MM.YYYY'.
+
+Rows are identified by an explicit `id INTEGER PRIMARY KEY` first column, an alias
+of the rowid that, unlike the implicit rowid, VACUUM never renumbers.
+
+Every write to a table is also recorded in its change log, a table named by
+changes_table whose AUTOINCREMENT version only grows, so clients holding a copy
+of the data can ask for the changes after the last version they have seen.
+
+Text columns can be searched through an FTS5 index, a table named by fts_table
+that reads the indexed table as its external content and is kept in sync by triggers.
+
+Classes:
+    Task: A row of the Tasks table
+    ConnectionPool: Long-lived writer and reader connections to a database
+    GroupCommitWriter: Applies the writes of concurrent requests in shared transactions
 
 Constants:
     INT (str): Represents the SQLite INTEGER data type.
     TEXT (str): Represents the SQLite TEXT data type.
+    KEY (str): Represents the SQLite type of the `id` key of a table.
+    SCHEMA_VERSION (int): The schema version stored in `PRAGMA user_version`.
+    TASK_COLUMNS (str): The select list of the Tasks table with dates in 'DD.MM.YYYY' form.
+    TASK_STORED_COLUMNS (str): The select list of the Tasks table as stored, without the key.
+    CHANGE_ACTIONS (tuple[str, ...]): The actions recorded in a change log.
+    QUERY_COLUMNS (dict[str, str]): The columns of the Tasks table a query can select, with their select expressions.
+    QUERY_FILTERS (tuple[str, ...]): The columns of the Tasks table a query can filter and order by.
+    QUERY_OPERATORS (dict[str, str]): The comparison operators of a query filter, with their SQL form.
+    SYNCHRONOUS_LEVELS (tuple[str, ...]): The `PRAGMA synchronous` levels a GroupCommitWriter commits at.
 """
 
 from src.core.debug import *
 
 import sqlite3
 import sys, os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, NamedTuple
 
 INT = 'INT'
 TEXT = 'TEXT'
+KEY = 'INTEGER PRIMARY KEY'
+
+SCHEMA_VERSION = 2
+
+# 'reset' marks a change log created on a table that already held rows: the versions
+# before it do not describe the table, so clients older than it have to reload it
+CHANGE_ACTIONS = ('add', 'delete', 'delete_all', 'reset')
+
+# from fastest to safest: OFF leaves flushing to the OS, NORMAL syncs the WAL at
+# checkpoints only, FULL syncs it at every commit, EXTRA also syncs its directory
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def date_to_key(date: str) -> str:
+    """
+    Convert a 'DD.MM.YYYY' date to its sortable 'YYYY-MM-DD' key.
+
+    Args:
+        date (str): The date. Keys and strings that are not dates are returned unchanged.
+
+    Returns:
+        str: The date key.
+    """
+    parts = date.split('.')
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return date
+    day, month, year = parts
+    return f'{int(year):04d}-{int(month):02d}-{int(day):02d}'
+
+def key_to_date(key: str) -> str:
+    """
+    Convert a 'YYYY-MM-DD' date key back to its 'DD.MM.YYYY' date.
+
+    Args:
+        key (str): The date key. Strings that are not date keys are returned unchanged.
+
+    Returns:
+        str: The date.
+    """
+    parts = key.split('-')
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return key
+    year, month, day = parts
+    return f'{day}.{month}.{year}'
+
+def key_to_date_sql(column: str) -> str:
+    """
+    Build an SQL expression showing a date key column in 'DD.MM.YYYY' form.
+
+    Args:
+        column (str): The name of the column holding date keys.
+
+    Returns:
+        str: The SQL expression.
+    """
+    return (f"CASE WHEN {column} LIKE '____-__-__' "
+            f"THEN substr({column},9,2)||'.'||substr({column},6,2)||'.'||substr({column},1,4) "
+            f"ELSE {column} END")
+
+TASK_COLUMNS = f"user, user_id, lesson, {key_to_date_sql('date')}, {key_to_date_sql('wait_date')}, text"
+TASK_STORED_COLUMNS = 'user, user_id, lesson, date, wait_date, text'
+
+
+class Task(NamedTuple):
+    """
+    A row of the Tasks table, in the order of its columns.
+
+    Being a tuple, a Task is stored, sent and compared like the plain rows read from
+    the database, with no per-instance dict.
+
+    Attributes:
+        user (str): The name of the user who gave the task.
+        user_id (str): The ID of the client that added the task.
+        lesson (str): The lesson.
+        date (str): The date the task was given, a date key when stored.
+        wait_date (str): The date the task is due, a date key when stored.
+        text (str): The text of the task.
+    """
+
+    user: str
+    user_id: str
+    lesson: str
+    date: str
+    wait_date: str
+    text: str
+
+
+QUERY_COLUMNS = {
+    'user': 'user',
+    'user_id': 'user_id',
+    'lesson': 'lesson',
+    'date': key_to_date_sql('date'),
+    'wait_date': key_to_date_sql('wait_date'),
+    'text': 'text',
+}
+QUERY_FILTERS = ('user', 'user_id', 'lesson', 'date', 'wait_date')
+QUERY_OPERATORS = {'=': '=', '<': '<', '<=': '<=', '>': '>', '>=': '>=', 'in': 'IN'}
 
 
 def create(file_name: str):
@@ -50,6 +183,24 @@ def connect(file_name: str) -> sqlite3.Connection:
     except:
         LogDataBaseNotConnected(file_name)
 
+def open_shared(file_name: str, timeout: float = 5.0) -> sqlite3.Connection:
+    """
+    Open a connection that can be used from any thread, in WAL mode.
+
+    WAL mode lets readers run while a writer is committing.
+
+    Args:
+        file_name (str): The name of the database file to open.
+        timeout (float, optional): Seconds to wait for a lock held by another connection. Defaults to 5.0.
+
+    Returns:
+        sqlite3.Connection: A connection object to the database.
+    """
+    conn = sqlite3.connect(file_name, timeout=timeout, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
 def close(connection: sqlite3.Connection):
     """
     Close the database connection.
@@ -107,7 +258,342 @@ def execute_table_create(cursor: sqlite3.Cursor, connection: sqlite3.Connection,
     
     execute(cursor, connection, command)
 
-def execute_get_all_info(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str):
+def execute_index_create(cursor: sqlite3.Cursor, connection: sqlite3.Connection,
+                         table_name: str, index_name: str, columns: list[str]):
+    """
+    Create an index on columns of a table if it doesn't exist.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection to commit changes.
+        table_name (str): The name of the indexed table.
+        index_name (str): The name of the index.
+        columns (list[str]): The indexed columns, in order.
+    """
+    command = f'CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({",".join(columns)});'
+    execute(cursor, connection, command)
+
+def changes_table(table_name: str) -> str:
+    """
+    Get the name of the change log of a table.
+
+    Args:
+        table_name (str): The name of the table.
+
+    Returns:
+        str: The name of its change log.
+    """
+    return f'{table_name}_changes'
+
+def execute_changes_create(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str):
+    """
+    Create the change log of a table if it doesn't exist.
+
+    The change log has a `version` AUTOINCREMENT key, the `action`, the `row_id` of the
+    changed row and a copy of the other columns of the table. It is created inside an
+    immediate transaction, so processes opening the same database at once create it only once.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection to commit changes.
+        table_name (str): The name of the logged table, which must exist.
+    """
+    changes = changes_table(table_name)
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", (changes,))
+        if cursor.fetchone() is None:
+            cursor.execute(f'PRAGMA table_info({table_name});')
+            columns = ','.join(f'{name} {type}' for _, name, type, _, _, key in cursor.fetchall() if not key)
+            cursor.execute(f'CREATE TABLE {changes}(version INTEGER PRIMARY KEY AUTOINCREMENT, '
+                           f'action TEXT NOT NULL, row_id INTEGER, {columns});')
+            cursor.execute(f'SELECT EXISTS(SELECT 1 FROM {table_name});')
+            if cursor.fetchone()[0]:
+                cursor.execute(f"INSERT INTO {changes}(action) VALUES('reset');")
+        connection.commit()
+    except:
+        connection.rollback()
+        raise
+
+def fts_table(table_name: str) -> str:
+    """
+    Get the name of the full-text index of a table.
+
+    Args:
+        table_name (str): The name of the table.
+
+    Returns:
+        str: The name of its FTS5 table.
+    """
+    return f'{table_name}_fts'
+
+def execute_fts_create(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str, columns: list[str]):
+    """
+    Create the full-text index of columns of a table if it doesn't exist.
+
+    The index is an FTS5 table with the table as external content, so the text is not
+    stored twice, and its rows are keyed on the `id` key of the table. Triggers add and remove the rows of the index when rows of the table
+    are inserted, updated or deleted, and the rows already in the table are indexed once
+    when the index is created.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection to commit changes.
+        table_name (str): The name of the indexed table, which must exist.
+        columns (list[str]): The indexed columns.
+    """
+    fts = fts_table(table_name)
+    names = ','.join(columns)
+    new = ','.join(f'new.{column}' for column in columns)
+    old = ','.join(f'old.{column}' for column in columns)
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", (fts,))
+        if cursor.fetchone() is None:
+            cursor.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table_name}', "
+                           f"content_rowid='id');")
+            cursor.execute(f'CREATE TRIGGER {fts}_insert AFTER INSERT ON {table_name} BEGIN '
+                           f'INSERT INTO {fts}(rowid,{names}) VALUES(new.id,{new}); END;')
+            cursor.execute(f'CREATE TRIGGER {fts}_delete AFTER DELETE ON {table_name} BEGIN '
+                           f"INSERT INTO {fts}({fts},rowid,{names}) VALUES('delete',old.id,{old}); END;")
+            cursor.execute(f'CREATE TRIGGER {fts}_update AFTER UPDATE ON {table_name} BEGIN '
+                           f"INSERT INTO {fts}({fts},rowid,{names}) VALUES('delete',old.id,{old}); "
+                           f'INSERT INTO {fts}(rowid,{names}) VALUES(new.id,{new}); END;')
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES('rebuild');")
+        connection.commit()
+    except:
+        connection.rollback()
+        raise
+
+def fts_match(query: str) -> str:
+    """
+    Build an FTS5 match expression from the words of a free text query.
+
+    Every word is quoted, so characters of the FTS5 query syntax typed by a user are
+    searched for instead of failing the query, and matches as a prefix, so 'физ'
+    finds 'физика'. A row matches when it holds all the words.
+
+    Args:
+        query (str): The query.
+
+    Returns:
+        str: The match expression, empty if the query holds no word.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+def parse_filter(where: dict) -> tuple[tuple[tuple[str, str, int], ...], list]:
+    """
+    Split a query filter of the Tasks table into its shape and its values.
+
+    A filter maps columns of QUERY_FILTERS to a value, matched for equality, or to a dict
+    of QUERY_OPERATORS and values, e.g. {'lesson': 'math', 'wait_date': {'>=': '01.09.2024',
+    '<=': '07.09.2024'}}; the value of 'in' is a list. Dates are given as 'DD.MM.YYYY'
+    and compared as date keys. Filters of the same shape compile to the same statement.
+
+    Args:
+        where (dict): The filter.
+
+    Returns:
+        tuple[tuple[tuple[str, str, int], ...], list]: The conditions as (column, operator, number
+            of values) in a canonical order, and the values in the order of the conditions.
+
+    Raises:
+        ValueError: If the filter is not a dict, a column or an operator is not allowed,
+            or the values of 'in' are not a list.
+    """
+    if not isinstance(where, dict):
+        raise ValueError(f'the filter must be a dict, not {type(where).__name__}')
+    conditions, parameters = [], []
+    for column in sorted(where):
+        if column not in QUERY_FILTERS:
+            raise ValueError(f'can not filter by {column!r}, expected one of {list(QUERY_FILTERS)}')
+        condition = where[column]
+        if not isinstance(condition, dict):
+            condition = {'=': condition}
+        for operator in sorted(condition):
+            if operator not in QUERY_OPERATORS:
+                raise ValueError(f'unknown operator {operator!r}, expected one of {list(QUERY_OPERATORS)}')
+            values = condition[operator]
+            if operator == 'in':
+                if not isinstance(values, (list, tuple)) or not values:
+                    raise ValueError("the values of 'in' must be a non-empty list")
+            else:
+                values = [values]
+            if column in ('date', 'wait_date'):
+                values = [date_to_key(value) if isinstance(value, str) else value for value in values]
+            conditions.append((column, operator, len(values)))
+            parameters.extend(values)
+    return tuple(conditions), parameters
+
+@lru_cache(maxsize=256)
+def compile_query(table_name: str, conditions: tuple[tuple[str, str, int], ...], columns: tuple[str, ...],
+                  order_by: str | None = None, descending: bool = False, limited: bool = False) -> str:
+    """
+    Compile the shape of a query of the Tasks table into one parameterized statement.
+
+    Only whitelisted columns and operators reach the SQL text and every value is a
+    placeholder, so the statement is safe and the same for every query of the shape:
+    it is compiled once here and prepared once by the statement cache of each connection.
+    The conditions compare the stored columns with no function applied to them, so the
+    indexes on date, wait_date, (user, date) and (lesson, wait_date) can be used.
+
+    Args:
+        table_name (str): The name of the table.
+        conditions (tuple[tuple[str, str, int], ...]): The conditions, see parse_filter.
+        columns (tuple[str, ...]): The selected columns of QUERY_COLUMNS, in order.
+        order_by (str | None, optional): The column of QUERY_FILTERS to order by. Defaults to None, no order.
+        descending (bool, optional): Order from the largest value. Defaults to False.
+        limited (bool, optional): End with a LIMIT placeholder. Defaults to False.
+
+    Returns:
+        str: The statement.
+
+    Raises:
+        ValueError: If a column is not allowed.
+    """
+    for column in columns:
+        if column not in QUERY_COLUMNS:
+            raise ValueError(f'can not select {column!r}, expected some of {list(QUERY_COLUMNS)}')
+    if not columns:
+        raise ValueError('no column selected')
+    if order_by is not None and order_by not in QUERY_FILTERS:
+        raise ValueError(f'can not order by {order_by!r}, expected one of {list(QUERY_FILTERS)}')
+    command = f'SELECT {", ".join(QUERY_COLUMNS[column] for column in columns)} FROM {table_name}'
+    if conditions:
+        command += ' WHERE ' + ' AND '.join(
+            f'{column} IN ({",".join("?" * count)})' if operator == 'in' else f'{column} {QUERY_OPERATORS[operator]} ?'
+            for column, operator, count in conditions
+        )
+    if order_by is not None:
+        command += f' ORDER BY {order_by}{" DESC" if descending else ""}'
+    if limited:
+        command += ' LIMIT ?'
+    return command + ';'
+
+def execute_log_changes(cursor: sqlite3.Cursor, table_name: str, action: str, where: str, parameters: tuple = ()):
+    """
+    Record rows of a table in its change log, in the transaction of the change.
+
+    The `id` key, the first column of the table, is recorded as the row_id of the change.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        table_name (str): The name of the logged table.
+        action (str): The action, one of CHANGE_ACTIONS.
+        where (str): The condition selecting the changed rows, with ? placeholders.
+        parameters (tuple, optional): The values of the placeholders. Defaults to ().
+    """
+    cursor.execute(f'INSERT INTO {changes_table(table_name)} SELECT NULL, ?, * FROM {table_name} WHERE {where};',
+                   (action, *parameters))
+
+def apply_prune_changes(cursor: sqlite3.Cursor, table_name: str, keep: int) -> int:
+    """
+    Trim the change log of a table to its latest versions, in the current transaction.
+
+    The versions older than the last `keep` are deleted and replaced by a 'reset' at the
+    newest deleted version, so a caller that has not seen them gets the whole table from
+    execute_get_changes_since instead of an incomplete list of changes.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        table_name (str): The name of the logged table.
+        keep (int): The number of latest versions kept.
+
+    Returns:
+        int: The number of deleted versions.
+    """
+    changes = changes_table(table_name)
+    cursor.execute(f'SELECT coalesce(max(version), 0) FROM {changes};')
+    cutoff = cursor.fetchone()[0] - keep
+    cursor.execute(f"SELECT count(*) FROM {changes} WHERE version <= ? AND NOT (version = ? AND action = 'reset');",
+                   (cutoff, cutoff))
+    pruned = cursor.fetchone()[0]
+    if pruned:
+        cursor.execute(f'DELETE FROM {changes} WHERE version <= ?;', (cutoff,))
+        cursor.execute(f"INSERT INTO {changes}(version, action) VALUES(?, 'reset');", (cutoff,))
+    return pruned
+
+def execute_prune_changes(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str, keep: int) -> int:
+    """
+    Trim the change log of a table to its latest versions in an immediate transaction, see apply_prune_changes.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection to commit changes.
+        table_name (str): The name of the logged table.
+        keep (int): The number of latest versions kept.
+
+    Returns:
+        int: The number of deleted versions.
+    """
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        pruned = apply_prune_changes(cursor, table_name, keep)
+        connection.commit()
+        return pruned
+    except:
+        connection.rollback()
+        raise
+
+def execute_migrate_dates(cursor: sqlite3.Cursor, connection: sqlite3.Connection,
+                          table_name: str, columns: list[str]):
+    """
+    Convert the 'DD.MM.YYYY' dates of a database created before schema version 1 to date keys.
+
+    The conversion runs once: the database is marked with schema version 1 afterwards.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection to commit changes.
+        table_name (str): The name of the table holding the dates.
+        columns (list[str]): The columns holding dates.
+    """
+    cursor.execute('PRAGMA user_version;')
+    if cursor.fetchone()[0] >= 1:
+        return
+    for column in columns:
+        cursor.execute(f'SELECT DISTINCT {column} FROM {table_name};')
+        keys = [(date_to_key(date), date) for date, in cursor.fetchall() if date is not None]
+        cursor.executemany(f'UPDATE {table_name} SET {column} = ? WHERE {column} = ?', keys)
+    cursor.execute('PRAGMA user_version = 1;')
+    connection.commit()
+
+def execute_migrate_ids(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str):
+    """
+    Give a table of a database created before schema version 2 an explicit `id` key.
+
+    The table is rebuilt with an `id INTEGER PRIMARY KEY` first column set to the rowid of
+    every row, so the row_ids of the change log and the page cursors already given out
+    stay valid. Its indexes and its full-text index are dropped with it and have to be
+    created again. The rebuild runs once, inside an immediate transaction, and the
+    database is marked with SCHEMA_VERSION afterwards.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection to commit changes.
+        table_name (str): The name of the table, which must exist.
+    """
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute('PRAGMA user_version;')
+        if cursor.fetchone()[0] < SCHEMA_VERSION:
+            cursor.execute(f'PRAGMA table_info({table_name});')
+            columns = cursor.fetchall()
+            if not any(name == 'id' and key for _, name, _, _, _, key in columns):
+                names = ','.join(name for _, name, *_ in columns)
+                types = ','.join(f'{name} {type}' for _, name, type, *_ in columns)
+                cursor.execute(f'DROP TABLE IF EXISTS {fts_table(table_name)};')
+                cursor.execute(f'CREATE TABLE {table_name}_migrated(id {KEY},{types});')
+                cursor.execute(f'INSERT INTO {table_name}_migrated SELECT rowid,{names} FROM {table_name};')
+                cursor.execute(f'DROP TABLE {table_name};')
+                cursor.execute(f'ALTER TABLE {table_name}_migrated RENAME TO {table_name};')
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION};')
+        connection.commit()
+    except:
+        connection.rollback()
+        raise
+
+def execute_get_all_info(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str, columns: str = '*'):
     """
     Retrieve all information from a specified table.
 
@@ -115,15 +601,185 @@ def execute_get_all_info(cursor: sqlite3.Cursor, connection: sqlite3.Connection,
         cursor (sqlite3.Cursor): The cursor to execute the command.
         connection (sqlite3.Connection): The database connection.
         table_name (str): The name of the table to retrieve information from.
+        columns (str, optional): The select list. Defaults to '*'.
 
     Returns:
         list: A list of all rows in the specified table.
     """
-    command = f'SELECT * FROM {table_name};'
+    command = f'SELECT {columns} FROM {table_name};'
     execute(cursor, connection, command)
     return cursor.fetchall()
 
-def execute_add_info(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str, info: list):
+def execute_get_for_date(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str, date: str,
+                         columns: str = '*'):
+    """
+    Retrieve the rows of a table given on a date, using the index on `date`.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection.
+        table_name (str): The name of the table to retrieve information from.
+        date (str): The date key the rows were given on.
+        columns (str, optional): The select list. Defaults to '*'.
+
+    Returns:
+        list: A list of the matching rows.
+    """
+    cursor.execute(f'SELECT {columns} FROM {table_name} WHERE date = ?;', (date,))
+    return cursor.fetchall()
+
+def execute_get_for_wait_date(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str, wait_date: str,
+                              columns: str = '*'):
+    """
+    Retrieve the rows of a table due on a date, using the index on `wait_date`.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection.
+        table_name (str): The name of the table to retrieve information from.
+        wait_date (str): The date key the rows are due on.
+        columns (str, optional): The select list. Defaults to '*'.
+
+    Returns:
+        list: A list of the matching rows.
+    """
+    cursor.execute(f'SELECT {columns} FROM {table_name} WHERE wait_date = ?;', (wait_date,))
+    return cursor.fetchall()
+
+def execute_get_for_user_date(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str,
+                              name: str, date: str, columns: str = '*'):
+    """
+    Retrieve the rows of a table given to a user on a date, using the index on `(user, date)`.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection.
+        table_name (str): The name of the table to retrieve information from.
+        name (str): The user name to match.
+        date (str): The date key the rows were given on.
+        columns (str, optional): The select list. Defaults to '*'.
+
+    Returns:
+        list: A list of the matching rows.
+    """
+    cursor.execute(f'SELECT {columns} FROM {table_name} WHERE user = ? AND date = ?;', (name, date))
+    return cursor.fetchall()
+
+def execute_get_due_between(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str,
+                            start: str, end: str, columns: str = '*'):
+    """
+    Retrieve the rows of a table due between two dates, using a range scan of the index on `wait_date`.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection.
+        table_name (str): The name of the table to retrieve information from.
+        start (str): The first date key of the range, included.
+        end (str): The last date key of the range, included.
+        columns (str, optional): The select list. Defaults to '*'.
+
+    Returns:
+        list: A list of the matching rows, ordered by wait_date.
+    """
+    cursor.execute(f'SELECT {columns} FROM {table_name} WHERE wait_date BETWEEN ? AND ? ORDER BY wait_date;', (start, end))
+    return cursor.fetchall()
+
+def execute_get_assigned_since(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str,
+                               date: str, columns: str = '*'):
+    """
+    Retrieve the rows of a table given on or after a date, using a range scan of the index on `date`.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection.
+        table_name (str): The name of the table to retrieve information from.
+        date (str): The first date key, included.
+        columns (str, optional): The select list. Defaults to '*'.
+
+    Returns:
+        list: A list of the matching rows, ordered by date.
+    """
+    cursor.execute(f'SELECT {columns} FROM {table_name} WHERE date >= ? ORDER BY date;', (date,))
+    return cursor.fetchall()
+
+def execute_get_page(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str,
+                     after: int, page_size: int, columns: str = '*'):
+    """
+    Retrieve a page of rows of a table in id order, seeking past the previous page with the `id` key.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection.
+        table_name (str): The name of the table to retrieve information from.
+        after (int): The id of the last row of the previous page, 0 for the first page.
+        page_size (int): The maximum number of rows of the page.
+        columns (str, optional): The select list. Defaults to '*'.
+
+    Returns:
+        list: A list of the rows of the page, each prefixed by its id.
+    """
+    cursor.execute(f'SELECT id, {columns} FROM {table_name} WHERE id > ? ORDER BY id LIMIT ?;',
+                   (after, page_size))
+    return cursor.fetchall()
+
+def apply_add_info(cursor: sqlite3.Cursor, table_name: str, info: list | Task):
+    """
+    Add a new row of information to a specified table, in the current transaction.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        table_name (str): The name of the table to add information to.
+        info (list | Task): A list of values to insert into the table.
+    """
+    wait_string = ','.join('?' * len(info))
+    cursor.execute(f'INSERT INTO {table_name} VALUES(NULL,{wait_string})', info)
+    execute_log_changes(cursor, table_name, 'add', 'id = ?', (cursor.lastrowid,))
+
+def apply_add_many(cursor: sqlite3.Cursor, table_name: str, infos: list[list] | list[Task]):
+    """
+    Add many rows of information to a specified table, in the current transaction.
+
+    The transaction must hold the write lock, e.g. opened with BEGIN IMMEDIATE, so the
+    rows logged as added, those after the largest id, are exactly the inserted ones.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        table_name (str): The name of the table to add information to.
+        infos (list[list] | list[Task]): The rows to insert, each a list of values.
+    """
+    if not infos:
+        return
+    wait_string = ','.join('?' * len(infos[0]))
+    cursor.execute(f'SELECT coalesce(max(id), 0) FROM {table_name};')
+    last = cursor.fetchone()[0]
+    cursor.executemany(f'INSERT INTO {table_name} VALUES(NULL,{wait_string})', infos)
+    execute_log_changes(cursor, table_name, 'add', 'id > ?', (last,))
+
+def apply_delete_info(cursor: sqlite3.Cursor, table_name: str, name: str, date: str):
+    """
+    Delete the rows of a user on a date from a table, in the current transaction.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        table_name (str): The name of the table to delete from.
+        name (str): The user name to match for deletion.
+        date (str): The date to match for deletion.
+    """
+    execute_log_changes(cursor, table_name, 'delete', 'user = ? and date = ?', (name, date))
+    cursor.execute(f'DELETE from {table_name} where user = ? and date = ?', (name, date))
+
+def apply_delete_all(cursor: sqlite3.Cursor, table_name: str):
+    """
+    Delete all rows from a specified table, in the current transaction.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        table_name (str): The name of the table to delete all rows from.
+    """
+    cursor.execute(f"INSERT INTO {changes_table(table_name)}(action) VALUES('delete_all');")
+    cursor.execute(f'DELETE from {table_name}')
+
+def execute_add_info(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str, info: list | Task):
     """
     Add a new row of information to a specified table.
 
@@ -131,18 +787,39 @@ def execute_add_info(cursor: sqlite3.Cursor, connection: sqlite3.Connection, tab
         cursor (sqlite3.Cursor): The cursor to execute the command.
         connection (sqlite3.Connection): The database connection to commit changes.
         table_name (str): The name of the table to add information to.
-        info (list): A list of values to insert into the table.
+        info (list | Task): A list of values to insert into the table.
     """
-    info_len = len(info)
+    try:
+        apply_add_info(cursor, table_name, info)
+        connection.commit()
+    except:
+        connection.rollback()
+        raise
 
-    wait_string = ''
-    for i in range(info_len):
-        wait_string += '?'
-        if i != info_len - 1:
-            wait_string += ','
+def execute_add_many(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str,
+                     infos: list[list] | list[Task]):
+    """
+    Add many rows of information to a specified table in a single transaction.
 
-    cursor.execute(f'INSERT INTO {table_name} VALUES({wait_string})', info)
-    connection.commit()
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection to commit changes.
+        table_name (str): The name of the table to add information to.
+        infos (list[list] | list[Task]): The rows to insert, each a list of values.
+
+    Returns:
+        list: A list containing a success or error message.
+    """
+    if not infos:
+        return ['Add success']
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        apply_add_many(cursor, table_name, infos)
+        connection.commit()
+        return ['Add success']
+    except sqlite3.Error:
+        connection.rollback()
+        return ['Add error']
 
 def execute_delete_info(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str, name: str, date: str):
     """
@@ -159,12 +836,12 @@ def execute_delete_info(cursor: sqlite3.Cursor, connection: sqlite3.Connection,
         list: A list containing a success or error message.
     """
     try:
-        command = f'DELETE from {table_name} where user = ? and date = ?'
-        cursor.execute(command, (name, date))
+        apply_delete_info(cursor, table_name, name, date)
         connection.commit()
         LogInformationDeleted(name, date)
         return ['Delete success']
     except:
+        connection.rollback()
         return ['Delete error']
 
 def execute_delete_all(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str):
@@ -180,10 +857,407 @@ def execute_delete_all(cursor: sqlite3.Cursor, connection: sqlite3.Connection, t
         list: A list containing a success or error message.
     """
     try:
-        command = f'DELETE from {table_name}'
-        cursor.execute(command)
+        apply_delete_all(cursor, table_name)
         connection.commit()
         LogAllInformationDeleted()
         return ['Delete success']
     except:
+        connection.rollback()
         return ['Delete error']
+
+
+def execute_get_latest_version(cursor: sqlite3.Cursor, table_name: str) -> int:
+    """
+    Retrieve the latest version of the change log of a table.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        table_name (str): The name of the logged table.
+
+    Returns:
+        int: The latest version, 0 if nothing was logged.
+    """
+    cursor.execute(f'SELECT coalesce(max(version), 0) FROM {changes_table(table_name)};')
+    return cursor.fetchone()[0]
+
+
+def execute_get_logged_changes(cursor: sqlite3.Cursor, table_name: str, version: int, limit: int,
+                               columns: str = '*') -> list:
+    """
+    Retrieve the changes logged for a table after a version, without the 'reset' markers.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        table_name (str): The name of the logged table.
+        version (int): The last version seen by the caller.
+        limit (int): The maximum number of changes returned.
+        columns (str, optional): The select list of the rows. Defaults to '*'.
+
+    Returns:
+        list: The changes, each prefixed by its version, action and row_id.
+    """
+    cursor.execute(f"SELECT version, action, row_id, {columns} FROM {changes_table(table_name)} "
+                   f"WHERE version > ? AND action != 'reset' ORDER BY version LIMIT ?;", (version, limit))
+    return cursor.fetchall()
+
+
+def execute_get_changes_since(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str,
+                              version: int, limit: int, columns: str = '*') -> dict:
+    """
+    Retrieve the changes of a table after a version of its change log.
+
+    Everything is read in one transaction, so the rows and the changes match the version
+    returned. When the version can not be brought up to date from the log (0, older than
+    a 'reset' or newer than the log, e.g. from another database) the whole table is
+    returned instead.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection.
+        table_name (str): The name of the logged table.
+        version (int): The last version seen by the caller, 0 if it has no copy of the table.
+        limit (int): The maximum number of changes returned.
+        columns (str, optional): The select list of the rows. Defaults to '*'.
+
+    Returns:
+        dict: The 'latest' version of the log and either the 'rows' of the table, each prefixed
+            by its id, or the 'changes', each prefixed by its version, action and row_id.
+    """
+    changes = changes_table(table_name)
+    cursor.execute('BEGIN')
+    try:
+        cursor.execute(f"SELECT coalesce(max(version), 0), "
+                       f"coalesce(max(CASE WHEN action = 'reset' THEN version END), 0) FROM {changes};")
+        latest, reset = cursor.fetchone()
+        if version <= 0 or version < reset or version > latest:
+            cursor.execute(f'SELECT id, {columns} FROM {table_name} ORDER BY id;')
+            return {'latest': latest, 'rows': cursor.fetchall()}
+        return {'latest': latest, 'changes': execute_get_logged_changes(cursor, table_name, version, limit, columns)}
+    finally:
+        connection.commit()
+
+def execute_search(cursor: sqlite3.Cursor, connection: sqlite3.Connection, table_name: str, match: str,
+                   limit: int, lesson: str | None = None, columns: str = '*'):
+    """
+    Retrieve the rows of a table matching a full-text query, best match first.
+
+    The matches are ranked by bm25 in the full-text index and only then joined to the
+    table, so the rows are read for the matches only.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection.
+        table_name (str): The name of the table, which must have a full-text index.
+        match (str): The FTS5 match expression, see fts_match.
+        limit (int): The maximum number of rows.
+        lesson (str | None, optional): Only the rows of this lesson. Defaults to None, any lesson.
+        columns (str, optional): The select list. Defaults to '*'.
+
+    Returns:
+        list: A list of the matching rows.
+    """
+    cursor.execute(f'WITH hits AS (SELECT rowid AS row_id, rank AS score FROM {fts_table(table_name)} '
+                   f'WHERE {fts_table(table_name)} MATCH ?) '
+                   f'SELECT {columns} FROM hits JOIN {table_name} ON {table_name}.id = hits.row_id '
+                   f'WHERE ? IS NULL OR lesson = ? ORDER BY hits.score LIMIT ?;',
+                   (match, lesson, lesson, limit))
+    return cursor.fetchall()
+
+def execute_query(cursor: sqlite3.Cursor, connection: sqlite3.Connection, command: str, parameters: list):
+    """
+    Retrieve the rows selected by a compiled query.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor to execute the command.
+        connection (sqlite3.Connection): The database connection.
+        command (str): The statement, see compile_query.
+        parameters (list): The values of its placeholders, in order.
+
+    Returns:
+        list: A list of the selected rows.
+    """
+    cursor.execute(command, parameters)
+    return cursor.fetchall()
+
+class ConnectionPool:
+    """
+    Keeps one long-lived writer connection and a pool of reader connections to a database.
+
+    The writer is shared by all threads and used by one thread at a time; readers are
+    checked out of a queue, so several reads can run at once, also while a write is
+    in progress.
+
+    Attributes:
+        file_name (str): The name of the database file.
+        writer_connect (sqlite3.Connection): The connection used for writes.
+        writer_lock (threading.Lock): Serializes the use of the writer connection.
+        readers (queue.Queue[sqlite3.Connection]): The idle reader connections.
+        timing_hook (Callable[[str, float], None] | None): Called with 'db_wait' and the seconds spent
+            waiting for a connection, then with 'db' and the seconds it was used.
+    """
+
+    timing_hook: Callable[[str, float], None] | None = None
+
+    def __init__(self, file_name: str, readers: int = 4, timeout: float = 5.0):
+        """
+        Open the connections of the pool.
+
+        Args:
+            file_name (str): The name of the database file.
+            readers (int, optional): The number of reader connections. Defaults to 4.
+            timeout (float, optional): Seconds to wait for a lock held by another connection. Defaults to 5.0.
+        """
+        self.file_name = file_name
+        self.writer_connect = open_shared(file_name, timeout)
+        self.writer_lock = threading.Lock()
+        self.readers: queue.Queue[sqlite3.Connection] = queue.Queue()
+        for _ in range(readers):
+            self.readers.put(open_shared(file_name, timeout))
+        LogDataBaseConnect(file_name)
+
+    @contextmanager
+    def reader(self, raw: bool = False):
+        """
+        Check out a reader connection for the duration of a with block.
+
+        Args:
+            raw (bool, optional): Read text as the UTF-8 bytes stored by SQLite instead of str,
+                for rows that are only sent on, see codec.TextRows. Defaults to False.
+
+        Yields:
+            tuple[sqlite3.Cursor, sqlite3.Connection]: A cursor and its connection.
+        """
+        started = time.perf_counter()
+        connection = self.readers.get()
+        checked_out = time.perf_counter()
+        if raw:
+            connection.text_factory = bytes
+        try:
+            yield connection.cursor(), connection
+        finally:
+            if raw:
+                connection.text_factory = str
+            self.readers.put(connection)
+            if self.timing_hook is not None:
+                self.timing_hook('db_wait', checked_out - started)
+                self.timing_hook('db', time.perf_counter() - checked_out)
+
+    @contextmanager
+    def writer(self, timed: bool = True):
+        """
+        Lock the writer connection for the duration of a with block.
+
+        Args:
+            timed (bool, optional): Report the timings to timing_hook, False for a caller
+                timing the block itself, like GroupCommitWriter. Defaults to True.
+
+        Yields:
+            tuple[sqlite3.Cursor, sqlite3.Connection]: A cursor and its connection.
+        """
+        started = time.perf_counter()
+        with self.writer_lock:
+            locked = time.perf_counter()
+            try:
+                yield self.writer_connect.cursor(), self.writer_connect
+            finally:
+                if timed and self.timing_hook is not None:
+                    self.timing_hook('db_wait', locked - started)
+                    self.timing_hook('db', time.perf_counter() - locked)
+
+    def close(self):
+        """
+        Close every connection of the pool.
+        """
+        with self.writer_lock:
+            close(self.writer_connect)
+        while not self.readers.empty():
+            close(self.readers.get())
+
+class GroupCommitWriter:
+    """
+    Applies the writes of concurrent requests in shared transactions, committing them together.
+
+    Writes are queued and a writer thread collects them for up to `window` seconds or
+    `max_batch` writes, waiting only until as many writes as in the last batch came in
+    so a lone client is not delayed, then applies them one after another in a single transaction
+    on the writer connection of the pool, each in its own savepoint so a failed write
+    is undone without undoing the others. The transaction is committed once, at the
+    `synchronous` level, and only then are the futures of the writes resolved, so an
+    acknowledged write is as durable as that level makes it while the cost of the
+    commit is shared by the whole batch.
+
+    Every write is timed under the label it was submitted with: 'db_wait' from its
+    submission until its batch holds the writer, and 'db' for applying it plus an
+    equal share of the BEGIN and the COMMIT of its batch, so a batch holding writes of
+    several labels splits its commit among them.
+
+    Attributes:
+        pool (ConnectionPool): The pool whose writer connection is used.
+        window (float): The seconds to wait for more writes after the first of a batch.
+        max_batch (int): The maximum number of writes in a batch.
+        synchronous (str): The `PRAGMA synchronous` level of the commits, one of SYNCHRONOUS_LEVELS.
+        writes (queue.Queue): The writes waiting for the writer thread.
+        thread (threading.Thread | None): The writer thread, started by the first write.
+        batches (int): The number of committed batches.
+        committed (int): The number of writes in the committed batches.
+        last_batch (int): The number of writes in the last batch.
+        label_hook (Callable[[], str] | None): Called by submit for the label of a write, e.g. the
+            type of the request making it; None labels every write None.
+        timing_hook (Callable[[str | None, str, float], None] | None): Called with the label of a write,
+            'db_wait' or 'db' and the seconds spent, once its batch is committed.
+    """
+
+    label_hook: Callable[[], str] | None = None
+    timing_hook: Callable[[str | None, str, float], None] | None = None
+
+    def __init__(self, pool: ConnectionPool, window: float = 0.002, max_batch: int = 512,
+                 synchronous: str = 'NORMAL'):
+        """
+        Set the synchronous level of the writer connection.
+
+        Args:
+            pool (ConnectionPool): The pool whose writer connection is used.
+            window (float, optional): The seconds to wait for more writes after the first of a batch,
+                0 to only batch the writes already queued. Defaults to 0.002.
+            max_batch (int, optional): The maximum number of writes in a batch. Defaults to 512.
+            synchronous (str, optional): The `PRAGMA synchronous` level of the commits. Defaults to 'NORMAL'.
+
+        Raises:
+            ValueError: If the synchronous level is not one of SYNCHRONOUS_LEVELS or max_batch is not positive.
+        """
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f'unknown synchronous level {synchronous!r}, expected one of {SYNCHRONOUS_LEVELS}')
+        if max_batch <= 0:
+            raise ValueError('max_batch must be positive')
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self.synchronous = synchronous
+        self.writes: queue.Queue[tuple[Callable, Callable | None, Future, str | None, float]] = queue.Queue()
+        self.thread: threading.Thread | None = None
+        self.start_lock = threading.Lock()
+        self.batches = 0
+        self.committed = 0
+        self.last_batch = 0
+        with pool.writer() as (cursor, connection):
+            cursor.execute(f'PRAGMA synchronous={synchronous}')
+
+    def submit(self, write: Callable[[sqlite3.Cursor], object],
+               committed: Callable[[object], object] | None = None) -> Future:
+        """
+        Queue a write for the next batch.
+
+        Args:
+            write (Callable[[sqlite3.Cursor], object]): Applies the write with the cursor of
+                the open transaction, without committing, e.g. with apply_add_info.
+            committed (Callable[[object], object] | None, optional): Called with the result of
+                the write once its batch is committed, still under the writer; its return
+                value becomes the result of the future. Defaults to None.
+
+        Returns:
+            Future: Resolved with the result once the batch is committed, or failed with
+                the exception of the write or of the commit.
+        """
+        if self.thread is None:
+            # started lazily, so a process forked before the first write holds no thread
+            with self.start_lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run_, daemon=True)
+                    self.thread.start()
+        future = Future()
+        label = self.label_hook() if self.label_hook is not None else None
+        self.writes.put((write, committed, future, label, time.perf_counter()))
+        return future
+
+    def collect_(self) -> list[tuple[Callable, Callable | None, Future, str | None, float]]:
+        """
+        Wait for the first write of a batch, then collect more until the window ends or the batch is full.
+
+        The window is only waited for until the batch holds as many writes as the last
+        one, the number of writers seen to be concurrent; after that, and for a lone
+        writer, only the writes already queued are collected.
+
+        Returns:
+            list[tuple[Callable, Callable | None, Future, str | None, float]]: The writes of the batch,
+                in order, with their label and the time they were submitted.
+        """
+        batch = [self.writes.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter() if len(batch) < self.last_batch else 0
+            try:
+                batch.append(self.writes.get(timeout=remaining) if remaining > 0 else self.writes.get_nowait())
+            except queue.Empty:
+                break
+        self.last_batch = len(batch)
+        return batch
+
+    def run_(self):
+        """
+        Apply and commit batches of writes, blocking while there are none.
+        """
+        while True:
+            self.apply_(self.collect_())
+
+    def apply_(self, batch: list[tuple[Callable, Callable | None, Future, str | None, float]]):
+        """
+        Apply a batch of writes in one transaction and resolve their futures once it is committed.
+
+        Args:
+            batch (list[tuple[Callable, Callable | None, Future, str | None, float]]): The writes of
+                the batch, in order, with their label and the time they were submitted.
+        """
+        outcomes = []
+        spent = []
+        with self.pool.writer(timed=False) as (cursor, connection):
+            locked = time.perf_counter()
+            try:
+                cursor.execute('BEGIN IMMEDIATE')
+                for write, committed, future, label, submitted in batch:
+                    started = time.perf_counter()
+                    cursor.execute('SAVEPOINT batch_write')
+                    try:
+                        outcomes.append((True, write(cursor)))
+                    except Exception as error:
+                        cursor.execute('ROLLBACK TO batch_write')
+                        outcomes.append((False, error))
+                    cursor.execute('RELEASE batch_write')
+                    spent.append(time.perf_counter() - started)
+                connection.commit()
+            except Exception as error:
+                if connection.in_transaction:
+                    connection.rollback()
+                for _, _, future, _, _ in batch:
+                    future.set_exception(error)
+                return
+            shared = (time.perf_counter() - locked - sum(spent)) / len(batch)
+            self.batches += 1
+            self.committed += len(batch)
+            for index, ((write, committed, future, _, _), (succeeded, result)) in enumerate(zip(batch, outcomes)):
+                if succeeded and committed is not None:
+                    try:
+                        outcomes[index] = (True, committed(result))
+                    except Exception as error:
+                        outcomes[index] = (False, error)
+        if self.timing_hook is not None:
+            for (_, _, _, label, submitted), seconds in zip(batch, spent):
+                self.timing_hook(label, 'db_wait', locked - submitted)
+                self.timing_hook(label, 'db', seconds + shared)
+        for (_, _, future, _, _), (succeeded, result) in zip(batch, outcomes):
+            if succeeded:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
+
+    def info(self) -> dict:
+        """
+        Summarize the batching.
+
+        Returns:
+            dict: The number of committed 'batches' and 'writes', the mean 'batch_size',
+                the 'queued' writes and the 'synchronous' level.
+        """
+        return {'batches': self.batches, 'writes': self.committed,
+                'batch_size': self.committed / self.batches if self.batches else 0.0,
+                'queued': self.writes.qsize(), 'synchronous': self.synchronous}
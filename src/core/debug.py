@@ -1,5 +1,14 @@
 from colorama import Fore
 
+import atexit
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
 # Define color-coded log prefixes
 LOG = f'[ {Fore.CYAN}log{Fore.RESET} ]'
 SERVER = f'[ {Fore.YELLOW}server{Fore.RESET} ]'
@@ -10,6 +19,184 @@ DATABASE = f'[ {Fore.RED}database{Fore.RESET} ]'
 YES = f'{Fore.GREEN} [ yes ] {Fore.RESET}'
 NO = f'{Fore.RED} [ no ] {Fore.RESET}'
 
+# Define log levels, messages below the current level are dropped before they are formatted
+LEVEL_DEBUG = 10
+LEVEL_INFO = 20
+LEVEL_WARNING = 30
+LEVEL_ERROR = 40
+
+LEVEL_NAMES = {LEVEL_DEBUG: 'debug', LEVEL_INFO: 'info', LEVEL_WARNING: 'warning', LEVEL_ERROR: 'error'}
+SOURCES = {'server': SERVER, 'client': CLIENT, 'database': DATABASE}
+
+# Define output modes: colored lines, lines without colors, or one JSON object per line
+LOG_MODES = ('console', 'plain', 'json')
+
+_ANSI = re.compile(r'\x1b\[[0-9;]*m')
+
+_level = LEVEL_DEBUG
+_mode = 'console'
+_output = sys.stdout
+_records = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def LogConfigure(level: int = LEVEL_DEBUG, file: str | None = None, mode: str = 'console') -> None:
+    """
+    Configure the level and the output of the log.
+
+    Messages are formatted and written by a background thread, so logging never
+    blocks on terminal or file I/O, and messages below the level cost a single comparison.
+
+    Args:
+        level (int, optional): The lowest level written. Defaults to LEVEL_DEBUG.
+        file (str | None, optional): The file the log is appended to, None for stdout. Defaults to None.
+        mode (str, optional): One of LOG_MODES. Defaults to 'console'.
+
+    Returns:
+        None
+    """
+    global _level, _mode, _output
+    if mode not in LOG_MODES:
+        raise ValueError(f'unknown log mode {mode!r}, expected one of {LOG_MODES}')
+    LogFlush()
+    if _output is not sys.stdout:
+        _output.close()
+    _level, _mode = level, mode
+    _output = sys.stdout if file is None else open(file, 'a', encoding='utf-8')
+
+def LogEnabled(level: int) -> bool:
+    """
+    Check whether messages of a level are written, to skip building expensive arguments.
+
+    Args:
+        level (int): The level of the message.
+
+    Returns:
+        bool: True if the message would be written.
+    """
+    return level >= _level
+
+def Log(level: int, source: str, message: str, *args) -> None:
+    """
+    Queue a message for the background writer.
+
+    The message is only formatted with `str.format(*args)` by the writer thread, and
+    only if its level is enabled.
+
+    Args:
+        level (int): The level of the message.
+        source (str): The part of the program logging the message, a key of SOURCES.
+        message (str): The message, with `{}` placeholders for the arguments.
+        *args: The arguments of the message.
+
+    Returns:
+        None
+    """
+    if level < _level:
+        return
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_records, daemon=True)
+                _writer.start()
+    _records.put((time.time(), level, source, message, args))
+
+class _JSONArgument:
+    """
+    A message argument serialized to JSON only when the writer thread formats the message.
+
+    Attributes:
+        value (Any): The object to serialize, which must not change once logged.
+    """
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        """
+        Initialize a _JSONArgument.
+
+        Args:
+            value (Any): The object to serialize.
+        """
+        self.value = value
+
+    def __format__(self, spec: str) -> str:
+        return json.dumps(self.value, ensure_ascii=False)
+
+def LogFlush() -> None:
+    """
+    Wait until every queued message is written.
+
+    Returns:
+        None
+    """
+    if _writer is not None:
+        _records.join()
+
+def _format_record(record: tuple) -> str:
+    """
+    Format a queued message for the current output mode.
+
+    Args:
+        record (tuple): The time, level, source, message and arguments of the message.
+
+    Returns:
+        str: The line to write.
+    """
+    created, level, source, message, args = record
+    try:
+        text = message.format(*args)
+    except Exception as error:
+        text = f'{message} {args!r} (format failed: {error!r})'
+    if _mode == 'console':
+        return f"{LOG} {SOURCES.get(source, source)} {text}"
+    text = _ANSI.sub('', text).strip()
+    stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(created)) + f'.{int(created % 1 * 1000):03d}'
+    if _mode == 'json':
+        return json.dumps({'time': stamp, 'level': LEVEL_NAMES.get(level, level), 'source': source,
+                           'message': text}, ensure_ascii=False)
+    return f"{stamp} {LEVEL_NAMES.get(level, level):<7} {source:<8} {text}"
+
+def _write_records() -> None:
+    """
+    Write queued messages in batches, flushing the output once per batch.
+
+    Returns:
+        None
+    """
+    while True:
+        batch = [_records.get()]
+        while True:
+            try:
+                batch.append(_records.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _output.write(''.join(_format_record(record) + '\n' for record in batch))
+            _output.flush()
+        except (OSError, ValueError):...
+        finally:
+            for _ in batch:
+                _records.task_done()
+
+def _reset_writer() -> None:
+    """
+    Forget the writer thread and the queued messages of the parent in a forked process.
+
+    Returns:
+        None
+    """
+    global _records, _writer, _writer_lock
+    _records = queue.Queue()
+    _writer = None
+    _writer_lock = threading.Lock()
+
+atexit.register(LogFlush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_writer)
+
 def LogServerCreated(port: int, host: str) -> None:
     """
     Log a message indicating that a server has been created.
@@ -21,7 +208,7 @@ def LogServerCreated(port: int, host: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {SERVER} Server created on {host}:{port} {YES}")
+    Log(LEVEL_INFO, 'server', f"Server created on {{}}:{{}} {YES}", host, port)
 
 def LogServerNotCreated(port: int, host: str) -> None:
     """
@@ -34,7 +221,8 @@ def LogServerNotCreated(port: int, host: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {SERVER} Server not created on {host}:{port} {NO}")
+    Log(LEVEL_ERROR, 'server', f"Server not created on {{}}:{{}} {NO}", host, port)
+    LogFlush()
     exit(-1)
 
 def LogServerStarted(port: int, host: str) -> None:
@@ -48,7 +236,7 @@ def LogServerStarted(port: int, host: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {SERVER} Server started on {host}:{port} {YES}")
+    Log(LEVEL_INFO, 'server', f"Server started on {{}}:{{}} {YES}", host, port)
 
 def LogServerStartListening() -> None:
     """
@@ -57,7 +245,7 @@ def LogServerStartListening() -> None:
     Returns:
         None
     """
-    print(f"{LOG} {SERVER} Server started listening...")
+    Log(LEVEL_INFO, 'server', "Server started listening...")
 
 def LogClientCreated(port: int, host: str) -> None:
     """
@@ -70,7 +258,7 @@ def LogClientCreated(port: int, host: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {SERVER} Client created! {YES}")
+    Log(LEVEL_INFO, 'server', f"Client created! {YES}")
 
 def LogClientNotCreated(port: int, host: str) -> None:
     """
@@ -83,7 +271,8 @@ def LogClientNotCreated(port: int, host: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {SERVER} Client not created. {NO}")
+    Log(LEVEL_ERROR, 'server', f"Client not created. {NO}")
+    LogFlush()
     exit(-1)
 
 def LogClientConnected(port: int, host: str) -> None:
@@ -97,7 +286,7 @@ def LogClientConnected(port: int, host: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {SERVER} Client connected to {host}:{port} {YES}")
+    Log(LEVEL_INFO, 'server', f"Client connected to {{}}:{{}} {YES}", host, port)
 
 def LogClientNotConnected(port: int, host: str) -> None:
     """
@@ -110,7 +299,8 @@ def LogClientNotConnected(port: int, host: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {SERVER} Client not connected to {host}:{port} {NO}")
+    Log(LEVEL_ERROR, 'server', f"Client not connected to {{}}:{{}} {NO}", host, port)
+    LogFlush()
     exit(-1)
 
 def LogClientConnectToServer(port: int, host: str, name: str, id: str) -> None:
@@ -126,7 +316,36 @@ def LogClientConnectToServer(port: int, host: str, name: str, id: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {SERVER} Client '{name}' (id: {id}) connected! ip {host}:{port} {YES}")
+    Log(LEVEL_INFO, 'server', f"Client '{{}}' (id: {{}}) connected! ip {{}}:{{}} {YES}", name, id, host, port)
+
+def LogClientDisconnected(port: int, host: str, name: str, id: str) -> None:
+    """
+    Log a message indicating that a specific client has disconnected from a server.
+
+    Args:
+        port (int): The port number the client was connected from.
+        host (str): The host address the client was connected from.
+        name (str): The name of the client.
+        id (str): The unique identifier of the client.
+
+    Returns:
+        None
+    """
+    Log(LEVEL_INFO, 'server', "Client '{}' (id: {}) disconnected! ip {}:{}", name, id, host, port)
+
+def LogSubscriptionCallbackFailed(request_id: int, error: Exception) -> None:
+    """
+    Log a message indicating that the callback of a subscription raised on a pushed change.
+
+    Args:
+        request_id (int): The ID of the SUBSCRIBE request of the subscription.
+        error (Exception): The error raised by the callback.
+
+    Returns:
+        None
+    """
+    Log(LEVEL_ERROR, 'client', f"Subscription {{}} callback failed: {Fore.RED}{{!r}}{Fore.RESET} {NO}",
+        request_id, error)
 
 def LogDataBaseCreated(name: str) -> None:
     """
@@ -138,7 +357,7 @@ def LogDataBaseCreated(name: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {DATABASE} DataBase {Fore.YELLOW}'{name}'{Fore.RESET} created! {YES}")
+    Log(LEVEL_INFO, 'database', f"DataBase {Fore.YELLOW}'{{}}'{Fore.RESET} created! {YES}", name)
 
 def LogDataBaseConnect(name: str) -> None:
     """
@@ -150,7 +369,7 @@ def LogDataBaseConnect(name: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {DATABASE} DataBase {Fore.YELLOW}'{name}'{Fore.RESET} connected! {YES}")
+    Log(LEVEL_INFO, 'database', f"DataBase {Fore.YELLOW}'{{}}'{Fore.RESET} connected! {YES}", name)
 
 def LogDataBaseNotConnected(name: str) -> None:
     """
@@ -162,7 +381,8 @@ def LogDataBaseNotConnected(name: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {DATABASE} DataBase {Fore.YELLOW}'{name}'{Fore.RESET} not connected! {NO}")
+    Log(LEVEL_ERROR, 'database', f"DataBase {Fore.YELLOW}'{{}}'{Fore.RESET} not connected! {NO}", name)
+    LogFlush()
     exit(-1)
 
 def LogRecuestRecved(recuest: str) -> None:
@@ -175,7 +395,75 @@ def LogRecuestRecved(recuest: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {SERVER} Recuest recved: {Fore.MAGENTA}{recuest}{Fore.RESET}")
+    Log(LEVEL_DEBUG, 'server', f"Recuest recved: {Fore.MAGENTA}{{}}{Fore.RESET}", recuest)
+
+def LogRequestFailed(request: list, error: Exception) -> None:
+    """
+    Log a message indicating that a request could not be answered.
+
+    Args:
+        request (list): The failed request.
+        error (Exception): The error raised while answering it.
+
+    Returns:
+        None
+    """
+    Log(LEVEL_ERROR, 'server', f"Request failed: {Fore.MAGENTA}{{}}{Fore.RESET} {Fore.RED}{{!r}}{Fore.RESET} {NO}",
+        request, error)
+
+def LogWorkerStarted(index: int, pid: int) -> None:
+    """
+    Log a message indicating that a server worker process has started.
+
+    Args:
+        index (int): The index of the worker.
+        pid (int): The process ID of the worker.
+
+    Returns:
+        None
+    """
+    Log(LEVEL_INFO, 'server', f"Worker {{}} started (pid: {{}}) {YES}", index, pid)
+
+def LogWorkerDied(index: int, pid: int, exit_code: int | None) -> None:
+    """
+    Log a message indicating that a server worker process has died and is restarted.
+
+    Args:
+        index (int): The index of the worker.
+        pid (int): The process ID of the worker.
+        exit_code (int | None): The exit code of the worker.
+
+    Returns:
+        None
+    """
+    Log(LEVEL_WARNING, 'server', f"Worker {{}} (pid: {{}}) died with exit code {{}}, restarting {NO}", index, pid, exit_code)
+
+def LogChangesPollFailed(error: Exception) -> None:
+    """
+    Log a message indicating that the server could not read the change log for its subscriptions.
+
+    Args:
+        error (Exception): The error raised while reading the change log.
+
+    Returns:
+        None
+    """
+    Log(LEVEL_ERROR, 'server', f"Polling the change log failed: {Fore.RED}{{!r}}{Fore.RESET} {NO}", error)
+
+def LogStats(stats: dict) -> None:
+    """
+    Log the timing statistics of the server.
+
+    The snapshot is serialized to JSON by the writer thread, and only if the message is
+    written; callers check LogEnabled(LEVEL_INFO) before taking the snapshot.
+
+    Args:
+        stats (dict): The snapshot of the statistics, not changed afterwards.
+
+    Returns:
+        None
+    """
+    Log(LEVEL_INFO, 'server', f"Stats: {Fore.LIGHTBLUE_EX}{{}}{Fore.RESET}", _JSONArgument(stats))
 
 def LogInformationAdded(information: list) -> None:
     """
@@ -187,7 +475,7 @@ def LogInformationAdded(information: list) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {DATABASE} Added information: {Fore.LIGHTBLUE_EX}{information}{Fore.RESET}")
+    Log(LEVEL_DEBUG, 'database', f"Added information: {Fore.LIGHTBLUE_EX}{{}}{Fore.RESET}", information)
 
 def LogInformationDeleted(name: str, date: str) -> None:
     """
@@ -200,7 +488,7 @@ def LogInformationDeleted(name: str, date: str) -> None:
     Returns:
         None
     """
-    print(f"{LOG} {DATABASE} Deleted information: {Fore.LIGHTBLUE_EX}{name} {date}{Fore.RESET}")
+    Log(LEVEL_DEBUG, 'database', f"Deleted information: {Fore.LIGHTBLUE_EX}{{}} {{}}{Fore.RESET}", name, date)
 
 def LogAllInformationDeleted() -> None:
     """
@@ -209,7 +497,7 @@ def LogAllInformationDeleted() -> None:
     Returns:
         None
     """
-    print(f"{LOG} {DATABASE} All information deleted.")
+    Log(LEVEL_INFO, 'database', "All information deleted.")
 
 def LogInformationGetedForDate(date: str, user_id: str):
     """
@@ -222,4 +510,5 @@ def LogInformationGetedForDate(date: str, user_id: str):
     Returns:
         None
     """
-    print(f"{LOG} {DATABASE} Information geted for date: {Fore.LIGHTBLUE_EX}{date}{Fore.RESET} by user: {Fore.GREEN}{user_id}{Fore.RESET}")
\ No newline at end of file
+    Log(LEVEL_DEBUG, 'database', f"Information geted for date: {Fore.LIGHTBLUE_EX}{{}}{Fore.RESET} by user: {Fore.GREEN}{{}}{Fore.RESET}",
+        date, user_id)
@@ -0,0 +1,224 @@
+"""
+This module implements the framing of messages sent between clients and the server.
+
+Every message travels as a frame: a fixed header holding the protocol version and
+the length of the payload, followed by the payload bytes. Frames can carry payloads
+of any size and any content, and they are read with exact-length reads.
+
+Constants:
+    PROTOCOL_VERSION (int): The version written in the header of every frame.
+    HEADER (struct.Struct): The frame header, `version (u8) | payload length (u32)`.
+    MAX_FRAME_SIZE (int): The largest payload accepted from the other side.
+    SENDMSG_BUFFERS (int): The largest number of buffers handed to a single `sendmsg` call.
+"""
+
+import socket
+import struct
+
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct('!BI')
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+SENDMSG_BUFFERS = 512
+
+
+class ProtocolError(Exception):
+    """
+    Raised when the other side sends a frame that can not be parsed.
+    """
+
+
+def pack_header(size: int) -> bytes:
+    """
+    Build the header of a frame.
+
+    Args:
+        size (int): The length of the payload in bytes.
+
+    Returns:
+        bytes: The packed header.
+    """
+    return HEADER.pack(PROTOCOL_VERSION, size)
+
+def unpack_header(header: bytes | bytearray | memoryview, offset: int = 0) -> int:
+    """
+    Parse and validate the header of a frame.
+
+    Args:
+        header (bytes | bytearray | memoryview): The buffer holding the header.
+        offset (int, optional): The position of the header in the buffer. Defaults to 0.
+
+    Returns:
+        int: The length of the payload in bytes.
+
+    Raises:
+        ProtocolError: If the version is not supported or the frame is too large.
+    """
+    version, size = HEADER.unpack_from(header, offset)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f'unsupported protocol version {version}')
+    if size > MAX_FRAME_SIZE:
+        raise ProtocolError(f'frame of {size} bytes is too large')
+    return size
+
+def send_frame(sock: socket.socket, payload: bytes | bytearray | memoryview):
+    """
+    Send a payload as a single frame.
+
+    Args:
+        sock (socket.socket): The connected socket.
+        payload (bytes | bytearray | memoryview): The payload to send.
+    """
+    send_frames(sock, [payload])
+
+def send_frames(sock: socket.socket, payloads: list[bytes | bytearray | memoryview]):
+    """
+    Send payloads as consecutive frames.
+
+    The headers and the payloads are handed to the kernel together with `sendmsg`
+    where it is available, so the payloads are never copied into a new buffer and
+    many frames can leave in a single system call.
+
+    Args:
+        sock (socket.socket): The connected socket.
+        payloads (list[bytes | bytearray | memoryview]): The payloads to send, in order.
+    """
+    buffers = []
+    for payload in payloads:
+        buffers.append(memoryview(pack_header(len(payload))))
+        buffers.append(memoryview(payload).cast('B'))
+    if not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(buffers))
+        return
+
+    first = 0
+    while first < len(buffers):
+        # stay below the limit of buffers per call (IOV_MAX)
+        sent = sock.sendmsg(buffers[first:first + SENDMSG_BUFFERS])
+        while first < len(buffers) and sent >= len(buffers[first]):
+            sent -= len(buffers[first])
+            first += 1
+        if sent:
+            buffers[first] = buffers[first][sent:]
+
+def recv_exact(sock: socket.socket, size: int) -> bytearray:
+    """
+    Receive exactly `size` bytes.
+
+    Args:
+        sock (socket.socket): The connected socket.
+        size (int): The number of bytes to receive.
+
+    Returns:
+        bytearray: The received bytes.
+
+    Raises:
+        ConnectionError: If the connection is closed before all bytes arrive.
+    """
+    data = bytearray(size)
+    view = memoryview(data)
+    filled = 0
+    while filled < size:
+        received = sock.recv_into(view[filled:])
+        if not received:
+            raise ConnectionError('connection closed by the other side')
+        filled += received
+    return data
+
+def recv_frame(sock: socket.socket) -> bytearray:
+    """
+    Receive a single frame.
+
+    Args:
+        sock (socket.socket): The connected socket.
+
+    Returns:
+        bytearray: The payload of the frame.
+    """
+    return recv_exact(sock, unpack_header(recv_exact(sock, HEADER.size)))
+
+
+class FrameReader:
+    """
+    Incrementally cuts the bytes of a stream into frames.
+
+    The frames completed by a read are returned as views of the received bytes, without
+    copying them, and the few bytes of an incomplete header are kept in a new buffer
+    that replaces the old one instead of trimming it. Once the header of a frame whose
+    payload has not fully arrived is known, a buffer of the exact size is allocated and
+    the rest of the payload is received straight into it.
+
+    Attributes:
+        buffer (bytes): Received bytes that do not form a complete header yet.
+        body (bytearray | None): The payload being received, if a frame is incomplete.
+        filled (int): The number of payload bytes already received into `body`.
+    """
+
+    __slots__ = ('buffer', 'body', 'filled')
+
+    def __init__(self):
+        """
+        Initialize an empty FrameReader.
+        """
+        self.buffer = b''
+        self.body: bytearray | None = None
+        self.filled = 0
+
+    def read_from(self, sock: socket.socket, buffer_size: int = 1024 * 64) -> list[memoryview]:
+        """
+        Read the available data of a ready socket and return the frames it completes.
+
+        Args:
+            sock (socket.socket): The socket to read from.
+            buffer_size (int, optional): The maximum amount of data to read at once. Defaults to 64 KB.
+
+        Returns:
+            list[memoryview]: The payloads of the completed frames, possibly empty.
+
+        Raises:
+            ConnectionError: If the connection was closed by the other side.
+        """
+        if self.body is not None:
+            received = sock.recv_into(memoryview(self.body)[self.filled:])
+            if not received:
+                raise ConnectionError('connection closed by the other side')
+            self.filled += received
+            if self.filled < len(self.body):
+                return []
+            frame, self.body = self.body, None
+            return [memoryview(frame)]
+
+        data = sock.recv(buffer_size)
+        if not data:
+            raise ConnectionError('connection closed by the other side')
+        return self.feed(data)
+
+    def feed(self, data: bytes) -> list[memoryview]:
+        """
+        Add received bytes and return the frames they complete.
+
+        Args:
+            data (bytes): The received bytes.
+
+        Returns:
+            list[memoryview]: The payloads of the completed frames, possibly empty, as views
+                of the received bytes.
+        """
+        if self.buffer:
+            data = self.buffer + data
+        view = memoryview(data)
+        frames = []
+        offset = 0
+        while len(view) - offset >= HEADER.size:
+            size = unpack_header(view, offset)
+            start = offset + HEADER.size
+            if len(view) - start >= size:
+                frames.append(view[start:start + size])
+                offset = start + size
+                continue
+            self.body = bytearray(size)
+            self.filled = len(view) - start
+            self.body[:self.filled] = view[start:]
+            offset = len(view)
+            break
+        self.buffer = bytes(view[offset:])
+        return frames
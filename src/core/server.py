@@ -1,10 +1,18 @@
 import socket
+import selectors
+import threading
+import time
+from collections import deque
+from itertools import islice
 from typing import Any
 
 from src.core.utils import (
     LOCAL_HOST, LOCAL_PORT
 )
 from src.core.debug import *
+from src.core.protocol import FrameReader, ProtocolError, HEADER, SENDMSG_BUFFERS, pack_header
+from src.core import codec
+from src.core import stats
 
 class ServerClient_:
     """
@@ -16,8 +24,21 @@ class ServerClient_:
         name (str): The name of the client.
         obj (socket.socket | None): The socket object for the client connection.
         id (int | None): The unique identifier for the client.
+        frames (FrameReader): Cuts the bytes received from the client into frames.
+        codec (codec.Codec): The codec negotiated with the client.
+        send_lock (threading.Lock): Guards the outbox and keeps the replies sent from different threads
+            from interleaving.
+        outbox (deque[memoryview]): The headers and payloads of the frames not sent yet, in order.
+        outbox_size (int): The number of bytes in the outbox.
+        closed (bool): Set once the connection is closed or dropped, so nothing more is sent to it.
+        order_lock (threading.Lock): Guards `in_flight` and `last_write`.
+        in_flight (set): The requests of the client still being answered.
+        last_write (Any): The last write request of the client still being answered, or None.
     """
 
+    __slots__ = ('port', 'host', 'name', 'obj', 'id', 'frames', 'codec', 'send_lock', 'outbox', 'outbox_size',
+                 'closed', 'order_lock', 'in_flight', 'last_write')
+
     def __init__(self, port: int, host: str, name: str, id: int | None = None, obj: socket.socket | None = None):
         """
         Initialize a ServerClient_ instance.
@@ -34,6 +55,15 @@ class ServerClient_:
         self.name = name
         self.obj = obj
         self.id = id
+        self.frames = FrameReader()
+        self.codec = codec.CODECS[codec.DEFAULT_CODEC]
+        self.send_lock = threading.Lock()
+        self.outbox: deque[memoryview] = deque()
+        self.outbox_size = 0
+        self.closed = False
+        self.order_lock = threading.Lock()
+        self.in_flight = set()
+        self.last_write = None
         
 
 class Server:
@@ -44,16 +74,25 @@ class Server:
         host (str): The host address of the server.
         port (int): The port number of the server.
         server (socket.socket): The server socket object.
-        clients (list[ServerClient_]): A list of connected clients.
+        clients (dict[str, ServerClient_]): The connected clients by their ID.
+        selector (selectors.BaseSelector): The readiness selector (epoll/kqueue/select) driving the I/O loop.
+        stats (stats.Stats | None): Records the time spent reading sockets, if set.
+        max_outbox (int): The bytes of replies a client may leave unread before it is disconnected.
+        wakeup_reader (socket.socket): Wakes the I/O loop up when a client starts waiting to be written.
+        wakeup_writer (socket.socket): The other end of `wakeup_reader`.
     """
 
-    def __init__(self, host=LOCAL_HOST, port=LOCAL_PORT):
+    max_outbox = 64 * 1024 * 1024
+
+    def __init__(self, host=LOCAL_HOST, port=LOCAL_PORT, reuse_port: bool = False):
         """
         Initialize a Server instance.
 
         Args:
             host (str, optional): The host address of the server. Defaults to LOCAL_HOST.
             port (int, optional): The port number of the server. Defaults to LOCAL_PORT.
+            reuse_port (bool, optional): Set SO_REUSEPORT, so several processes can listen on the
+                same host and port and the kernel spreads the connections between them. Defaults to False.
 
         Raises:
             Exception: If the server cannot be created and bound to the specified host and port.
@@ -62,28 +101,248 @@ class Server:
         self.port = port
         try:
             self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # a restarted server can bind again while the connections of the old one are in TIME_WAIT
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port:
+                self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             self.server.bind((self.host, self.port))
-            self.server.listen(5)
+            self.server.listen(socket.SOMAXCONN)
             LogServerCreated(self.port, self.host)
         except:
             LogServerNotCreated(self.port, self.host)
-        self.clients: list[ServerClient_] = []
+        self.clients: dict[str, ServerClient_] = {}
+        self.selector = selectors.DefaultSelector()
+        self.stats: stats.Stats | None = None
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_reader.setblocking(False)
+        self.wakeup_writer.setblocking(False)
 
 
-    def listen_(self):
+    def listen_(self, buffer_size: int = 1024 * 64):
         """
-        Start listening for incoming client connections.
+        Run the readiness-based I/O loop of the server.
 
-        This method runs in an infinite loop, accepting new client connections
-        and adding them to the list of connected clients.
+        A single selector watches the listening socket and every client socket.
+        New connections are accepted as soon as they arrive, the first frame of
+        a connection is treated as the `name|id|codecs` handshake, and every following
+        frame is a request passed to `on_request_`. Replies that did not fit into the
+        send buffer of a socket are written by the loop once the socket is writable.
+        There is no fixed sleep: the loop only wakes up when a socket is ready.
+
+        Args:
+            buffer_size (int, optional): The maximum amount of data read from a ready socket at once.
+                Defaults to 64 KB.
 
         Note:
             This method will run indefinitely until the server is stopped externally.
         """
         LogServerStartListening()
+        self.server.setblocking(False)
+        self.selector.register(self.server, selectors.EVENT_READ, None)
+        self.selector.register(self.wakeup_reader, selectors.EVENT_READ, self.wakeup_reader)
         while True:
-            client, address = self.server.accept()
-            name_and_id = client.recv(1024).decode()
-            name, id = name_and_id.split("|")
-            self.clients.append(ServerClient_(address[1], address[0], name, id, client))
-            LogClientConnectToServer(address[1], address[0], name, id)
+            for key, events in self.selector.select():
+                if key.data is None:
+                    self.accept_()
+                elif key.data is self.wakeup_reader:
+                    try:
+                        self.wakeup_reader.recv(4096)
+                    except (BlockingIOError, InterruptedError):...
+                else:
+                    if events & selectors.EVENT_WRITE:
+                        self.write_(key.data)
+                    if events & selectors.EVENT_READ:
+                        self.read_(key.data, buffer_size)
+
+    def accept_(self):
+        """
+        Accept every pending connection on the listening socket and register it in the selector.
+
+        Client sockets are non-blocking: they are read when the selector reports them as
+        readable, and a reply is sent as far as the socket takes it, the rest waiting in
+        the outbox of the client, so a client that does not read never blocks a thread.
+        """
+        while True:
+            try:
+                client, address = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client.setblocking(False)
+            self.selector.register(client, selectors.EVENT_READ, ServerClient_(address[1], address[0], None, None, client))
+
+    def read_(self, client: ServerClient_, buffer_size: int):
+        """
+        Read the available data of a ready client socket.
+
+        Args:
+            client (ServerClient_): The client whose socket is ready for reading.
+            buffer_size (int): The maximum amount of data to read.
+        """
+        started = time.perf_counter()
+        try:
+            frames = client.frames.read_from(client.obj, buffer_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except (OSError, ProtocolError):
+            self.drop_(client)
+            return
+        if self.stats is not None:
+            self.stats.record(stats.CONNECTION, 'read', time.perf_counter() - started)
+
+        for frame in frames:
+            if client.id is None:
+                try:
+                    self.handshake_(client, str(frame, 'utf-8'))
+                except (ValueError, OSError):
+                    self.drop_(client)
+                    return
+                continue
+            try:
+                self.on_request_(client, frame)
+            except Exception as error:
+                # a request that can not be handled is dropped, never the I/O loop
+                LogRequestFailed(bytes(frame), error)
+
+    def handshake_(self, client: ServerClient_, handshake: str):
+        """
+        Register a client from its handshake and answer with the negotiated codec.
+
+        Args:
+            client (ServerClient_): The client that sent the handshake.
+            handshake (str): The handshake, `name|id` optionally followed by `|codec,codec...`.
+        """
+        name, id, *offered = handshake.split("|")
+        client.name, client.id = name, id
+        client.codec = codec.negotiate(offered[0].split(',') if offered else [])
+        self.clients[id] = client
+        self.send_(client, client.codec.name.encode())
+        LogClientConnectToServer(client.port, client.host, name, id)
+
+    def drop_(self, client: ServerClient_):
+        """
+        Forget a client whose connection was closed or reset by the other side.
+
+        The socket is unregistered and closed, the client is removed from `clients`
+        and its partially received frame is released.
+
+        Args:
+            client (ServerClient_): The disconnected client.
+        """
+        with client.send_lock:
+            client.closed = True
+            client.outbox.clear()
+            client.outbox_size = 0
+            self.selector.unregister(client.obj)
+            client.obj.close()
+        client.frames = FrameReader()
+        if client.id is not None and self.clients.get(client.id) is client:
+            del self.clients[client.id]
+            LogClientDisconnected(client.port, client.host, client.name, client.id)
+
+    def send_(self, client: ServerClient_, data: bytes):
+        """
+        Send a reply to a client as a single frame, without blocking.
+
+        The frame is queued in the outbox of the client and sent as far as the socket
+        takes it; the I/O loop sends the rest once the socket is writable. A client
+        leaving more than `max_outbox` bytes unread is disconnected.
+
+        Args:
+            client (ServerClient_): The client to send the reply to.
+            data (bytes): The reply payload.
+
+        Raises:
+            ConnectionError: If the client is disconnected.
+            OSError: If the connection failed while sending.
+        """
+        with client.send_lock:
+            if client.closed:
+                raise ConnectionError(f'client {client.id} is disconnected')
+            if client.outbox_size > self.max_outbox:
+                self.close_(client)
+                raise ConnectionError(f'client {client.id} left {client.outbox_size} bytes of replies unread')
+            waiting = bool(client.outbox)
+            client.outbox.append(memoryview(pack_header(len(data))))
+            client.outbox.append(memoryview(data).cast('B'))
+            client.outbox_size += HEADER.size + len(data)
+            if waiting:
+                return
+            self.flush_(client)
+            if client.outbox:
+                self.selector.modify(client.obj, selectors.EVENT_READ | selectors.EVENT_WRITE, client)
+                try:
+                    self.wakeup_writer.send(b'\0')
+                except (BlockingIOError, InterruptedError):...
+
+    def flush_(self, client: ServerClient_):
+        """
+        Send the outbox of a client as far as its socket takes it. The send lock of the client must be held.
+
+        Args:
+            client (ServerClient_): The client.
+
+        Raises:
+            OSError: If the connection failed; the client is closed.
+        """
+        while client.outbox:
+            try:
+                if hasattr(client.obj, 'sendmsg'):
+                    # stay below the limit of buffers per call (IOV_MAX)
+                    sent = client.obj.sendmsg(list(islice(client.outbox, SENDMSG_BUFFERS)))
+                else:
+                    sent = client.obj.send(client.outbox[0])
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                self.close_(client)
+                raise
+            client.outbox_size -= sent
+            while sent:
+                if sent >= len(client.outbox[0]):
+                    sent -= len(client.outbox.popleft())
+                else:
+                    client.outbox[0] = client.outbox[0][sent:]
+                    sent = 0
+
+    def write_(self, client: ServerClient_):
+        """
+        Send the outbox of a writable client socket, watching it for reads only once it is empty.
+
+        Args:
+            client (ServerClient_): The client whose socket is ready for writing.
+        """
+        with client.send_lock:
+            if client.closed:
+                return
+            try:
+                self.flush_(client)
+            except OSError:
+                return
+            if not client.outbox:
+                self.selector.modify(client.obj, selectors.EVENT_READ, client)
+
+    def close_(self, client: ServerClient_):
+        """
+        Close the connection of a client from any thread. The send lock of the client must be held.
+
+        The socket is shut down, so the I/O loop reads the end of the connection and drops the client.
+
+        Args:
+            client (ServerClient_): The client.
+        """
+        client.closed = True
+        client.outbox.clear()
+        client.outbox_size = 0
+        try:
+            client.obj.shutdown(socket.SHUT_RDWR)
+        except OSError:...
+
+    def on_request_(self, client: ServerClient_, payload: memoryview):
+        """
+        Called from the I/O loop for every complete request received from a client.
+
+        Args:
+            client (ServerClient_): The client that sent the request.
+            payload (memoryview): The encoded request.
+        """
+        LogRecuestRecved(client.codec.decode(payload))
@@ -0,0 +1,201 @@
+"""
+This module collects timing statistics of the server.
+
+Every request is timed stage by stage (decode, queue, wait, dispatch, db, encode,
+send and total) and the timings are aggregated into fixed-size log-scale
+histograms per request type, so a long-running server can be profiled at a
+constant memory cost.
+
+Classes:
+    Histogram: Log-scale histogram of durations
+    Stats: Per-request-type stage histograms and counters
+
+Constants:
+    STAGES (tuple[str, ...]): The stages of a request, in order.
+    CONNECTION (str): The pseudo request type of stages not tied to a request.
+"""
+
+import threading
+import time
+
+STAGES = ('decode', 'queue', 'wait', 'dispatch', 'db_wait', 'db', 'encode', 'send', 'total')
+CONNECTION = '*'
+
+# bucket i of a histogram holds the durations shorter than 2**i microseconds
+BUCKETS = 28
+
+
+class Histogram:
+    """
+    Log-scale histogram of durations.
+
+    Attributes:
+        count (int): The number of durations recorded.
+        total (float): The sum of the durations, in seconds.
+        max (float): The longest duration, in seconds.
+        buckets (list[int]): The number of durations in every power-of-two microsecond bucket.
+    """
+
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        """
+        Initialize an empty Histogram.
+        """
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * BUCKETS
+
+    def record(self, seconds: float):
+        """
+        Record a duration.
+
+        Args:
+            seconds (float): The duration.
+        """
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1_000_000).bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Estimate a percentile as the upper bound of the bucket holding it.
+
+        Args:
+            fraction (float): The percentile as a fraction, e.g. 0.95.
+
+        Returns:
+            float: The estimated percentile, in seconds, never above the longest duration.
+        """
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(2 ** index / 1_000_000, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        """
+        Summarize the histogram.
+
+        Returns:
+            dict: The 'count' and the 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms' and 'max_ms' durations.
+        """
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(0.50) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class Stats:
+    """
+    Per-request-type stage histograms and counters.
+
+    The request type being answered is remembered per thread, so stages timed deep
+    inside a handler, like the database calls, are attributed to the right request.
+
+    Attributes:
+        started (float): When the statistics were started, as time.time().
+        histograms (dict[str, dict[str, Histogram]]): The histograms by request type and stage.
+        counters (dict[str, dict[str, int]]): The counters by request type and name.
+        lock (threading.Lock): Guards the histograms and the counters.
+        current (threading.local): The request type answered by the current thread.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty Stats.
+        """
+        self.started = time.time()
+        self.histograms: dict[str, dict[str, Histogram]] = {}
+        self.counters: dict[str, dict[str, int]] = {}
+        self.lock = threading.Lock()
+        self.current = threading.local()
+
+    def record(self, request_type: str, stage: str, seconds: float):
+        """
+        Record the duration of a stage of a request.
+
+        Args:
+            request_type (str): The type of the request, or CONNECTION.
+            stage (str): The stage, one of STAGES or 'read'.
+            seconds (float): The duration.
+        """
+        with self.lock:
+            stages = self.histograms.get(request_type)
+            if stages is None:
+                stages = self.histograms[request_type] = {}
+            histogram = stages.get(stage)
+            if histogram is None:
+                histogram = stages[stage] = Histogram()
+            histogram.record(seconds)
+
+    def count(self, request_type: str, name: str, amount: int = 1):
+        """
+        Add to a counter of a request type.
+
+        Args:
+            request_type (str): The type of the request, or CONNECTION.
+            name (str): The name of the counter, e.g. 'requests' or 'errors'.
+            amount (int, optional): The amount to add. Defaults to 1.
+        """
+        with self.lock:
+            counters = self.counters.setdefault(request_type, {})
+            counters[name] = counters.get(name, 0) + amount
+
+    def begin(self, request_type: str | None):
+        """
+        Remember the request type answered by the current thread, None when it is done.
+
+        Args:
+            request_type (str | None): The type of the request.
+        """
+        self.current.request_type = request_type
+
+    def current_type(self) -> str:
+        """
+        Return the request type answered by the current thread.
+
+        Returns:
+            str: The type of the request, CONNECTION outside of a request.
+        """
+        return getattr(self.current, 'request_type', None) or CONNECTION
+
+    def record_current(self, stage: str, seconds: float):
+        """
+        Record the duration of a stage of the request answered by the current thread.
+
+        Durations timed outside of a request are recorded under CONNECTION.
+
+        Args:
+            stage (str): The stage.
+            seconds (float): The duration.
+        """
+        self.record(self.current_type(), stage, seconds)
+
+    def snapshot(self) -> dict:
+        """
+        Summarize the statistics.
+
+        Returns:
+            dict: The 'uptime_s' and, by request type, the 'counters' and the summary of every stage.
+        """
+        with self.lock:
+            return {
+                'uptime_s': time.time() - self.started,
+                'requests': {
+                    request_type: {
+                        'counters': dict(self.counters.get(request_type, {})),
+                        'stages': {stage: histogram.snapshot() for stage, histogram in stages.items()},
+                    }
+                    for request_type, stages in {**dict.fromkeys(self.counters, {}), **self.histograms}.items()
+                },
+            }
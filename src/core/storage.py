@@ -0,0 +1,704 @@
+"""
+This module provides the storage backends of the Tasks table.
+
+A storage answers the requests every server supports: adding rows, deleting the rows
+of a user on a date or all rows, reading all rows, the rows given or due on a date
+and the rows of a user on a date, and iterating over all rows in chunks. Dates are
+passed as 'YYYY-MM-DD' keys and rows are read with 'DD.MM.YYYY' dates, as the
+clients see them.
+
+Writes return a Future resolved once the write is stored, after calling the
+`committed` callback of the write under the lock serializing the writes, so the
+changes are seen by the callbacks in the order they were stored.
+
+Classes:
+    Storage: Base class of all storage backends
+    SQLiteStorage: Stores the Tasks table in an SQLite database
+    MemoryStorage: Keeps the Tasks table in memory with hash indexes, optionally snapshotted to a file
+
+Constants:
+    TABLE (str): The name of the stored table.
+    SNAPSHOT_VERSION (int): The version of the snapshot files written by MemoryStorage.
+"""
+
+from src.core import database
+from src.core.database import Task
+from src.core.debug import *
+
+from concurrent.futures import Future
+from typing import Callable, Iterator
+
+import bisect
+import itertools
+import json
+import os
+import threading
+import time
+
+TABLE = 'Tasks'
+SNAPSHOT_VERSION = 1
+
+
+class Storage:
+    """
+    Base class of all storage backends.
+
+    Only SQLiteStorage keeps the change log and the full-text index and compiles
+    filters into SQL, so Requests.QUERY, Requests.SEARCH and Requests.GET_CHANGES_SINCE
+    are rejected with a ValueError by a server using another storage.
+
+    Attributes:
+        name (str): The name of the backend, reported by info.
+    """
+
+    name = ''
+
+    def open(self):
+        """
+        Open the storage, creating it if it does not exist. Does nothing if it is already open.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Close the storage.
+        """
+        raise NotImplementedError
+
+    def insert(self, rows: list[Task], committed: Callable | None = None) -> Future:
+        """
+        Add rows.
+
+        Args:
+            rows (list[Task]): The rows to add, with date keys.
+            committed (Callable | None, optional): Called with None once the rows are stored;
+                its return value becomes the result of the future. Defaults to None.
+
+        Returns:
+            Future: Resolved once the rows are stored.
+        """
+        raise NotImplementedError
+
+    def delete(self, user: str, date: str, committed: Callable | None = None) -> Future:
+        """
+        Delete the rows of a user on a date.
+
+        Args:
+            user (str): The user name.
+            date (str): The date key.
+            committed (Callable | None, optional): Called with the deleted rows, as list[Task],
+                once the deletion is stored; its return value becomes the result of the future.
+                Defaults to None.
+
+        Returns:
+            Future: Resolved once the deletion is stored.
+        """
+        raise NotImplementedError
+
+    def delete_all(self, committed: Callable | None = None) -> Future:
+        """
+        Delete all rows.
+
+        Args:
+            committed (Callable | None, optional): Called with None once the deletion is stored;
+                its return value becomes the result of the future. Defaults to None.
+
+        Returns:
+            Future: Resolved once the deletion is stored.
+        """
+        raise NotImplementedError
+
+    def get_all(self, raw: bool = False) -> list:
+        """
+        Read all rows.
+
+        Args:
+            raw (bool, optional): The text may be read as UTF-8 bytes, see codec.TextRows. Defaults to False.
+
+        Returns:
+            list: The rows in the order they were added.
+        """
+        raise NotImplementedError
+
+    def get_for_date(self, date: str, raw: bool = False) -> list:
+        """
+        Read the rows given on a date.
+
+        Args:
+            date (str): The date key.
+            raw (bool, optional): The text may be read as UTF-8 bytes, see codec.TextRows. Defaults to False.
+
+        Returns:
+            list: The rows in the order they were added.
+        """
+        raise NotImplementedError
+
+    def get_for_wait_date(self, wait_date: str, raw: bool = False) -> list:
+        """
+        Read the rows due on a date.
+
+        Args:
+            wait_date (str): The date key.
+            raw (bool, optional): The text may be read as UTF-8 bytes, see codec.TextRows. Defaults to False.
+
+        Returns:
+            list: The rows in the order they were added.
+        """
+        raise NotImplementedError
+
+    def get_for_user_date(self, user: str, date: str, raw: bool = False) -> list:
+        """
+        Read the rows given to a user on a date.
+
+        Args:
+            user (str): The user name.
+            date (str): The date key.
+            raw (bool, optional): The text may be read as UTF-8 bytes, see codec.TextRows. Defaults to False.
+
+        Returns:
+            list: The rows in the order they were added.
+        """
+        raise NotImplementedError
+
+    def get_due_between(self, start: str, end: str, raw: bool = False) -> list:
+        """
+        Read the rows due between two dates.
+
+        Args:
+            start (str): The first date key of the range, included.
+            end (str): The last date key of the range, included.
+            raw (bool, optional): The text may be read as UTF-8 bytes, see codec.TextRows. Defaults to False.
+
+        Returns:
+            list: The rows ordered by wait date.
+        """
+        raise NotImplementedError
+
+    def get_assigned_since(self, date: str, raw: bool = False) -> list:
+        """
+        Read the rows given on or after a date.
+
+        Args:
+            date (str): The first date key, included.
+            raw (bool, optional): The text may be read as UTF-8 bytes, see codec.TextRows. Defaults to False.
+
+        Returns:
+            list: The rows ordered by date.
+        """
+        raise NotImplementedError
+
+    def get_page(self, after: int, page_size: int, raw: bool = False) -> list:
+        """
+        Read a page of all rows, seeking past the previous page by the id of its last row.
+
+        Args:
+            after (int): The id of the last row of the previous page, 0 for the first page.
+            page_size (int): The maximum number of rows of the page.
+            raw (bool, optional): The text may be read as UTF-8 bytes, see codec.TextRows. Defaults to False.
+
+        Returns:
+            list: The rows of the page in the order they were added, each prefixed by its id.
+        """
+        raise NotImplementedError
+
+    def iterate(self, chunk_size: int, raw: bool = False) -> Iterator[list]:
+        """
+        Iterate over all rows in chunks.
+
+        Args:
+            chunk_size (int): The maximum number of rows in a chunk.
+            raw (bool, optional): The text may be read as UTF-8 bytes, see codec.TextRows. Defaults to False.
+
+        Yields:
+            list: The chunks of rows, in the order the rows were added.
+        """
+        raise NotImplementedError
+
+    def info(self) -> dict:
+        """
+        Summarize the storage.
+
+        Returns:
+            dict: The 'storage' name and the counters of the backend.
+        """
+        return {'storage': self.name}
+
+
+class SQLiteStorage(Storage):
+    """
+    Stores the Tasks table in an SQLite database.
+
+    Reads run on the reader connections of a ConnectionPool and writes are batched by a
+    GroupCommitWriter. The pool is also used directly by the requests only SQLite can
+    answer, such as QUERY, SEARCH and GET_CHANGES_SINCE.
+
+    The change log is trimmed to its last `changes_retention` versions when the storage
+    is opened and every `prune_interval` writes, see database.apply_prune_changes.
+
+    Attributes:
+        file_name (str): The name of the database file.
+        readers (int): The number of reader connections in the pool.
+        timeout (float): Seconds a connection waits for a lock held by another connection or process.
+        synchronous (str): The `PRAGMA synchronous` level writes are committed at.
+        window (float): The seconds the group writer waits for more writes to batch.
+        max_batch (int): The maximum number of writes committed in one batch.
+        changes_retention (int): The number of latest versions kept in the change log.
+        pool (database.ConnectionPool | None): The pool of database connections, once open.
+        writer (database.GroupCommitWriter | None): The writer batching the writes, once open.
+        submitted (itertools.count): Counts the writes, to prune the change log every `prune_interval` of them.
+    """
+
+    name = 'sqlite'
+    prune_interval = 1000
+
+    def __init__(self, file_name: str = 'tasks.db', readers: int = 4, timeout: float = 5.0,
+                 synchronous: str = 'NORMAL', window: float = 0.002, max_batch: int = 512,
+                 changes_retention: int = 100_000):
+        """
+        Initialize an SQLiteStorage, opened by open.
+
+        Args:
+            file_name (str, optional): The name of the database file. Defaults to 'tasks.db'.
+            readers (int, optional): The number of reader connections. Defaults to 4.
+            timeout (float, optional): Seconds to wait for a lock held by another connection. Defaults to 5.0.
+            synchronous (str, optional): The `PRAGMA synchronous` level of the commits. Defaults to 'NORMAL'.
+            window (float, optional): The seconds the group writer waits for more writes. Defaults to 0.002.
+            max_batch (int, optional): The maximum number of writes in a batch. Defaults to 512.
+            changes_retention (int, optional): The number of latest versions kept in the change log.
+                Defaults to 100_000.
+        """
+        self.file_name = file_name
+        self.readers = readers
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self.window = window
+        self.max_batch = max_batch
+        self.changes_retention = changes_retention
+        self.pool: database.ConnectionPool | None = None
+        self.writer: database.GroupCommitWriter | None = None
+        self.submitted = itertools.count(1)
+
+    def open(self):
+        """
+        Creates or connects to the database and opens the connection pool.
+
+        The Tasks table is indexed by date, by wait_date, by (user, date) and by
+        (lesson, wait_date) for the lookups, the queries and the deletes, the dates of
+        databases created before date keys are migrated and the tables created before
+        the explicit `id` key are rebuilt with it, and the change log read by
+        GET_CHANGES_SINCE and the full-text index of the text and the lesson read by
+        SEARCH are created. The change log is trimmed to its last `changes_retention` versions.
+        """
+        if self.pool is not None:
+            return
+        if not os.path.exists(self.file_name):
+            database.create(self.file_name)
+        self.pool = database.ConnectionPool(self.file_name, self.readers, self.timeout)
+        with self.pool.writer() as (cursor, connect):
+            database.execute_table_create(cursor, connect, TABLE,
+                                        ['id', 'user','user_id','lesson', 'date', 'wait_date', 'text'],
+                                        [database.KEY] + [database.TEXT] * 6
+            )
+            database.execute_migrate_dates(cursor, connect, TABLE, ['date', 'wait_date'])
+            database.execute_migrate_ids(cursor, connect, TABLE)
+            database.execute_index_create(cursor, connect, TABLE, 'Tasks_date', ['date'])
+            database.execute_index_create(cursor, connect, TABLE, 'Tasks_wait_date', ['wait_date'])
+            database.execute_index_create(cursor, connect, TABLE, 'Tasks_user_date', ['user', 'date'])
+            database.execute_index_create(cursor, connect, TABLE, 'Tasks_lesson_wait_date', ['lesson', 'wait_date'])
+            database.execute_changes_create(cursor, connect, TABLE)
+            database.execute_fts_create(cursor, connect, TABLE, ['text', 'lesson'])
+            database.execute_prune_changes(cursor, connect, TABLE, self.changes_retention)
+        self.writer = database.GroupCommitWriter(self.pool, self.window, self.max_batch, self.synchronous)
+
+    def close(self):
+        """
+        Close the connections of the pool. Writes still queued are not applied.
+        """
+        if self.pool is not None:
+            self.pool.close()
+        self.pool = None
+        self.writer = None
+
+    def prune_(self) -> Future:
+        """
+        Queue the trimming of the change log to its last `changes_retention` versions.
+
+        Returns:
+            Future: Resolved with the number of deleted versions once they are committed.
+        """
+        return self.writer.submit(lambda cursor: database.apply_prune_changes(cursor, TABLE, self.changes_retention))
+
+    def submit_(self, write: Callable, committed: Callable | None) -> Future:
+        """
+        Queue a write, and the trimming of the change log after every `prune_interval` writes.
+
+        Args:
+            write (Callable): The write, see database.GroupCommitWriter.submit.
+            committed (Callable | None): Called once the write is committed.
+
+        Returns:
+            Future: The future of the write.
+        """
+        future = self.writer.submit(write, committed)
+        if next(self.submitted) % self.prune_interval == 0:
+            self.prune_()
+        return future
+
+    def insert(self, rows: list[Task], committed: Callable | None = None) -> Future:
+        if len(rows) == 1:
+            return self.submit_(lambda cursor: database.apply_add_info(cursor, TABLE, rows[0]), committed)
+        return self.submit_(lambda cursor: database.apply_add_many(cursor, TABLE, rows), committed)
+
+    def delete(self, user: str, date: str, committed: Callable | None = None) -> Future:
+        def write(cursor):
+            deleted = list(map(Task._make, database.execute_get_for_user_date(cursor, None, TABLE, user, date,
+                                                                              database.TASK_STORED_COLUMNS)))
+            database.apply_delete_info(cursor, TABLE, user, date)
+            return deleted
+
+        return self.submit_(write, committed)
+
+    def delete_all(self, committed: Callable | None = None) -> Future:
+        return self.submit_(lambda cursor: database.apply_delete_all(cursor, TABLE), committed)
+
+    def get_all(self, raw: bool = False) -> list:
+        with self.pool.reader(raw=raw) as (cursor, connect):
+            return database.execute_get_all_info(cursor, connect, TABLE, database.TASK_COLUMNS)
+
+    def get_for_date(self, date: str, raw: bool = False) -> list:
+        with self.pool.reader(raw=raw) as (cursor, connect):
+            return database.execute_get_for_date(cursor, connect, TABLE, date, database.TASK_COLUMNS)
+
+    def get_for_wait_date(self, wait_date: str, raw: bool = False) -> list:
+        with self.pool.reader(raw=raw) as (cursor, connect):
+            return database.execute_get_for_wait_date(cursor, connect, TABLE, wait_date, database.TASK_COLUMNS)
+
+    def get_for_user_date(self, user: str, date: str, raw: bool = False) -> list:
+        with self.pool.reader(raw=raw) as (cursor, connect):
+            return database.execute_get_for_user_date(cursor, connect, TABLE, user, date, database.TASK_COLUMNS)
+
+    def get_due_between(self, start: str, end: str, raw: bool = False) -> list:
+        with self.pool.reader(raw=raw) as (cursor, connect):
+            return database.execute_get_due_between(cursor, connect, TABLE, start, end, database.TASK_COLUMNS)
+
+    def get_assigned_since(self, date: str, raw: bool = False) -> list:
+        with self.pool.reader(raw=raw) as (cursor, connect):
+            return database.execute_get_assigned_since(cursor, connect, TABLE, date, database.TASK_COLUMNS)
+
+    def get_page(self, after: int, page_size: int, raw: bool = False) -> list:
+        with self.pool.reader(raw=raw) as (cursor, connect):
+            return database.execute_get_page(cursor, connect, TABLE, after, page_size, database.TASK_COLUMNS)
+
+    def iterate(self, chunk_size: int, raw: bool = False) -> Iterator[list]:
+        """
+        Iterate over all rows in chunks.
+
+        The position is kept as the id of the last row read. Every chunk is read with
+        a seek past it, and a reader connection is only held while a chunk is read, never
+        while the chunk is used, so many open iterations can not exhaust the pool.
+
+        Args:
+            chunk_size (int): The maximum number of rows in a chunk.
+            raw (bool, optional): Read the text as UTF-8 bytes, see codec.TextRows. Defaults to False.
+
+        Yields:
+            list: The chunks of rows, in id order.
+        """
+        after = 0
+        while True:
+            page = self.get_page(after, chunk_size, raw)
+            if page:
+                yield [row[1:] for row in page]
+            if len(page) < chunk_size:
+                return
+            after = page[-1][0]
+
+    def info(self) -> dict:
+        """
+        Summarize the storage.
+
+        Returns:
+            dict: The 'storage' name and the batching of the group writer.
+        """
+        return {'storage': self.name, **(self.writer.info() if self.writer is not None else {})}
+
+
+class MemoryStorage(Storage):
+    """
+    Keeps the Tasks table in memory with hash indexes by date, by wait_date and by (user, date).
+
+    Every row gets an increasing id and the indexes map a key to the ids of its rows in
+    a dict used as an ordered set, so lookups and deletes cost as much as the rows they
+    touch and rows come out in the order they were added. The date keys of the indexes
+    are also kept sorted, so a range of dates is found by bisection, and pages seek
+    past the id of the last row read. The rows are kept with their 'DD.MM.YYYY' form
+    too, so reads do not convert dates.
+
+    Writes are stored, and their futures resolved, at once: there is no I/O on the
+    request path. With a snapshot file, the rows are loaded from it on open and written
+    to it atomically every `snapshot_interval` seconds while they changed and on close,
+    so a crash loses the writes made since the last snapshot.
+
+    Attributes:
+        snapshot_file (str | None): The file the rows are snapshotted to, None to keep them in memory only.
+        snapshot_interval (float): The seconds between two snapshots, 0 to only snapshot on close.
+        rows (dict[int, tuple[Task, list]]): Every row with date keys and in the form read, by id.
+        by_date (dict[str, dict[int, None]]): The ids of the rows by date key.
+        by_wait_date (dict[str, dict[int, None]]): The ids of the rows by wait date key.
+        by_user_date (dict[tuple[str, str], dict[int, None]]): The ids of the rows by user and date key.
+        dates (list[str]): The keys of `by_date`, sorted.
+        wait_dates (list[str]): The keys of `by_wait_date`, sorted.
+        next_id (int): The id of the next row added.
+        changes (int): The number of writes since the last snapshot.
+        snapshots (int): The number of snapshots written.
+        lock (threading.Lock): Serializes the writes and the reads.
+        snapshot_lock (threading.Lock): Serializes the snapshots.
+        opened (bool): Whether the storage is open.
+    """
+
+    name = 'memory'
+
+    def __init__(self, snapshot_file: str | None = None, snapshot_interval: float = 0):
+        """
+        Initialize an empty MemoryStorage, opened by open.
+
+        Args:
+            snapshot_file (str | None, optional): The file the rows are snapshotted to. Defaults to None.
+            snapshot_interval (float, optional): The seconds between two snapshots, 0 to only
+                snapshot on close. Defaults to 0.
+        """
+        self.snapshot_file = snapshot_file
+        self.snapshot_interval = snapshot_interval
+        self.rows: dict[int, tuple[Task, list]] = {}
+        self.by_date: dict[str, dict[int, None]] = {}
+        self.by_wait_date: dict[str, dict[int, None]] = {}
+        self.by_user_date: dict[tuple[str, str], dict[int, None]] = {}
+        self.dates: list[str] = []
+        self.wait_dates: list[str] = []
+        self.next_id = 1
+        self.changes = 0
+        self.snapshots = 0
+        self.lock = threading.Lock()
+        self.snapshot_lock = threading.Lock()
+        self.opened = False
+
+    def open(self):
+        """
+        Load the rows of the snapshot file, if it exists, and start the snapshot thread.
+        """
+        if self.opened:
+            return
+        self.opened = True
+        if self.snapshot_file is not None and os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, encoding='utf-8') as file:
+                snapshot = json.load(file)
+            if snapshot.get('version') != SNAPSHOT_VERSION:
+                raise ValueError(f'unsupported snapshot version {snapshot.get("version")!r} in {self.snapshot_file}')
+            with self.lock:
+                for row in snapshot['rows']:
+                    self.add_(Task._make(row))
+            LogDataBaseConnect(self.snapshot_file)
+        if self.snapshot_file is not None and self.snapshot_interval > 0:
+            threading.Thread(target=self.snapshot_periodically_, daemon=True).start()
+
+    def close(self):
+        """
+        Write a last snapshot, if the storage has a snapshot file.
+        """
+        if self.snapshot_file is not None:
+            self.snapshot()
+        self.opened = False
+
+    def add_(self, row: Task):
+        """
+        Add a row and index it. The lock must be held.
+
+        Args:
+            row (Task): The row, with date keys.
+        """
+        row_id = self.next_id
+        self.next_id += 1
+        self.rows[row_id] = (row, [row.user, row.user_id, row.lesson, database.key_to_date(row.date),
+                                   database.key_to_date(row.wait_date), row.text])
+        if row.date not in self.by_date:
+            bisect.insort(self.dates, row.date)
+        if row.wait_date not in self.by_wait_date:
+            bisect.insort(self.wait_dates, row.wait_date)
+        self.by_date.setdefault(row.date, {})[row_id] = None
+        self.by_wait_date.setdefault(row.wait_date, {})[row_id] = None
+        self.by_user_date.setdefault((row.user, row.date), {})[row_id] = None
+
+    @staticmethod
+    def unindex_(index: dict, key, row_id: int, keys: list | None = None):
+        """
+        Remove a row id from the ids of a key, dropping the key once it has none.
+
+        Args:
+            index (dict): The index.
+            key: The key of the row in the index.
+            row_id (int): The id of the row.
+            keys (list | None, optional): The sorted keys of the index, if it keeps them. Defaults to None.
+        """
+        ids = index[key]
+        del ids[row_id]
+        if not ids:
+            del index[key]
+            if keys is not None:
+                del keys[bisect.bisect_left(keys, key)]
+
+    def store_(self, write: Callable[[], object], committed: Callable | None) -> Future:
+        """
+        Apply a write under the lock, call its callback and return its resolved future.
+
+        Args:
+            write (Callable[[], object]): Applies the write and returns its result.
+            committed (Callable | None): Called with the result of the write.
+
+        Returns:
+            Future: Resolved with the return value of the callback, or with the result of the write.
+        """
+        future = Future()
+        try:
+            with self.lock:
+                result = write()
+                self.changes += 1
+                if committed is not None:
+                    result = committed(result)
+        except Exception as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        return future
+
+    def insert(self, rows: list[Task], committed: Callable | None = None) -> Future:
+        def write():
+            for row in rows:
+                self.add_(row)
+
+        return self.store_(write, committed)
+
+    def delete(self, user: str, date: str, committed: Callable | None = None) -> Future:
+        def write():
+            deleted = []
+            for row_id in self.by_user_date.pop((user, date), ()):
+                row = self.rows.pop(row_id)[0]
+                self.unindex_(self.by_date, row.date, row_id, self.dates)
+                self.unindex_(self.by_wait_date, row.wait_date, row_id, self.wait_dates)
+                deleted.append(row)
+            return deleted
+
+        return self.store_(write, committed)
+
+    def delete_all(self, committed: Callable | None = None) -> Future:
+        def write():
+            self.rows.clear()
+            self.by_date.clear()
+            self.by_wait_date.clear()
+            self.by_user_date.clear()
+            self.dates.clear()
+            self.wait_dates.clear()
+
+        return self.store_(write, committed)
+
+    def get_all(self, raw: bool = False) -> list:
+        with self.lock:
+            return [shown for row, shown in self.rows.values()]
+
+    def get_for_date(self, date: str, raw: bool = False) -> list:
+        with self.lock:
+            return [self.rows[row_id][1] for row_id in self.by_date.get(date, ())]
+
+    def get_for_wait_date(self, wait_date: str, raw: bool = False) -> list:
+        with self.lock:
+            return [self.rows[row_id][1] for row_id in self.by_wait_date.get(wait_date, ())]
+
+    def get_for_user_date(self, user: str, date: str, raw: bool = False) -> list:
+        with self.lock:
+            return [self.rows[row_id][1] for row_id in self.by_user_date.get((user, date), ())]
+
+    def get_due_between(self, start: str, end: str, raw: bool = False) -> list:
+        with self.lock:
+            keys = self.wait_dates[bisect.bisect_left(self.wait_dates, start):bisect.bisect_right(self.wait_dates, end)]
+            return [self.rows[row_id][1] for key in keys for row_id in self.by_wait_date[key]]
+
+    def get_assigned_since(self, date: str, raw: bool = False) -> list:
+        with self.lock:
+            keys = self.dates[bisect.bisect_left(self.dates, date):]
+            return [self.rows[row_id][1] for key in keys for row_id in self.by_date[key]]
+
+    def get_page(self, after: int, page_size: int, raw: bool = False) -> list:
+        """
+        Read a page of all rows, seeking past the previous page by the id of its last row.
+
+        Ids only grow, so the ids after the last one read are tried in order, skipping
+        the ones of deleted rows, without walking the rows of the previous pages.
+
+        Args:
+            after (int): The id of the last row of the previous page, 0 for the first page.
+            page_size (int): The maximum number of rows of the page.
+            raw (bool, optional): Unused, the text is kept as str. Defaults to False.
+
+        Returns:
+            list: The rows of the page in the order they were added, each prefixed by its id.
+        """
+        page = []
+        with self.lock:
+            for row_id in range(max(after, 0) + 1, self.next_id):
+                found = self.rows.get(row_id)
+                if found is not None:
+                    page.append([row_id, *found[1]])
+                    if len(page) == page_size:
+                        break
+        return page
+
+    def iterate(self, chunk_size: int, raw: bool = False) -> Iterator[list]:
+        """
+        Iterate over all rows in chunks, as they were when the iteration started.
+
+        Args:
+            chunk_size (int): The maximum number of rows in a chunk.
+            raw (bool, optional): Unused, the text is kept as str. Defaults to False.
+
+        Yields:
+            list: The chunks of rows, in the order they were added.
+        """
+        rows = self.get_all()
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start:start + chunk_size]
+
+    def snapshot(self):
+        """
+        Write the rows to the snapshot file, atomically: a crash while it is written keeps the previous one.
+        """
+        with self.snapshot_lock:
+            with self.lock:
+                rows = [row for row, shown in self.rows.values()]
+                self.changes = 0
+            temporary = f'{self.snapshot_file}.tmp'
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump({'version': SNAPSHOT_VERSION, 'rows': rows}, file, ensure_ascii=False)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.snapshot_file)
+            self.snapshots += 1
+
+    def snapshot_periodically_(self):
+        """
+        Write a snapshot every `snapshot_interval` seconds while the rows changed.
+        """
+        while self.opened:
+            time.sleep(self.snapshot_interval)
+            if self.changes:
+                self.snapshot()
+
+    def info(self) -> dict:
+        """
+        Summarize the storage.
+
+        Returns:
+            dict: The 'storage' name, the number of 'rows', of 'changes' since the last
+                snapshot and of 'snapshots' written.
+        """
+        with self.lock:
+            return {'storage': self.name, 'rows': len(self.rows), 'changes': self.changes,
+                    'snapshots': self.snapshots}
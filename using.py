@@ -1,9 +1,6 @@
 # подключаешь api
 from src import api
 
-# понядобится для задержки между запросами, чтоб сервер успевал их полностью получить
-from time import sleep
-
 from src.core import utils
 
 
@@ -21,6 +18,15 @@ ClientObject = api.HWIClient(
 
 ClientObject.connect()     # попытка подключения
 
+# для многопоточных ботов: несколько готовых подключений на всех, запрос берет свободное
+Pool = api.HWIClientPool(
+    port=utils.LOCAL_PORT,
+    host=utils.LOCAL_HOST,
+    size=4                  # сколько подключений держать открытыми
+)
+Pool.connect()              # открывает все подключения сразу, при обрыве переподключается сам
+# Pool.request(api.Requests.GET_ALL)   # те же запросы что и у ClientObject.request
+
 # далее примеры запросов
 
 ClientObject.request(
@@ -39,6 +45,39 @@ ClientObject.request(
     api.Requests.GET_ALL() # ничего не принимает
 ) # возвращает полный список всего
 
+ClientObject.request(
+    api.Requests.QUERY(
+        where={                             # фильтр: 'user', 'user_id', 'lesson', 'date', 'wait_date'
+            'lesson': 'Информатика',        # просто значение - равенство
+            'wait_date': {'>=': '09.09.2024', '<=': '15.09.2024'},  # или операции '=', '<', '<=', '>', '>=', 'in'
+        },
+        columns=['user', 'wait_date', 'text'],  # какие поля прислать, по умолчанию все
+        order_by='wait_date',               # сортировка, descending=True - по убыванию
+        limit=50                            # не больше стольких заданий, по умолчанию без ограничения
+    )
+) # возвращает список заданий, в каждом только запрошенные поля
+
+ClientObject.request(
+    api.Requests.SEARCH(
+        query='контурная карта',    # слова для поиска по тексту и предмету, можно начало слова: 'контур'
+        lesson='История',           # необязательно, искать только по этому предмету
+        limit=20                    # не больше стольких заданий
+    )
+) # возвращает список найденных заданий, самые подходящие первыми
+
+ClientObject.request(
+    api.Requests.GET_DUE_BETWEEN(
+        start='09.09.2024', # возвращает все задания которые необходимо выполнить в промежутке между датами (включительно)
+        end='15.09.2024'
+    )
+) # возвращает список, отсортированный по дате выполнения
+
+ClientObject.request(
+    api.Requests.GET_ASSIGNED_SINCE(
+        date='02.09.2024'   # возвращает все задания которые были даны начиная с данного числа
+    )
+) # возвращает список, отсортированный по дате задания
+
 ClientObject.request(
     api.Requests.ADD_INFO(
         info=[
@@ -49,12 +88,45 @@ ClientObject.request(
             'текст задания...'  # текст задания
         ]
     )
-) # ничего не возвращает
+) # возвращает список в котором один элемент, отвечает когда задание уже записано в базу
+
+ClientObject.request(
+    api.Requests.ADD_MANY(
+        infos=[ # список заданий в том же формате что и у ADD_INFO, добавляются все разом одной транзакцией
+            ['Иван', 'Информатика', '03.09.2024', '11.09.2024', 'текст задания...'],
+            ['Иван', 'Физика',      '03.09.2024', '10.09.2024', 'текст задания...'],
+        ]
+    )
+) # возвращает список в котором один элемент, успешно или нет прошло добавление
+
+ClientObject.pipeline([
+    api.Requests.GET_FOR_DATE(data='03.09.2024'),
+    api.Requests.GET_ALL,
+]) # отправляет несколько запросов подряд без задержек и возвращает список ответов в том же порядке
+
+future = ClientObject.submit(
+    api.Requests.GET_FOR_DATE(data='03.09.2024')
+) # отправляет запрос не дожидаясь ответа, по одному подключению может идти сколько угодно запросов одновременно
+future.result() # дожидается ответа и возвращает список
+
+subscription = ClientObject.subscribe(
+    lesson='Информатика'    # необязательные фильтры: lesson, user, wait_date
+) # сервер сам присылает изменения, опрашивать GET_ALL в цикле больше не нужно
+# for change in subscription: ...   # каждое изменение - {'action': 'add' | 'delete' | 'delete_all', 'rows': [...]}
+# ClientObject.subscribe(callback=print)  # или вызывать функцию на каждое изменение
+subscription.close() # отписывается
+
+changes = ClientObject.request(
+    api.Requests.GET_CHANGES_SINCE(
+        version=0       # 'version' из прошлого ответа, 0 если локальной копии еще нет
+    )
+) # возвращает словарь: 'version', 'reset', 'rows' (вся таблица с row_id, если reset), 'changes' и 'more'
+# каждое изменение - [action, row_id, ...поля задания], при переподключении приходят только они, а не вся таблица
 
 ClientObject.request(
     api.Requests.DELETE_INFO(
         user_name='Иван',       # имя задание которого вы хотите удалить
-        data='03.09.2024'       # дата заданного задания которое вы хотите удалить
+        date='03.09.2024'       # дата заданного задания которое вы хотите удалить
     )
 ) # возвращает список в котором один элемент, успешно или нет прошло удаление
 
@@ -72,9 +144,15 @@ ClientObject.request(
 # инициализирует сервер на данном хосте и порте
 server = api.HWIServer(
     port=utils.LOCAL_PORT, # локальный порт
-    host=utils.LOCAL_HOST  # локальный хост
+    host=utils.LOCAL_HOST, # локальный хост
+    synchronous='NORMAL'   # надежность записи: OFF, NORMAL, FULL или EXTRA, ответ на запись приходит после коммита
 ) 
 
+# вместо sqlite задачи можно хранить в памяти: индексы по дате, сроку сдачи и (имя, дата),
+# снимок на диск раз в 60 секунд и при закрытии (запросы SEARCH, QUERY и другие требуют sqlite)
+# from src.core import storage
+# server = api.HWIServer(storage=storage.MemoryStorage('tasks.json', snapshot_interval=60))
+
 # создает каркас начальной базы данных в локальной директории
 server.create_data_base()
 